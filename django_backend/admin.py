@@ -25,6 +25,10 @@ class DoctorAdmin(admin.ModelAdmin):
     list_filter = ('specialization', 'department', 'is_available')
     search_fields = ('user__first_name', 'user__last_name', 'license_number')
 
+@admin.register(DoctorRatingSummary)
+class DoctorRatingSummaryAdmin(admin.ModelAdmin):
+    list_display = ('doctor', 'count', 'total', 'updated_at')
+
 @admin.register(Patient)
 class PatientAdmin(admin.ModelAdmin):
     list_display = ('user', 'blood_group', 'emergency_contact')
@@ -60,6 +64,12 @@ class NotificationAdmin(admin.ModelAdmin):
     list_filter = ('notification_type', 'is_read', 'email_sent', 'sms_sent')
     search_fields = ('recipient__first_name', 'recipient__last_name', 'title')
 
+@admin.register(NotificationDelivery)
+class NotificationDeliveryAdmin(admin.ModelAdmin):
+    list_display = ('notification', 'channel', 'destination', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('channel', 'status')
+    search_fields = ('destination',)
+
 # Register the custom user admin
 admin.site.unregister(User)
 admin.site.register(User, CustomUserAdmin)
\ No newline at end of file
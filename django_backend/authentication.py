@@ -0,0 +1,187 @@
+# Token Authentication for Hospital Management System
+#
+# CachedTokenAuthentication resolves a token to its user from a per-process
+# LRU with a short TTL, optionally backed by a shared cache, so a warm request
+# costs one cache round trip instead of a Token + User join. Every cached
+# entry carries a stamp made of a global and a per-user version kept in
+# TOKEN_AUTH_CACHE; deleting a token or saving its user bumps the version, and
+# every worker sees the stale stamp on its next request. TOKEN_AUTH_CACHE must
+# be shared between workers (Redis, Memcached) for that to reach all of them.
+# Every revocation also bumps a revocation counter. A miss reads it before
+# loading the token, and an entry loaded while it moved is not cached: the
+# user is only known after the load, so its own version cannot be read first.
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+
+def token_expiry():
+    """How long a token stays valid after it was issued, or None for no expiry"""
+    hours = getattr(settings, 'TOKEN_EXPIRY_HOURS', None)
+    return timedelta(hours=hours) if hours else None
+
+
+def is_expired(token, now=None):
+    expiry = token_expiry()
+    return bool(expiry) and token.created + expiry <= (now or timezone.now())
+
+
+class TokenCache:
+    """Two-level token -> (user, token) cache invalidated through versioned stamps"""
+
+    global_key = 'auth_tokens:version'
+    revocations_key = 'auth_tokens:revocations'
+
+    def __init__(self, alias='default', local_size=10000, local_ttl=60, shared=False, shared_timeout=300):
+        self.alias = alias
+        self.local_size = local_size
+        self.local_ttl = local_ttl
+        self.shared = shared
+        self.shared_timeout = shared_timeout
+        self.stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'evictions': 0, 'revocations': 0}
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def user_key(self, user_id):
+        return f'auth_tokens:user:{user_id}'
+
+    def shared_key(self, key):
+        return f'auth_tokens:token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+    def _new_version(self):
+        # Never restart at 1 after an eviction, or old stamps could match again
+        return int(time.time() * 1000)
+
+    def stamp(self, user_id):
+        """(global version, user version) with one cache round trip"""
+        keys = [self.global_key, self.user_key(user_id)]
+        versions = self.cache.get_many(keys)
+        for key in keys:
+            if key not in versions:
+                self.cache.add(key, self._new_version(), timeout=None)
+                versions[key] = self.cache.get(key)
+        return versions[keys[0]], versions[keys[1]]
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def resolve(self, key, load):
+        """Return (user, token) for key, calling load(key) on a miss"""
+        with self._lock:
+            entry = self._local.get(key)
+        if entry is not None:
+            user, token, stamp, expires = entry
+            if expires > time.monotonic() and stamp == self.stamp(user.pk):
+                with self._lock:
+                    if key in self._local:
+                        self._local.move_to_end(key)
+                self._count('local_hits')
+                return user, token
+
+        if self.shared:
+            cached = self.cache.get(self.shared_key(key))
+            if cached is not None:
+                user, token, stamp = cached
+                if stamp == self.stamp(user.pk):
+                    self._remember(key, user, token, stamp)
+                    self._count('shared_hits')
+                    return user, token
+
+        self._count('misses')
+        before = self.cache.get(self.revocations_key)
+        user, token = load(key)
+        stamp = self.stamp(user.pk)
+        if self.cache.get(self.revocations_key) != before:
+            # A token was deleted or a user saved during the load; it may have been this one
+            return user, token
+        self._remember(key, user, token, stamp)
+        if self.shared:
+            self.cache.set(self.shared_key(key), (user, token, stamp), timeout=self.shared_timeout)
+        return user, token
+
+    def _remember(self, key, user, token, stamp):
+        with self._lock:
+            self._local[key] = (user, token, stamp, time.monotonic() + self.local_ttl)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def clear(self):
+        """Forget this process's entries; the shared layer and versions are untouched"""
+        with self._lock:
+            self._local.clear()
+
+    def _bump(self, key):
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.set(key, self._new_version(), timeout=None)
+
+    def revoke_user(self, user_id):
+        """Invalidate every cached token of one user, in all workers, after commit"""
+        def apply():
+            self._bump(self.user_key(user_id))
+            self._bump(self.revocations_key)
+            self._count('revocations')
+
+        transaction.on_commit(apply)
+
+    def revoke_all(self):
+        """Invalidate every cached token, in all workers, after commit"""
+        def apply():
+            self._bump(self.global_key)
+            self._bump(self.revocations_key)
+            self.clear()
+            self._count('revocations')
+
+        transaction.on_commit(apply)
+
+
+token_cache = TokenCache(
+    alias=getattr(settings, 'TOKEN_AUTH_CACHE', 'default'),
+    local_size=getattr(settings, 'TOKEN_AUTH_LOCAL_SIZE', 10000),
+    local_ttl=getattr(settings, 'TOKEN_AUTH_LOCAL_TTL', 60),
+    shared=getattr(settings, 'TOKEN_AUTH_SHARED', False),
+    shared_timeout=getattr(settings, 'TOKEN_AUTH_SHARED_TIMEOUT', 300),
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication with cached lookups and optional expiry"""
+
+    def authenticate_credentials(self, key):
+        user, token = token_cache.resolve(key, super().authenticate_credentials)
+        if is_expired(token):
+            raise AuthenticationFailed('Token has expired.')
+        return user, token
+
+
+def issue_token(user):
+    """Return the user's token, replacing it first if it has expired"""
+    token, created = Token.objects.get_or_create(user=user)
+    if not created and is_expired(token):
+        token.delete()
+        token = Token.objects.create(user=user)
+    return token
+
+
+def revoke_token(user):
+    """Delete the user's token; the post_delete signal invalidates caches"""
+    return Token.objects.filter(user=user).delete()[0]
@@ -0,0 +1,270 @@
+# Benchmark Cases for Hospital Management System
+#
+# Endpoint cases go through django.test.Client, so middleware, token
+# authentication and rendering are all included. Component cases call the
+# search, scheduling, rollup, import and dispatch layers directly. Cases that
+# write use fresh emails and dates on every call so they can run repeatedly.
+
+import io
+import itertools
+from datetime import date, timedelta
+from unittest import mock
+
+from django.core import mail
+from django.db import connection
+from django.db.models import Count, Q, Sum
+from django.test import Client, override_settings
+from rest_framework.authtoken.models import Token
+
+from ..authentication import token_cache
+from ..caching import doctor_directory_cache
+from ..importer import UserImporter, read_rows
+from ..models import Appointment, Bill, Doctor, DoctorRating, Notification, Patient, User
+from ..notifications import Dispatcher, enqueue_notifications
+from ..rollups import revenue_report
+from ..search import _postgres_search, doctor_index
+from ..serializers import AppointmentReadSerializer, AppointmentSerializer
+from ..transports import EmailTransport, LocmemSMSClient, close_transports, get_email_transport
+from .measure import BenchmarkError, Case, expect_ok
+
+SLOT_TIMES = [f'{hour % 12 or 12:02d}:{minute:02d} {"AM" if hour < 12 else "PM"}'
+              for hour in range(9, 17) for minute in (0, 30)]
+
+
+class BenchmarkContext:
+    """The users, tokens and clients the cases act as, picked from the seeded data"""
+
+    def __init__(self):
+        self.today = date.today()
+        self.counter = itertools.count()
+        self.admin, _ = User.objects.get_or_create(
+            username='benchmark-admin@example.com',
+            defaults={'email': 'benchmark-admin@example.com', 'user_type': 'admin',
+                      'first_name': 'Benchmark', 'last_name': 'Admin'},
+        )
+        # The busiest doctor and patient give the dashboards the most to do
+        self.doctor = (Doctor.objects.select_related('user', 'department')
+                       .annotate(n=Count('appointment')).order_by('-n', 'pk').first())
+        self.patient = (Patient.objects.select_related('user')
+                        .annotate(n=Count('appointment')).order_by('-n', 'pk').first())
+        self.rated_doctor_id = (DoctorRating.objects.values('doctor_id').annotate(n=Count('pk'))
+                                .order_by('-n', 'doctor_id').values_list('doctor_id', flat=True).first())
+        self.department = self.doctor.department.name if self.doctor and self.doctor.department else 'Cardiology'
+        self.anonymous = Client()
+
+    def client(self, user):
+        token, _ = Token.objects.get_or_create(user=user)
+        return Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def unique(self, prefix):
+        return f'{prefix}-{next(self.counter)}'
+
+    def future_slot(self):
+        """A date and time far enough ahead that departments still have capacity"""
+        n = next(self.counter)
+        day = self.today + timedelta(days=60 + n % 300)
+        return day.isoformat(), SLOT_TIMES[n % len(SLOT_TIMES)]
+
+
+def _get(client, path, **extra):
+    return lambda: expect_ok(client.get(path, **extra))
+
+
+def _uncached(call):
+    def run():
+        doctor_directory_cache.invalidate()
+        return call()
+    return run
+
+
+def endpoint_cases(ctx):
+    admin = ctx.client(ctx.admin)
+    doctor = ctx.client(ctx.doctor.user)
+    patient = ctx.client(ctx.patient.user)
+    year_ago = ctx.today - timedelta(days=365)
+    month = f'start={ctx.today}&end={ctx.today + timedelta(days=30)}'
+    bills = Bill.objects.count()
+
+    def book(email_for):
+        def call():
+            day, at = ctx.future_slot()
+            return expect_ok(ctx.anonymous.post('/api/appointments/', {
+                'email': email_for(), 'name': 'Bench Guest', 'phone': '5550100', 'address': 'Bench St',
+                'department': ctx.department, 'date': day, 'time': at, 'symptoms': 'Benchmark',
+            }, content_type='application/json'))
+        return call
+
+    return [
+        Case('list_doctors', 'endpoints', _get(ctx.anonymous, '/api/doctors/')),
+        Case('list_doctors_uncached', 'endpoints', _uncached(_get(ctx.anonymous, '/api/doctors/')), iterations=10),
+        Case('search_doctors_uncached', 'endpoints', _uncached(_get(ctx.anonymous, '/api/doctors/?q=cardio'))),
+        Case('doctor_ratings', 'endpoints', _get(ctx.anonymous, f'/api/doctors/{ctx.rated_doctor_id}/ratings/')),
+        Case('availability_month', 'endpoints', _get(ctx.anonymous, f'/api/availability/?{month}'),
+             iterations=5, warmup=1, note=f'{Doctor.objects.filter(is_available=True).count()} available doctors'),
+        Case('admin_dashboard', 'endpoints', _get(admin, '/api/dashboard/admin/')),
+        Case('doctor_dashboard', 'endpoints', _get(doctor, '/api/dashboard/doctor/')),
+        Case('patient_dashboard', 'endpoints', _get(patient, '/api/dashboard/patient/')),
+        Case('patient_dashboard_token_miss', 'endpoints', _get(patient, '/api/dashboard/patient/'),
+             setup=token_cache.clear, note='token cache emptied before every request'),
+        Case('notifications', 'endpoints', _get(patient, '/api/notifications/')),
+        Case('notification_unread_count', 'endpoints', _get(patient, '/api/notifications/unread-count/')),
+        Case('revenue_analytics_year', 'endpoints',
+             _get(admin, f'/api/analytics/revenue/?start={year_ago}&end={ctx.today}&group_by=department')),
+        Case('export_bills_csv', 'endpoints', _get(admin, '/api/exports/bills/'),
+             iterations=3, warmup=1, items=bills),
+        Case('export_bills_parquet', 'endpoints', _get(admin, '/api/exports/bills/?output=parquet'),
+             iterations=3, warmup=1, items=bills),
+        Case('create_appointment_guest', 'endpoints',
+             book(lambda: f"{ctx.unique('bench-guest')}@example.com"), iterations=20),
+        Case('create_appointment_returning', 'endpoints', book(lambda: ctx.patient.user.email), iterations=20),
+    ]
+
+
+def component_cases(ctx):
+    names = [f'{d.user.first_name} {d.user.last_name}' for d in
+             Doctor.objects.select_related('user').order_by('pk')[:50]]
+    year_ago = ctx.today - timedelta(days=365)
+    cases = [
+        Case('search_ngram_index', 'components', lambda: doctor_index.search('cardio', limit=200)),
+        Case('search_icontains', 'components', lambda: list(Doctor.objects.filter(
+            Q(user__first_name__icontains='cardio') | Q(user__last_name__icontains='cardio')
+            | Q(specialization__icontains='cardio') | Q(department__name__icontains='cardio')
+        ).values_list('pk', flat=True)), note='the unindexed query list_doctors used before'),
+        Case('resolve_doctors_by_name', 'components', lambda: Doctor.objects.resolve(names=names),
+             items=len(names)),
+        Case('revenue_rollup_year', 'components',
+             lambda: revenue_report(year_ago, ctx.today, group_by=('department',))),
+        Case('revenue_direct_year', 'components', lambda: list(
+            Bill.objects.filter(created_at__date__gte=year_ago)
+            .values('doctor__department_id').annotate(Sum('total_amount'), Count('pk')).order_by()
+        ), note='the same report aggregated from Bill'),
+    ]
+    if connection.vendor == 'postgresql':
+        cases.insert(1, Case('search_trigram', 'components', lambda: list(
+            _postgres_search(Doctor.objects.all(), 'cardio').values_list('pk', flat=True)[:200]
+        )))
+    cases += serializer_cases(ctx) + import_cases(ctx) + dispatch_cases(ctx)
+    return cases
+
+
+def serializer_cases(ctx, rows=10000):
+    """Appointment rows rendered per second, model serializer against the read path"""
+    appointments = Appointment.objects.order_by('-created_at', '-id')[:rows]
+    count = appointments.count()
+
+    def full():
+        return AppointmentSerializer(AppointmentSerializer.setup_eager_loading(appointments), many=True).data
+
+    def read():
+        return AppointmentReadSerializer(AppointmentReadSerializer.setup_eager_loading(appointments), many=True).data
+
+    note = f'{count} appointments, query included'
+    return [
+        Case('serialize_appointments_model', 'components', full, iterations=3, warmup=1, items=count, note=note),
+        Case('serialize_appointments_values', 'components', read, iterations=3, warmup=1, items=count, note=note),
+    ]
+
+
+def import_cases(ctx, rows=500, hashed_rows=16):
+    def csv_stream(count, passwords):
+        prefix = ctx.unique('bench-import')
+        lines = ['email,firstName,lastName,userType,password']
+        lines += [f"{prefix}-{i}@example.com,Import,Patient{i},patient,{'Pw-' + str(i) if passwords else ''}"
+                  for i in range(count)]
+        return io.StringIO('\n'.join(lines) + '\n')
+
+    def run(count, passwords):
+        def call():
+            report = UserImporter().run(read_rows(csv_stream(count, passwords), 'csv'))
+            if report.errors:
+                raise AssertionError(report.errors[:3])
+        return call
+
+    return [
+        Case('import_patients', 'components', run(rows, False), iterations=3, warmup=1, items=rows,
+             note='unusable passwords and reset tokens'),
+        Case('import_patients_hashed', 'components', run(hashed_rows, True), iterations=1, warmup=0,
+             items=hashed_rows, note='PBKDF2 hashing in a thread pool'),
+    ]
+
+
+def dispatch_cases(ctx, messages=200):
+    users = list(User.objects.filter(user_type='patient').exclude(email='').exclude(phone='')
+                 .order_by('pk')[:messages])
+
+    def enqueue():
+        Notification.objects.filter(title='Bench').delete()
+        mail.outbox = []
+        LocmemSMSClient.outbox.clear()
+        with override_settings(NOTIFICATION_COALESCE_WINDOW=0):
+            enqueue_notifications([(user, 'bill_generated', 'Bench', 'Benchmark message') for user in users])
+
+    def drain(email_batch_size, pooled=True):
+        def call():
+            with override_settings(NOTIFICATION_SMS_CLIENT='hospital.transports.LocmemSMSClient'):
+                close_transports()
+                dispatcher = Dispatcher(batch_size=1000, email_batch_size=email_batch_size)
+                transport = get_email_transport() if pooled else EmailTransport(pooled=False)
+                try:
+                    with mock.patch('hospital.notifications.get_email_transport', return_value=transport):
+                        while dispatcher.run_once():
+                            pass
+                finally:
+                    transport.close()
+                    close_transports()
+        return call
+
+    note = "Django's locmem email backend; point EMAIL_BACKEND at a local SMTP stub to include network cost"
+    return [
+        Case('dispatch_pooled', 'components', drain(None), setup=enqueue, iterations=3, warmup=1,
+             items=len(users) * 2, note=note),
+        Case('dispatch_one_per_batch', 'components', drain(1, pooled=False), setup=enqueue, iterations=3,
+             warmup=1, items=len(users) * 2, note='one SMTP connection per email, as before pooling'),
+    ]
+
+
+def conditional_cases(ctx):
+    """Revalidation of the endpoints that send ETags, each paired with its full endpoint case"""
+    endpoints = [
+        ('list_doctors', ctx.anonymous, '/api/doctors/'),
+        ('doctor_ratings', ctx.anonymous, f'/api/doctors/{ctx.rated_doctor_id}/ratings/'),
+        ('admin_dashboard', ctx.client(ctx.admin), '/api/dashboard/admin/'),
+        ('doctor_dashboard', ctx.client(ctx.doctor.user), '/api/dashboard/doctor/'),
+        ('patient_dashboard', ctx.client(ctx.patient.user), '/api/dashboard/patient/'),
+    ]
+    return [_revalidation_case(*endpoint) for endpoint in endpoints]
+
+
+def _revalidation_case(full_case, client, path):
+    info = {'full_case': full_case}
+
+    def fetch():
+        # Untimed: other cases may have changed the data since the last call
+        response = expect_ok(client.get(path))
+        info['etag'] = response['ETag']
+        info['full_bytes'] = len(response.content)
+
+    def call():
+        response = client.get(path, HTTP_IF_NONE_MATCH=info['etag'])
+        if response.status_code != 304:
+            raise BenchmarkError(f'Expected 304, got {response.status_code}')
+        info['bytes'] = len(response.content)
+        return response
+
+    return Case(f'{full_case}_not_modified', 'conditional', call, setup=fetch, info=info,
+                note=f'If-None-Match revalidation of {full_case}')
+
+
+GROUPS = {
+    'endpoints': endpoint_cases,
+    'components': component_cases,
+    'conditional': conditional_cases,
+}
+
+
+def all_cases(ctx, only=()):
+    """Every case, or those whose name or group contains one of the only substrings"""
+    cases = [case for build in GROUPS.values() for case in build(ctx)]
+    if only:
+        cases = [case for case in cases if any(part in case.name or part == case.group for part in only)]
+    return cases
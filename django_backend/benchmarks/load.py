@@ -0,0 +1,125 @@
+# Mixed-Workload Load Driver for Hospital Management System
+#
+# A fixed number of client threads each pick operations from a weighted
+# script with their own seeded random generator and run them back to back for
+# the given duration. Every thread uses its own test Client and database
+# connection, so the figures include lock and connection contention. A small
+# shared pool of guest emails makes concurrent first bookings with the same
+# email happen on purpose; the run checks afterwards that each of those
+# emails ended up with exactly one account.
+
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+
+from ..models import User
+from .measure import percentile
+
+
+def _booking(ctx, email):
+    day, at = ctx.future_slot()
+    return {
+        'email': email, 'name': 'Load Guest', 'phone': '5550100', 'address': 'Load St',
+        'department': ctx.department, 'date': day, 'time': at, 'symptoms': 'Load test',
+    }
+
+
+def mixed_workload(ctx, race_emails):
+    """[(operation name, weight, run(client, patient_client, rng))]"""
+    month = f'start={ctx.today}&end={ctx.today + timedelta(days=27)}'
+    return [
+        ('browse_doctors', 25, lambda c, p, rng: c.get('/api/doctors/')),
+        ('search_doctors', 10, lambda c, p, rng: c.get(f"/api/doctors/?q={rng.choice(['card', 'neuro', 'sharma'])}")),
+        ('doctor_ratings', 10, lambda c, p, rng: c.get(f'/api/doctors/{ctx.rated_doctor_id}/ratings/')),
+        ('availability', 5, lambda c, p, rng: c.get(f'/api/availability/?{month}')),
+        ('patient_dashboard', 15, lambda c, p, rng: p.get('/api/dashboard/patient/')),
+        ('unread_count', 20, lambda c, p, rng: p.get('/api/notifications/unread-count/')),
+        ('book_guest', 10, lambda c, p, rng: c.post(
+            '/api/appointments/', _booking(ctx, f"{ctx.unique('load-guest')}@example.com"),
+            content_type='application/json')),
+        ('book_same_email', 5, lambda c, p, rng: c.post(
+            '/api/appointments/', _booking(ctx, rng.choice(race_emails)), content_type='application/json')),
+    ]
+
+
+def run_load(ctx, threads=8, duration=10.0, seed=0, race_pool=4):
+    """Drive the mixed workload and return throughput and per-operation latency"""
+    prefix = ctx.unique('load-race')
+    race_emails = [f'{prefix}-{i}@example.com' for i in range(race_pool)]
+    operations = mixed_workload(ctx, race_emails)
+    names = [name for name, _, _ in operations]
+    weights = [weight for _, weight, _ in operations]
+    runners = {name: run for name, _, run in operations}
+    patient_header = ctx.client(ctx.patient.user).defaults
+
+    timings = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    started = threading.Event()
+    deadline = 0.0
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        client, patient = Client(), Client(**patient_header)
+        local_timings, local_errors = defaultdict(list), defaultdict(int)
+        try:
+            started.wait()
+            while time.monotonic() < deadline:
+                name = rng.choices(names, weights)[0]
+                began = time.perf_counter()
+                try:
+                    response = runners[name](client, patient, rng)
+                    failed = response.status_code >= 500 or response.status_code in (401, 403)
+                except Exception:
+                    failed = True
+                local_timings[name].append(time.perf_counter() - began)
+                if failed:
+                    local_errors[name] += 1
+        finally:
+            connection.close()
+            with lock:
+                for name, values in local_timings.items():
+                    timings[name].extend(values)
+                for name, count in local_errors.items():
+                    errors[name] += count
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    deadline = time.monotonic() + duration
+    started.set()
+    for thread in pool:
+        thread.join()
+
+    total = sum(len(values) for values in timings.values())
+    operations_report = {}
+    for name in names:
+        values = sorted(timings.get(name, []))
+        operations_report[name] = {
+            'count': len(values),
+            'errors': errors.get(name, 0),
+            'ops_per_sec': round(len(values) / duration, 2),
+            'p50_ms': round(percentile(values, 0.50) * 1000, 3),
+            'p90_ms': round(percentile(values, 0.90) * 1000, 3),
+            'p99_ms': round(percentile(values, 0.99) * 1000, 3),
+        }
+
+    duplicated = list(
+        User.objects.filter(email_normalized__in=race_emails).values('email_normalized')
+        .annotate(n=Count('pk')).filter(n__gt=1).values_list('email_normalized', flat=True)
+    )
+    return {
+        'threads': threads,
+        'duration_s': duration,
+        'requests': total,
+        'requests_per_sec': round(total / duration, 2),
+        'errors': sum(errors.values()),
+        'duplicate_guest_accounts': duplicated,
+        'operations': operations_report,
+    }
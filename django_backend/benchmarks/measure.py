@@ -0,0 +1,118 @@
+# Benchmark Measurement for Hospital Management System
+#
+# A Case is one repeatable operation. measure() times it over a fixed number
+# of iterations after a warmup, then runs it once more with queries captured
+# and once more under tracemalloc, so the bookkeeping of those two passes
+# never shows up in the latency figures.
+
+import gc
+import math
+import time
+import tracemalloc
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+class Case:
+    """A named operation to benchmark.
+
+    call() performs one iteration. items is how many rows/messages/requests
+    one call handles, so throughput can be reported per item as well.
+    setup(), when given, runs untimed before every call. info holds extra
+    figures, possibly filled in by setup(), copied into the result.
+    """
+
+    def __init__(self, name, group, call, setup=None, iterations=None, warmup=None, items=1, note='',
+                 info=None):
+        self.name = name
+        self.group = group
+        self.call = call
+        self.setup = setup or (lambda: None)
+        self.iterations = iterations
+        self.warmup = warmup
+        self.items = items
+        self.note = note
+        self.info = info if info is not None else {}
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, math.ceil(fraction * len(values)) - 1))
+    return values[index]
+
+
+def measure(case, iterations=30, warmup=3):
+    """Run case and return its latency, query and allocation figures"""
+    iterations = case.iterations or iterations
+    warmup = case.warmup if case.warmup is not None else warmup
+    for _ in range(warmup):
+        case.setup()
+        case.call()
+
+    timings = []
+    gc.collect()
+    for _ in range(iterations):
+        case.setup()
+        start = time.perf_counter()
+        case.call()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    case.setup()
+    with CaptureQueriesContext(connection) as queries:
+        case.call()
+    # Read now: the next request resets the log the count is sliced from
+    query_count = len(queries)
+
+    case.setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        case.call()
+        allocated, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    total = sum(timings)
+    ops_per_sec = iterations / total if total else 0.0
+    result = {
+        'name': case.name,
+        'group': case.group,
+        'iterations': iterations,
+        'p50_ms': percentile(timings, 0.50) * 1000,
+        'p90_ms': percentile(timings, 0.90) * 1000,
+        'p99_ms': percentile(timings, 0.99) * 1000,
+        'mean_ms': total / iterations * 1000,
+        'min_ms': timings[0] * 1000,
+        'max_ms': timings[-1] * 1000,
+        'ops_per_sec': ops_per_sec,
+        'queries': query_count,
+        'alloc_kb': allocated / 1024,
+        'alloc_peak_kb': peak / 1024,
+    }
+    if case.items != 1:
+        result['items'] = case.items
+        result['items_per_sec'] = ops_per_sec * case.items
+    if case.note:
+        result['note'] = case.note
+    result.update(case.info)
+    return {key: round(value, 4) if isinstance(value, float) else value for key, value in result.items()}
+
+
+def expect_ok(response):
+    """Raise BenchmarkError unless response is a 2xx or 304"""
+    if not (200 <= response.status_code < 300 or response.status_code == 304):
+        body = getattr(response, 'content', b'')[:200]
+        raise BenchmarkError(f'Unexpected {response.status_code}: {body!r}')
+    if getattr(response, 'streaming', False):
+        # Streaming responses only do their work while being consumed
+        for _ in response.streaming_content:
+            pass
+    return response
@@ -0,0 +1,101 @@
+# Benchmark Reports for Hospital Management System
+#
+# A run is saved as one JSON document: metadata about the environment and
+# scale, one entry per case and the optional load-test summary. compare()
+# lines two runs up case by case; a case regresses when its median latency
+# grows by more than the threshold or it issues more queries than before.
+
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+import django
+from django.db import connection
+
+
+def metadata(scale):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ''
+    return {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'machine': platform.machine(),
+        'scale': scale,
+    }
+
+
+def save(path, run):
+    with open(path, 'w') as out:
+        json.dump(run, out, indent=2, sort_keys=True, default=str)
+
+
+def load(path):
+    with open(path) as source:
+        return json.load(source)
+
+
+def compare(baseline, current, threshold=0.25):
+    """[(name, metric, before, after, change, status)] for every case in either run"""
+    before = {case['name']: case for case in baseline.get('cases', [])}
+    after = {case['name']: case for case in current.get('cases', [])}
+    rows = []
+    for name in sorted(before.keys() | after.keys()):
+        old, new = before.get(name), after.get(name)
+        if old is None or new is None:
+            rows.append((name, '', None, None, None, 'new' if old is None else 'missing'))
+            continue
+        if 'error' in old or 'error' in new:
+            rows.append((name, 'error', old.get('error'), new.get('error'), None,
+                         'error' if 'error' in new else 'fixed'))
+            continue
+        change = (new['p50_ms'] - old['p50_ms']) / old['p50_ms'] if old['p50_ms'] else 0.0
+        status = 'regressed' if change > threshold else 'improved' if change < -threshold else 'ok'
+        rows.append((name, 'p50_ms', old['p50_ms'], new['p50_ms'], change, status))
+        if new['queries'] > old['queries']:
+            rows.append((name, 'queries', old['queries'], new['queries'],
+                         (new['queries'] - old['queries']) / max(old['queries'], 1), 'regressed'))
+    return rows
+
+
+def conditional_savings(cases):
+    """Bandwidth and server time a 304 saves over the full response, per revalidated endpoint"""
+    by_name = {case['name']: case for case in cases if 'error' not in case}
+    savings = []
+    for case in by_name.values():
+        full = by_name.get(case.get('full_case'))
+        if full is None:
+            continue
+        savings.append({
+            'endpoint': full['name'],
+            'full_bytes': case['full_bytes'],
+            'not_modified_bytes': case['bytes'],
+            'bytes_saved': case['full_bytes'] - case['bytes'],
+            'full_p50_ms': full['p50_ms'],
+            'not_modified_p50_ms': case['p50_ms'],
+            'ms_saved': round(full['p50_ms'] - case['p50_ms'], 4),
+            'queries_saved': full['queries'] - case['queries'],
+        })
+    return sorted(savings, key=lambda row: row['endpoint'])
+
+
+def format_rows(rows):
+    lines = [f"{'case':34} {'metric':8} {'baseline':>10} {'current':>10} {'change':>8}  status"]
+    for name, metric, old, new, change, status in rows:
+        change_text = f'{change:+.0%}' if change is not None else ''
+        lines.append(f'{name:34} {metric:8} {_cell(old):>10} {_cell(new):>10} {change_text:>8}  {status}')
+    return '\n'.join(lines)
+
+
+def _cell(value):
+    if value is None:
+        return '-'
+    if isinstance(value, float):
+        return f'{value:.2f}'
+    return str(value)[:10]
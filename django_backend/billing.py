@@ -0,0 +1,92 @@
+# Billing for Hospital Management System
+
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .models import Appointment, Bill, MedicalRecord
+from .notifications import enqueue_notification
+
+CENT = Decimal('0.01')
+# Bill amounts are DecimalField(max_digits=10, decimal_places=2)
+MAX_AMOUNT = Decimal('99999999.99')
+
+
+class BillingError(Exception):
+    pass
+
+
+class BillExists(BillingError):
+    def __init__(self, bill):
+        super().__init__('A bill already exists for this appointment')
+        self.bill = bill
+
+
+def parse_amount(value, field):
+    """Parse a money amount into a Decimal rounded to cents, without going through float"""
+    try:
+        amount = Decimal(str(value).strip())
+    except (InvalidOperation, TypeError):
+        raise BillingError(f'{field} must be a number')
+    if not amount.is_finite() or amount < 0:
+        raise BillingError(f'{field} must be a non-negative amount')
+    # Check the magnitude first: quantize() raises InvalidOperation on huge values
+    if amount > MAX_AMOUNT or amount.quantize(CENT) > MAX_AMOUNT:
+        raise BillingError(f'{field} must be at most {MAX_AMOUNT}')
+    return amount.quantize(CENT)
+
+
+def bill_message(bill):
+    """Return the (subject, message) sent to the patient for a new bill"""
+    subject = 'Medical Bill Generated'
+    message = (f"Your medical bill for ${bill.total_amount} has been generated. "
+               "Please log into your account to view details and make payment.")
+    return subject, message
+
+
+def create_bill(appointment_id, diagnosis, treatment, consultation_fee,
+                medication_cost=0, test_cost=0, other_charges=0):
+    """Create the medical record, bill and bill notification for an appointment in one transaction.
+
+    The appointment row is locked first, so concurrent submissions for the
+    same appointment run one at a time and all but the first get BillExists.
+    """
+    amounts = {
+        'consultation_fee': parse_amount(consultation_fee, 'consultation_fee'),
+        'medication_cost': parse_amount(medication_cost, 'medication_cost'),
+        'test_cost': parse_amount(test_cost, 'tests_cost'),
+        'other_charges': parse_amount(other_charges, 'other_charges'),
+    }
+    if sum(amounts.values()) > MAX_AMOUNT:
+        raise BillingError(f'The bill total must be at most {MAX_AMOUNT}')
+
+    with transaction.atomic():
+        appointment = (Appointment.objects.select_for_update(of=('self',))
+                       .select_related('patient__user').get(pk=appointment_id))
+        existing = Bill.objects.filter(appointment=appointment).first()
+        if existing is not None:
+            raise BillExists(existing)
+        if appointment.doctor_id is None:
+            raise BillingError('Appointment has no assigned doctor')
+        if MedicalRecord.objects.filter(appointment=appointment).exists():
+            raise BillingError('A medical record already exists for this appointment')
+
+        medical_record = MedicalRecord.objects.create(
+            patient=appointment.patient,
+            doctor_id=appointment.doctor_id,
+            appointment=appointment,
+            diagnosis=diagnosis,
+            treatment=treatment,
+        )
+        bill = Bill.objects.create(
+            patient=appointment.patient,
+            doctor_id=appointment.doctor_id,
+            appointment=appointment,
+            medical_record=medical_record,
+            **amounts,
+        )
+        subject, message = bill_message(bill)
+        enqueue_notification(appointment.patient.user, 'bill_generated', subject, message,
+                             coalesce_key=f'bill:{bill.pk}')
+
+    return bill
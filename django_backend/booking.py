@@ -0,0 +1,138 @@
+# Appointment Booking for Hospital Management System
+#
+# create_appointment is public and the busiest write path. The patient is
+# found by User.email_normalized together with its Patient row in one query
+# (users saved before that column existed are matched case-insensitively until
+# backfill_email_normalized has run),
+# guests get an unusable password instead of a hashed placeholder, the
+# department comes from an in-process cache, and the user, patient,
+# appointment and notification commit in a single transaction.
+
+from datetime import datetime
+
+from django.db import IntegrityError, transaction
+
+from .caching import department_cache
+from .models import Appointment, Department, Patient, User
+from .notifications import appointment_message, enqueue_notification
+from .scheduling import department_has_capacity
+
+
+class BookingError(Exception):
+    pass
+
+
+class NoCapacity(BookingError):
+    pass
+
+
+def resolve_department(name):
+    """Return the department called name, creating it if it does not exist yet"""
+    department, version = department_cache.lookup(name)
+    if department is None:
+        department = Department.objects.filter(name=name).order_by('pk').first()
+        if department is None:
+            department = Department.objects.create(name=name)
+        # Only cache it once it is committed
+        transaction.on_commit(lambda: department_cache.remember(department, version))
+    return department
+
+
+def _find_patient(email):
+    patients = Patient.objects.select_related('user').order_by('user_id')
+    patient = patients.filter(user__email_normalized=User.canonical_email(email)).first()
+    if patient is None:
+        # Rows not backfilled yet, and case-only duplicates the backfill left alone
+        patient = patients.filter(user__email_normalized__isnull=True, user__email__iexact=email.strip()).first()
+    return patient
+
+
+def backfill_email_normalized(batch_size=1000):
+    """Fill in User.email_normalized for users saved before it existed; return (filled, conflicts).
+
+    When accounts share an email up to case, the oldest one gets it and the
+    others keep NULL; their pks are returned in conflicts so an admin can merge
+    them. _find_patient still matches those case-insensitively.
+    """
+    filled, conflicts, last_pk = 0, [], 0
+    while True:
+        batch = list(User.objects.filter(pk__gt=last_pk, email_normalized__isnull=True)
+                     .order_by('pk').values_list('pk', 'email')[:batch_size])
+        if not batch:
+            return filled, conflicts
+        last_pk = batch[-1][0]
+
+        wanted = {}
+        for pk, email in batch:
+            canonical = User.canonical_email(email)
+            if canonical is not None:
+                wanted.setdefault(canonical, []).append(pk)
+
+        with transaction.atomic():
+            taken = set(User.objects.filter(email_normalized__in=wanted)
+                        .values_list('email_normalized', flat=True))
+            updates = []
+            for canonical, pks in wanted.items():
+                if canonical in taken:
+                    conflicts.extend(pks)
+                    continue
+                updates.append(User(pk=pks[0], email_normalized=canonical))
+                conflicts.extend(pks[1:])
+            # bulk_update leaves updated_at alone; nothing a client sees has changed
+            User.objects.bulk_update(updates, ['email_normalized'])
+        filled += len(updates)
+
+
+def guest_patient(data):
+    """Return the patient registered under data['email'], registering a guest if there is none"""
+    patient = _find_patient(data['email'])
+    if patient is not None:
+        return patient
+
+    names = data['name'].split()
+    user = User(
+        username=data['email'],
+        email=data['email'],
+        first_name=names[0] if names else '',
+        last_name=' '.join(names[1:]),
+        user_type='patient',
+        phone=data['phone'],
+        address=data['address'],
+    )
+    # Guests sign in through a password reset, so skip hashing a placeholder
+    user.set_unusable_password()
+    try:
+        with transaction.atomic():
+            user.save()
+            return Patient.objects.create(user=user, emergency_contact=data.get('emergencyContact', ''))
+    except IntegrityError:
+        # A concurrent booking registered the same email first
+        patient = _find_patient(data['email'])
+        if patient is None:
+            raise BookingError('This email belongs to an account that cannot book as a patient')
+        return patient
+
+
+def book_appointment(data):
+    """Create a pending appointment for the (possibly new) patient and queue its notification"""
+    appointment_date = datetime.strptime(data['date'], '%Y-%m-%d').date()
+    appointment_time = datetime.strptime(data['time'], '%I:%M %p').time()
+
+    with transaction.atomic():
+        department = resolve_department(data['department'])
+        if not department_has_capacity(department, appointment_date, appointment_time):
+            raise NoCapacity('No doctor is available at the selected time')
+        patient = guest_patient(data)
+        appointment = Appointment.objects.create(
+            patient=patient,
+            department=department,
+            preferred_doctor=data.get('doctor', ''),
+            appointment_date=appointment_date,
+            appointment_time=appointment_time,
+            symptoms=data['symptoms'],
+            status='pending'
+        )
+        subject, message = appointment_message(appointment, 'booking')
+        enqueue_notification(patient.user, 'appointment_booking', subject, message,
+                             coalesce_key=f'appointment:{appointment.pk}')
+    return appointment
@@ -0,0 +1,135 @@
+# Read-through Caches for Hospital Management System
+
+import copy
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class VersionedCache:
+    """Read-through cache whose entries are invalidated by bumping a version.
+
+    Every key embeds the current version, so invalidation is a single incr
+    and stale entries simply age out. Rebuilds take a per-key lock through
+    cache.add() so concurrent misses compute the payload only once.
+    """
+
+    def __init__(self, namespace, alias='default', timeout=300, lock_timeout=10, lock_wait=2.0):
+        self.namespace = namespace
+        self.alias = alias
+        self.timeout = timeout
+        self.lock_timeout = lock_timeout
+        self.lock_wait = lock_wait
+        self.version_key = f'{namespace}:version'
+        self.stats = {'hits': 0, 'misses': 0, 'rebuilds': 0, 'lock_waits': 0, 'invalidations': 0}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _new_version(self):
+        # Never restart at 1 after an eviction, or entries from an older
+        # version 1 could be served again
+        return int(time.time() * 1000)
+
+    def version(self):
+        version = self.cache.get(self.version_key)
+        if version is None:
+            self.cache.add(self.version_key, self._new_version(), timeout=None)
+            version = self.cache.get(self.version_key)
+        return version
+
+    def invalidate(self):
+        """Bump the version and return the new one"""
+        try:
+            version = self.cache.incr(self.version_key)
+        except ValueError:
+            version = self._new_version()
+            self.cache.set(self.version_key, version, timeout=None)
+        self._count('invalidations')
+        return version
+
+    def key(self, *parts):
+        digest = hashlib.md5('\x1f'.join(str(part) for part in parts).encode()).hexdigest()
+        return f'{self.namespace}:v{self.version()}:{digest}'
+
+    def get_or_build(self, parts, build):
+        """Return the cached payload for parts, building it with build() on a miss"""
+        key = self.key(*parts)
+        data = self.cache.get(key)
+        if data is not None:
+            self._count('hits')
+            return data
+
+        self._count('misses')
+        lock_key = f'{key}:lock'
+        if self.cache.add(lock_key, 1, timeout=self.lock_timeout):
+            try:
+                data = build()
+                self.cache.set(key, data, timeout=self.timeout)
+                self._count('rebuilds')
+            finally:
+                self.cache.delete(lock_key)
+            return data
+
+        # Someone else is rebuilding this key; wait briefly for their result
+        self._count('lock_waits')
+        deadline = time.monotonic() + self.lock_wait
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            data = self.cache.get(key)
+            if data is not None:
+                return data
+        return build()
+
+
+doctor_directory_cache = VersionedCache(
+    'doctor_directory',
+    alias=getattr(settings, 'DOCTOR_DIRECTORY_CACHE', 'default'),
+    timeout=getattr(settings, 'DOCTOR_DIRECTORY_CACHE_TIMEOUT', 300),
+)
+
+
+class DepartmentCache:
+    """In-process name -> Department map, dropped whenever the shared version changes.
+
+    Lookups cost one cache get for the version instead of a query; saving
+    or deleting any Department bumps the version in every worker.
+    """
+
+    def __init__(self, versions):
+        self.versions = versions
+        self._departments = {}
+        self._version = None
+        self._lock = threading.Lock()
+
+    def lookup(self, name):
+        """Return (a copy of the cached department or None, the version it was read at)"""
+        version = self.versions.version()
+        with self._lock:
+            if version != self._version:
+                self._departments, self._version = {}, version
+            department = self._departments.get(name)
+        return (copy.copy(department) if department else None), version
+
+    def remember(self, department, version):
+        with self._lock:
+            # A department read before an invalidation must not outlive it
+            if version == self._version:
+                self._departments[department.name] = copy.copy(department)
+
+    def invalidate(self):
+        self.versions.invalidate()
+
+
+department_cache = DepartmentCache(
+    VersionedCache('departments', alias=getattr(settings, 'DEPARTMENT_CACHE', 'default')),
+)
@@ -0,0 +1,72 @@
+# Conditional Requests for Hospital Management System
+#
+# Views describe what their payload depends on, a version counter or the
+# (count, newest updated_at) stamps of the rows it renders, and
+# conditional_response() turns that into an ETag without serializing
+# anything. A matching If-None-Match or If-Modified-Since gets a 304. The
+# Last-Modified date is the moment this server first issued the current ETag
+# for the resource, so deletions and rows restored to an earlier state move it
+# forward too, which max(updated_at) alone would miss. HTTP dates only have
+# whole seconds, so a validator issued within the same second as the one it
+# replaces is dated a second later; otherwise If-Modified-Since could not tell
+# them apart and would answer 304 for a changed payload.
+
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+
+def stamp(queryset, *fields):
+    """(row count, newest value of each field) for queryset, in one aggregate query"""
+    fields = fields or ('updated_at',)
+    aggregates = {f'latest_{i}': Max(field) for i, field in enumerate(fields)}
+    values = queryset.order_by().aggregate(count=Count('pk'), **aggregates)
+    return (values['count'],) + tuple(values[f'latest_{i}'] for i in range(len(fields)))
+
+
+def make_etag(*parts):
+    digest = hashlib.md5('\x1f'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def resource_key(request):
+    """The path, query and caller a response was rendered for"""
+    return f'{request.get_full_path()}|{getattr(request.user, "pk", None)}'
+
+
+def first_issued(resource, etag):
+    """When etag became the current validator of resource, to whole seconds, later than its predecessor"""
+    cache = caches[getattr(settings, 'CONDITIONAL_CACHE', 'default')]
+    key = 'conditional:' + hashlib.md5(resource.encode()).hexdigest()
+    entry = cache.get(key)
+    if entry is None or entry[0] != etag:
+        issued = timezone.now().replace(microsecond=0)
+        if entry is not None and issued <= entry[1]:
+            issued = entry[1] + timedelta(seconds=1)
+        entry = (etag, issued)
+        cache.set(key, entry, timeout=getattr(settings, 'CONDITIONAL_TIMEOUT', 86400))
+    return entry[1]
+
+
+def conditional_response(request, parts, build):
+    """Return 304 when the client's validators match parts, else build()'s response"""
+    resource = resource_key(request)
+    etag = make_etag(resource, *parts)
+    last_modified = first_issued(resource, etag)
+    response = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+    if response is None:
+        response = build()
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+        # Revalidate every time; the payloads are per user and change often
+        response['Cache-Control'] = 'private, no-cache'
+        # Session-authenticated callers are told apart by their cookie
+        patch_vary_headers(response, ('Authorization', 'Cookie'))
+    return response
@@ -0,0 +1,251 @@
+# Finance Exports for Hospital Management System
+#
+# Bills and appointments are exported as CSV, Parquet or an Arrow IPC
+# stream. Rows are read as flat tuples through a server-side cursor in
+# chunks of EXPORT_CHUNK_SIZE and each chunk is encoded and handed on before
+# the next one is fetched, so memory stays flat however many rows match.
+# Parquet and Arrow need pyarrow, which is imported only when used.
+
+import csv
+import io
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import models
+from django.db.models import F, Value
+from django.utils import timezone
+from django.db.models.functions import Coalesce, Concat, Trim
+
+from .models import Appointment, Bill
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+
+
+class ExportError(Exception):
+    pass
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _full_name(prefix):
+    # '' rather than None or a lone space when there is no user or no name
+    return Coalesce(Trim(Concat(f'{prefix}__first_name', Value(' '), f'{prefix}__last_name')), Value(''))
+
+
+class Dataset:
+    """One exportable table: its queryset, filters and typed columns"""
+
+    name = None
+    date_field = None
+    status_filter = None
+    # (column name, Arrow type name)
+    columns = ()
+
+    def queryset(self):
+        raise NotImplementedError
+
+    def rows(self, start=None, end=None, status=None):
+        """Rows whose date_field falls between the start and end dates inclusive"""
+        queryset = self.queryset()
+        # Compare datetimes against day boundaries so the column's index is usable
+        timestamps = isinstance(queryset.model._meta.get_field(self.date_field), models.DateTimeField)
+        if start:
+            queryset = queryset.filter(**{f'{self.date_field}__gte': _day_start(start) if timestamps else start})
+        if end:
+            if timestamps:
+                queryset = queryset.filter(**{f'{self.date_field}__lt': _day_start(end + timedelta(days=1))})
+            else:
+                queryset = queryset.filter(**{f'{self.date_field}__lte': end})
+        if status:
+            queryset = queryset.filter(**{self.status_filter: status})
+        return queryset.order_by(self.date_field, 'pk').values_list(*[name for name, _ in self.columns])
+
+
+class BillDataset(Dataset):
+    name = 'bills'
+    date_field = 'created_at'
+    status_filter = 'payment_status'
+    columns = (
+        ('id', 'string'),
+        ('created_at', 'timestamp'),
+        ('appointment_id', 'string'),
+        ('appointment_date', 'date'),
+        ('patient_id', 'int64'),
+        ('patient_name', 'string'),
+        ('doctor_id', 'int64'),
+        ('doctor_name', 'string'),
+        ('department_name', 'string'),
+        ('consultation_fee', 'decimal'),
+        ('medication_cost', 'decimal'),
+        ('test_cost', 'decimal'),
+        ('other_charges', 'decimal'),
+        ('total_amount', 'decimal'),
+        ('payment_status', 'string'),
+        ('payment_date', 'timestamp'),
+    )
+
+    def queryset(self):
+        return Bill.objects.annotate(
+            appointment_date=F('appointment__appointment_date'),
+            patient_name=_full_name('patient__user'),
+            doctor_name=_full_name('doctor__user'),
+            department_name=Coalesce('doctor__department__name', Value('')),
+        )
+
+
+class AppointmentDataset(Dataset):
+    name = 'appointments'
+    date_field = 'appointment_date'
+    status_filter = 'status'
+    columns = (
+        ('id', 'string'),
+        ('created_at', 'timestamp'),
+        ('appointment_date', 'date'),
+        ('appointment_time', 'time'),
+        ('status', 'string'),
+        ('patient_id', 'int64'),
+        ('patient_name', 'string'),
+        ('doctor_id', 'int64'),
+        ('doctor_name', 'string'),
+        ('department_name', 'string'),
+    )
+
+    def queryset(self):
+        return Appointment.objects.annotate(
+            patient_name=_full_name('patient__user'),
+            doctor_name=_full_name('doctor__user'),
+            department_name=F('department__name'),
+        )
+
+
+DATASETS = {dataset.name: dataset for dataset in (BillDataset(), AppointmentDataset())}
+
+
+def chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 5000)
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows.iterator(chunk_size=size):
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _csv(dataset, rows, size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in dataset.columns])
+    yield buffer.getvalue()
+    for chunk in _chunks(rows, size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+
+
+def _arrow_schema(dataset):
+    import pyarrow as pa
+    types = {
+        'string': pa.string(),
+        'int64': pa.int64(),
+        'decimal': pa.decimal128(10, 2),
+        'date': pa.date32(),
+        'time': pa.time64('us'),
+        'timestamp': pa.timestamp('us', tz=settings.TIME_ZONE if settings.USE_TZ else None),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in dataset.columns])
+
+
+def _record_batch(dataset, schema, chunk):
+    import pyarrow as pa
+    arrays = []
+    for index, ((_, kind), field) in enumerate(zip(dataset.columns, schema)):
+        values = [row[index] for row in chunk]
+        if kind == 'string':
+            values = [None if value is None else str(value) for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file object whose bytes are collected and drained by the generator"""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data, self.parts = b''.join(self.parts), []
+        return data
+
+
+def _parquet(dataset, rows, size):
+    import pyarrow.parquet as pq
+    schema = _arrow_schema(dataset)
+    sink = _Sink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    try:
+        for chunk in _chunks(rows, size):
+            # One row group per chunk
+            writer.write_batch(_record_batch(dataset, schema, chunk))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def _arrow(dataset, rows, size):
+    import pyarrow as pa
+    schema = _arrow_schema(dataset)
+    sink = _Sink()
+    writer = pa.ipc.new_stream(sink, schema)
+    try:
+        for chunk in _chunks(rows, size):
+            writer.write_batch(_record_batch(dataset, schema, chunk))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {'csv': _csv, 'parquet': _parquet, 'arrow': _arrow}
+
+
+def export(dataset_name, output='csv', start=None, end=None, status=None, size=None):
+    """Return (content_type, extension, chunks) for one export; chunks is a generator"""
+    if dataset_name not in DATASETS:
+        raise ExportError(f"Unknown dataset '{dataset_name}'; choose from {', '.join(DATASETS)}")
+    if output not in FORMATS:
+        raise ExportError(f"Unknown output '{output}'; choose from {', '.join(FORMATS)}")
+    if output != 'csv':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ExportError(f'{output} exports require pyarrow to be installed')
+
+    dataset = DATASETS[dataset_name]
+    rows = dataset.rows(start=start, end=end, status=status)
+    content_type, extension = FORMATS[output]
+    return content_type, extension, ENCODERS[output](dataset, rows, size or chunk_size())
@@ -0,0 +1,92 @@
+# Idempotency Keys for Hospital Management System
+#
+# A client that may retry a POST sends an Idempotency-Key header. The first
+# request inserts the key row before doing its work, in the same transaction,
+# and stores its response on it. A concurrent duplicate blocks on the unique
+# key until that transaction finishes and then replays the stored response;
+# later retries are answered with a single indexed lookup.
+
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+
+# Client errors that say "try again later" rather than "this request is wrong"
+RETRYABLE = frozenset({408, 425, 429})
+
+
+def request_hash(data):
+    payload = json.dumps(data, sort_keys=True, cls=JSONEncoder)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def key_ttl():
+    return timedelta(hours=getattr(settings, 'IDEMPOTENCY_KEY_TTL_HOURS', 24))
+
+
+def is_final(response):
+    """Whether a retry of the same request would get the same response, so it can be stored"""
+    return response.status_code < 500 and response.status_code not in RETRYABLE
+
+
+def _replay(record, fingerprint):
+    if record.request_hash != fingerprint:
+        return Response({'error': f'{HEADER} was already used for a different request'}, status=422)
+    return Response(record.response_body, status=record.response_status,
+                    headers={'Idempotent-Replayed': 'true'})
+
+
+def idempotent(request, scope, handler):
+    """Run handler() at most once per (user, scope, Idempotency-Key) and replay its response.
+
+    handler must return a Response whose data is JSON serializable, and
+    return a 4xx only when the request itself is at fault; unexpected errors
+    should propagate. Requests without the header run normally. Only 2xx and
+    validation 4xx responses are stored, so 5xx, 408, 425 and 429 can be retried.
+    """
+    key = request.headers.get(HEADER)
+    if not key:
+        return handler()
+    if len(key) > 255:
+        return Response({'error': f'{HEADER} must be at most 255 characters'}, status=400)
+
+    fingerprint = request_hash(request.data)
+    lookup = dict(user=request.user, scope=scope, key=key)
+    record = IdempotencyKey.objects.filter(**lookup).first()
+    if record is not None:
+        if record.created_at > timezone.now() - key_ttl():
+            return _replay(record, fingerprint)
+        record.delete()
+
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(**lookup, request_hash=fingerprint)
+        except IntegrityError:
+            # A concurrent request with the same key committed first
+            return _replay(IdempotencyKey.objects.get(**lookup), fingerprint)
+
+        # An exception rolls the key back with everything else
+        response = handler()
+        if not is_final(response):
+            transaction.set_rollback(True)
+            return response
+        record.response_status = response.status_code
+        record.response_body = json.loads(json.dumps(response.data, cls=JSONEncoder))
+        record.save(update_fields=['response_status', 'response_body'])
+        return response
+
+
+def prune_idempotency_keys():
+    """Delete keys older than IDEMPOTENCY_KEY_TTL_HOURS; return the number removed"""
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=timezone.now() - key_ttl()).delete()
+    return deleted
@@ -0,0 +1,251 @@
+# Bulk User Import for Hospital Management System
+#
+# Onboards patients, doctors and admins from CSV or JSONL using the same
+# field names as register_user. Rows are validated a batch at a time against
+# one query per unique column, departments are resolved in one query, and
+# users and profiles are written with bulk_create. Supplied passwords are
+# hashed in a thread pool (hashlib's PBKDF2 releases the GIL, and threads need
+# no Django setup under spawn/forkserver); rows without one get an unusable
+# password and a reset token. A bad row is reported and skipped, never the
+# whole batch.
+
+import csv
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import DataError, IntegrityError, transaction
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from .caching import doctor_directory_cache
+from .models import Admin, Department, Doctor, Patient, User
+from .search import doctor_index
+
+REQUIRED_FIELDS = {
+    'patient': ('email', 'firstName', 'lastName'),
+    'doctor': ('email', 'firstName', 'lastName', 'specialization', 'licenseNumber', 'experience'),
+    'admin': ('email', 'firstName', 'lastName', 'employeeId', 'department'),
+}
+
+
+def read_rows(stream, file_format):
+    """Yield dicts from a text stream of CSV (with a header row) or JSON lines"""
+    if file_format == 'csv':
+        yield from csv.DictReader(stream)
+    elif file_format == 'jsonl':
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        raise ValueError(f"Unknown import format '{file_format}'; use csv or jsonl")
+
+
+def _hash_passwords(passwords, workers):
+    if not passwords:
+        return []
+    if workers <= 1 or len(passwords) < 2 * workers:
+        return [make_password(password) for password in passwords]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(make_password, passwords))
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+        self.reset_tokens = []
+
+    def error(self, line, email, message):
+        self.errors.append({'row': line, 'email': email, 'error': message})
+
+    def as_dict(self):
+        return {'created': self.created, 'failed': len(self.errors),
+                'errors': sorted(self.errors, key=lambda error: error['row']), 'reset_tokens': self.reset_tokens}
+
+
+class UserImporter:
+    """Validate and insert users with their role profiles in batches"""
+
+    def __init__(self, batch_size=None, workers=None, dry_run=False):
+        self.batch_size = batch_size or getattr(settings, 'IMPORT_BATCH_SIZE', 1000)
+        self.workers = workers or getattr(settings, 'IMPORT_HASH_WORKERS', None) or os.cpu_count() or 1
+        self.dry_run = dry_run
+        self.report = ImportReport()
+        self.doctors_created = 0
+        self.seen_emails = set()
+        self.seen_licenses = set()
+        self.seen_employee_ids = set()
+
+    def run(self, rows):
+        batch = []
+        for line, row in enumerate(rows, start=1):
+            batch.append((line, row))
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+        if batch:
+            self.import_batch(batch)
+        if self.report.created and not self.dry_run:
+            # bulk_create skips the Doctor signals that keep the directory current
+            doctor_directory_cache.invalidate()
+        if self.doctors_created and not self.dry_run:
+            # ... and the n-gram search index
+            doctor_index.invalidate()
+        return self.report
+
+    def clean(self, line, row):
+        """Return a normalized row dict or None after reporting why it is invalid"""
+        row = {key: (value.strip() if isinstance(value, str) else value) for key, value in row.items() if key}
+        email = (row.get('email') or '').lower()
+        user_type = row.get('userType') or 'patient'
+        if user_type not in REQUIRED_FIELDS:
+            self.report.error(line, email, f'Unknown userType: {user_type}')
+            return None
+        missing = [field for field in REQUIRED_FIELDS[user_type] if row.get(field) in (None, '')]
+        if missing:
+            self.report.error(line, email, f"Missing {', '.join(missing)}")
+            return None
+        try:
+            validate_email(email)
+        except ValidationError:
+            self.report.error(line, email, 'Invalid email')
+            return None
+        if email in self.seen_emails:
+            self.report.error(line, email, 'Duplicate email in import')
+            return None
+        if user_type == 'doctor':
+            try:
+                row['experience'] = int(row['experience'])
+            except (TypeError, ValueError):
+                self.report.error(line, email, 'experience must be a whole number')
+                return None
+            if row['licenseNumber'] in self.seen_licenses:
+                self.report.error(line, email, 'Duplicate licenseNumber in import')
+                return None
+            self.seen_licenses.add(row['licenseNumber'])
+        if user_type == 'admin':
+            if row['employeeId'] in self.seen_employee_ids:
+                self.report.error(line, email, 'Duplicate employeeId in import')
+                return None
+            self.seen_employee_ids.add(row['employeeId'])
+        self.seen_emails.add(email)
+        row['email'], row['userType'] = email, user_type
+        return row
+
+    def import_batch(self, batch):
+        cleaned = [(line, row) for line, row in ((line, self.clean(line, row)) for line, row in batch) if row]
+
+        # One query per unique column for rows already in the database
+        emails = {row['email'] for _, row in cleaned}
+        taken_emails = set(User.objects.filter(email_normalized__in=emails)
+                           .values_list('email_normalized', flat=True))
+        licenses = {row['licenseNumber'] for _, row in cleaned if row['userType'] == 'doctor'}
+        taken_licenses = set(Doctor.objects.filter(license_number__in=licenses)
+                             .values_list('license_number', flat=True))
+        employee_ids = {row['employeeId'] for _, row in cleaned if row['userType'] == 'admin'}
+        taken_employee_ids = set(Admin.objects.filter(employee_id__in=employee_ids)
+                                 .values_list('employee_id', flat=True))
+        valid = []
+        for line, row in cleaned:
+            if row['email'] in taken_emails:
+                self.report.error(line, row['email'], 'A user with this email already exists')
+            elif row['userType'] == 'doctor' and row['licenseNumber'] in taken_licenses:
+                self.report.error(line, row['email'], 'licenseNumber is already registered')
+            elif row['userType'] == 'admin' and row['employeeId'] in taken_employee_ids:
+                self.report.error(line, row['email'], 'employeeId is already registered')
+            else:
+                valid.append((line, row))
+        if self.dry_run:
+            # Report what would be created without hashing or writing anything
+            self.report.created += len(valid)
+            return
+        if not valid:
+            return
+
+        hashed = iter(_hash_passwords([row['password'] for _, row in valid if row.get('password')], self.workers))
+        for _, row in valid:
+            row['password_hash'] = next(hashed) if row.get('password') else make_password(None)
+
+        try:
+            with transaction.atomic():
+                self.insert(valid)
+        except (IntegrityError, DataError):
+            # A value the database rejects, or a user registered meanwhile; isolate the bad rows
+            for line, row in valid:
+                try:
+                    with transaction.atomic():
+                        self.insert([(line, row)])
+                except (IntegrityError, DataError) as e:
+                    self.report.error(line, row['email'], f'Could not be saved: {e}')
+
+    def insert(self, rows):
+        names = {row['specialization'] for _, row in rows if row['userType'] == 'doctor'}
+        departments = {d.name: d for d in Department.objects.filter(name__in=names).order_by('pk')}
+        missing = [Department(name=name) for name in names if name not in departments]
+        for department in Department.objects.bulk_create(missing):
+            departments[department.name] = department
+
+        users = User.objects.bulk_create([
+            User(
+                username=row['email'],
+                email=row['email'],
+                email_normalized=User.canonical_email(row['email']),
+                password=row['password_hash'],
+                first_name=row['firstName'],
+                last_name=row['lastName'],
+                user_type=row['userType'],
+                phone=row.get('phone') or '',
+                address=row.get('address') or '',
+            )
+            for _, row in rows
+        ], batch_size=self.batch_size)
+
+        patients, doctors, admins = [], [], []
+        for (_, row), user in zip(rows, users):
+            if row['userType'] == 'patient':
+                patients.append(Patient(user=user, emergency_contact=row.get('emergencyContact') or ''))
+            elif row['userType'] == 'doctor':
+                doctor = Doctor(
+                    user=user,
+                    specialization=row['specialization'],
+                    license_number=row['licenseNumber'],
+                    experience_years=row['experience'],
+                    department=departments[row['specialization']],
+                )
+                # bulk_create skips Doctor.save()
+                doctor.refresh_denormalized_fields()
+                doctors.append(doctor)
+            else:
+                admins.append(Admin(user=user, employee_id=row['employeeId'], department=row['department']))
+        Patient.objects.bulk_create(patients, batch_size=self.batch_size)
+        Doctor.objects.bulk_create(doctors, batch_size=self.batch_size)
+        self.doctors_created += len(doctors)
+        Admin.objects.bulk_create(admins, batch_size=self.batch_size)
+
+        self.report.created += len(users)
+        for (_, row), user in zip(rows, users):
+            if not user.has_usable_password():
+                self.report.reset_tokens.append({
+                    'email': user.email,
+                    'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+                    'token': default_token_generator.make_token(user),
+                })
+
+
+def import_users(stream, file_format, **options):
+    """Import users from a CSV/JSONL text stream and return the report dict"""
+    return UserImporter(**options).run(read_rows(stream, file_format)).as_dict()
+
+
+def import_uploaded_file(uploaded, file_format=None, **options):
+    """Import from a Django UploadedFile, inferring the format from its extension"""
+    file_format = file_format or os.path.splitext(uploaded.name)[1].lstrip('.').lower()
+    stream = io.TextIOWrapper(uploaded.file, encoding='utf-8-sig')
+    return import_users(stream, file_format, **options)
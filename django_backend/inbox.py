@@ -0,0 +1,125 @@
+# Notification Inbox for Hospital Management System
+#
+# Each user's unread count and newest notification id live in the cache so
+# the badge endpoint and the long-poll loop never touch the database while
+# nothing has changed. Both are updated after the writing transaction commits
+# and fall back to an indexed query when evicted.
+
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import Notification
+
+
+def _cache():
+    return caches[getattr(settings, 'INBOX_CACHE', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'INBOX_CACHE_TIMEOUT', 300)
+
+
+def unread_key(user_id):
+    return f'inbox:unread:{user_id}'
+
+
+def latest_key(user_id):
+    return f'inbox:latest:{user_id}'
+
+
+def unread_count(user):
+    """Cached number of unread notifications for user"""
+    count = _cache().get(unread_key(user.pk))
+    if count is None:
+        count = Notification.objects.filter(recipient=user, is_read=False).count()
+        _cache().set(unread_key(user.pk), count, timeout=_timeout())
+    return count
+
+
+def latest_id(user):
+    """Cached id of the user's newest notification, 0 if there is none"""
+    latest = _cache().get(latest_key(user.pk))
+    if latest is None:
+        latest = (Notification.objects.filter(recipient=user)
+                  .order_by('-id').values_list('id', flat=True).first()) or 0
+        _cache().set(latest_key(user.pk), latest, timeout=_timeout())
+    return latest
+
+
+def _adjust_unread(user_id, delta):
+    try:
+        _cache().incr(unread_key(user_id), delta)
+    except ValueError:
+        # Not cached; the next read recounts
+        pass
+
+
+def record_new(notifications):
+    """Bump counters for freshly created notifications once the transaction commits"""
+    per_user = {}
+    for notification in notifications:
+        count, latest = per_user.get(notification.recipient_id, (0, 0))
+        per_user[notification.recipient_id] = (count + 1, max(latest, notification.pk or 0))
+
+    def apply():
+        cache = _cache()
+        for user_id, (count, latest) in per_user.items():
+            _adjust_unread(user_id, count)
+            if latest:
+                cache.set(latest_key(user_id), latest, timeout=_timeout())
+            else:
+                cache.delete(latest_key(user_id))
+
+    transaction.on_commit(apply)
+
+
+def forget(user_ids):
+    """Drop cached counters after notifications were removed, e.g. by archiving"""
+    def apply():
+        _cache().delete_many([key(user_id) for user_id in user_ids for key in (unread_key, latest_key)])
+
+    transaction.on_commit(apply)
+
+
+def mark_read(user, ids=None):
+    """Mark the given notifications (all when ids is None) read with one UPDATE; return the count"""
+    notifications = Notification.objects.filter(recipient=user, is_read=False)
+    if ids is not None:
+        notifications = notifications.filter(pk__in=ids)
+    updated = notifications.update(is_read=True)
+    if updated:
+        transaction.on_commit(lambda: _adjust_unread(user.pk, -updated))
+    return updated
+
+
+def long_poll_timeout(value=None):
+    """Seconds to wait for a requested timeout, clamped to INBOX_LONG_POLL_TIMEOUT.
+
+    Missing, non-numeric and non-finite values get the maximum.
+    """
+    limit = getattr(settings, 'INBOX_LONG_POLL_TIMEOUT', 25)
+    try:
+        timeout = float(value)
+    except (TypeError, ValueError):
+        return limit
+    if not math.isfinite(timeout):
+        return limit
+    return min(max(timeout, 0), limit)
+
+
+def wait_for_new(user, since_id, timeout=None, interval=1.0):
+    """Block until user has a notification newer than since_id or timeout passes.
+
+    Returns the newest notification id. Only the cache is polled while
+    waiting, so an idle long-poll costs no queries.
+    """
+    deadline = time.monotonic() + long_poll_timeout(timeout)
+    latest = latest_id(user)
+    while latest <= since_id and time.monotonic() < deadline:
+        time.sleep(max(min(interval, deadline - time.monotonic()), 0))
+        latest = latest_id(user)
+    return latest
@@ -0,0 +1,293 @@
+# Request Instrumentation for Hospital Management System
+#
+# InstrumentationMiddleware times every request, counts and times its SQL
+# through connection.execute_wrapper(), flags queries repeated with the same
+# parameters (the usual sign of an N+1), and adds the time spent in external
+# calls wrapped with external_call(). Each request is logged as one JSON line
+# on the hospital.requests logger and folded into per-view histograms that
+# metrics_view serves in the Prometheus text format. The registry is per
+# process; scrape every worker or run a single metrics worker.
+#
+# Admins can profile a single request by sending the PROFILE_HEADER header
+# ('cprofile', or 'pyinstrument' when it is installed); the response body is
+# then replaced by the profile.
+
+import cProfile
+import io
+import json
+import logging
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .permissions import is_hospital_admin
+
+logger = logging.getLogger('hospital.requests')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values"""
+
+    def __init__(self, name, help_text, labels, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0, 0.0]
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted(self._series.items())
+            for label_values, (counts, total_count, total) in series:
+                labels = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, label_values))
+                prefix = f'{labels},' if labels else ''
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+                lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {total_count}')
+                lines.append(f'{self.name}_count{{{labels}}} {total_count}')
+                lines.append(f'{self.name}_sum{{{labels}}} {total}')
+        return lines
+
+
+class CounterMetric:
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, amount, *label_values):
+        with self._lock:
+            self._values[label_values] += amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                labels = ','.join(f'{name}="{_escape(v)}"' for name, v in zip(self.labels, label_values))
+                lines.append(f'{self.name}{{{labels}}} {value}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_SECONDS = Histogram('hospital_request_duration_seconds', 'Wall time per request',
+                            ('view', 'method', 'status'))
+DB_QUERIES = Histogram('hospital_request_db_queries', 'SQL queries per request', ('view',), QUERY_COUNT_BUCKETS)
+DB_SECONDS = Histogram('hospital_request_db_seconds', 'Time spent in SQL per request', ('view',))
+DUPLICATE_QUERIES = CounterMetric('hospital_duplicate_queries_total',
+                                  'Queries repeated with identical SQL and parameters', ('view',))
+EXTERNAL_SECONDS = Histogram('hospital_external_call_seconds', 'Time per external call', ('service',))
+FUNCTION_SECONDS = Histogram('hospital_function_duration_seconds', 'Time per instrumented call', ('name',))
+
+METRICS = [REQUEST_SECONDS, DB_QUERIES, DB_SECONDS, DUPLICATE_QUERIES, EXTERNAL_SECONDS, FUNCTION_SECONDS]
+
+
+class RequestStats:
+    """What one request spent its time on"""
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_seconds = 0.0
+        self.queries = Counter()
+        self.external = defaultdict(float)
+
+    def record_query(self, sql, params, seconds):
+        self.query_count += 1
+        self.db_seconds += seconds
+        try:
+            self.queries[(sql, repr(params))] += 1
+        except Exception:
+            pass
+
+    def duplicates(self):
+        """[(sql, times run)] for statements executed more than once with the same parameters"""
+        return sorted(((sql, n) for (sql, _), n in self.queries.items() if n > 1), key=lambda item: -item[1])
+
+
+_current = ContextVar('hospital_request_stats', default=None)
+
+
+def current_stats():
+    """RequestStats of the request being handled, or None outside a request"""
+    return _current.get()
+
+
+@contextmanager
+def external_call(service):
+    """Time a call to an outside service (SMTP, Twilio, ...)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        EXTERNAL_SECONDS.observe(elapsed, service)
+        stats = current_stats()
+        if stats is not None:
+            stats.external[service] += elapsed
+
+
+def instrument(name):
+    """Decorator recording the wall time of each call under name"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                FUNCTION_SECONDS.observe(time.perf_counter() - start, name)
+        return wrapper
+    return decorator
+
+
+def _query_timer(stats):
+    def wrapper(execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            stats.record_query(sql, params, time.perf_counter() - start)
+    return wrapper
+
+
+def _request_user(request):
+    """The session user, or the token user the API would authenticate"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user
+    from .authentication import CachedTokenAuthentication
+    try:
+        result = CachedTokenAuthentication().authenticate(request)
+    except Exception:
+        return None
+    return result[0] if result else None
+
+
+def _profile(get_response, request, kind):
+    if kind == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            return HttpResponse('pyinstrument is not installed\n', status=501, content_type='text/plain')
+        profiler = Profiler()
+        profiler.start()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.stop()
+        report = profiler.output_text(unicode=True)
+    else:
+        profiler = cProfile.Profile()
+        response = profiler.runcall(get_response, request)
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(
+            getattr(settings, 'PROFILE_MAX_ROWS', 60)
+        )
+        report = out.getvalue()
+    profiled = HttpResponse(report, content_type='text/plain; charset=utf-8')
+    profiled['X-Profiled-Status'] = str(response.status_code)
+    return profiled
+
+
+class InstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.profile_header = 'HTTP_' + getattr(settings, 'PROFILE_HEADER', 'X-Profile').upper().replace('-', '_')
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_query_timer(stats)))
+                response = self.dispatch(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    def dispatch(self, request):
+        kind = request.META.get(self.profile_header, '').lower()
+        if kind and getattr(settings, 'PROFILING_ENABLED', False):
+            if not is_hospital_admin(_request_user(request)):
+                return HttpResponseForbidden('Profiling is limited to admins\n', content_type='text/plain')
+            return _profile(self.get_response, request, kind)
+        return self.get_response(request)
+
+    def record(self, request, response, stats, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name or match._func_path) if match else 'unmatched'
+        duplicates = stats.duplicates()
+        duplicate_count = sum(n - 1 for _, n in duplicates)
+
+        REQUEST_SECONDS.observe(elapsed, view, request.method, response.status_code)
+        DB_QUERIES.observe(stats.query_count, view)
+        DB_SECONDS.observe(stats.db_seconds, view)
+        if duplicate_count:
+            DUPLICATE_QUERIES.inc(duplicate_count, view)
+
+        response['Server-Timing'] = ', '.join(
+            [f'app;dur={elapsed * 1000:.1f}', f'db;dur={stats.db_seconds * 1000:.1f}']
+            + [f'{service};dur={seconds * 1000:.1f}' for service, seconds in stats.external.items()]
+        )
+        slow = elapsed >= getattr(settings, 'SLOW_REQUEST_SECONDS', 1.0)
+        logger.log(logging.WARNING if slow or duplicate_count else logging.INFO, json.dumps({
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 2),
+            'db_queries': stats.query_count,
+            'db_ms': round(stats.db_seconds * 1000, 2),
+            'duplicate_queries': duplicate_count,
+            'top_duplicate': duplicates[0][0][:200] if duplicates else None,
+            'external_ms': {service: round(seconds * 1000, 2) for service, seconds in stats.external.items()},
+        }))
+
+
+def render_metrics():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """Prometheus text exposition, for METRICS_ALLOWED_IPS or hospital admins"""
+    allowed = request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', [])
+    if not allowed and not is_hospital_admin(_request_user(request)):
+        return HttpResponseForbidden('Forbidden\n', content_type='text/plain')
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
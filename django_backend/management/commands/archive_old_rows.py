@@ -0,0 +1,64 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from hospital.idempotency import prune_idempotency_keys
+from hospital.retention import POLICIES, partition_archive_table
+
+
+class Command(BaseCommand):
+    help = 'Move appointments and notifications past their retention horizon into archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tables', nargs='*', metavar='table',
+                            help=f"Tables to archive: {', '.join(POLICIES)} (default: all)")
+        parser.add_argument('--batch-size', type=int,
+                            default=getattr(settings, 'RETENTION_BATCH_SIZE', 500),
+                            help='Rows moved per transaction')
+        parser.add_argument('--pause', type=float,
+                            default=getattr(settings, 'RETENTION_BATCH_PAUSE', 0.5),
+                            help='Seconds to sleep between batches so live traffic keeps its share')
+        parser.add_argument('--max-batches', type=int,
+                            help='Stop after this many batches per table; the next run resumes')
+        parser.add_argument('--days', type=int,
+                            help='Override the configured retention horizon')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many rows are eligible')
+        parser.add_argument('--partition', action='store_true',
+                            help='Convert the archive tables to monthly range partitions first (PostgreSQL)')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        unknown = set(options['tables']) - set(POLICIES)
+        if unknown:
+            raise CommandError(f"Unknown table(s): {', '.join(sorted(unknown))}; choose from {', '.join(POLICIES)}")
+
+        for name in options['tables'] or list(POLICIES):
+            policy = POLICIES[name]
+            cutoff = policy.cutoff(days=options['days'])
+
+            if options['dry_run']:
+                count = policy.eligible(cutoff).count()
+                self.stdout.write(f'{name}: {count} rows older than {cutoff:%Y-%m-%d} would be archived')
+                continue
+
+            if options['partition'] and partition_archive_table(policy.archive_model):
+                self.stdout.write(f'{name}: archive table is range partitioned on created_at')
+
+            moved = batches = 0
+            while options['max_batches'] is None or batches < options['max_batches']:
+                count = policy.archive_batch(cutoff, options['batch_size'])
+                if not count:
+                    break
+                moved += count
+                batches += 1
+                if count == options['batch_size'] and options['pause']:
+                    time.sleep(options['pause'])
+
+            self.stdout.write(f'{name}: archived {moved} rows older than {cutoff:%Y-%m-%d} in {batches} batches')
+
+        if not options['dry_run']:
+            self.stdout.write(f'idempotency keys: pruned {prune_idempotency_keys()} expired keys')
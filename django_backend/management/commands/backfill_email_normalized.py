@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from hospital.booking import backfill_email_normalized
+
+
+class Command(BaseCommand):
+    help = 'Fill in User.email_normalized for users created before the column existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Users updated per transaction')
+
+    def handle(self, *args, **options):
+        filled, conflicts = backfill_email_normalized(batch_size=options['batch_size'])
+        self.stdout.write(f"Normalized emails for {filled} users")
+        if conflicts:
+            self.stdout.write(self.style.WARNING(
+                f"{len(conflicts)} users share an email with an older account up to case and were left "
+                f"unnormalized; merge them and rerun: {', '.join(str(pk) for pk in conflicts)}"
+            ))
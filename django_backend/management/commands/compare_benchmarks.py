@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from hospital.benchmarks import report
+
+
+class Command(BaseCommand):
+    help = 'Compare two run_benchmarks result files and report regressions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('baseline', help='Results of the reference run')
+        parser.add_argument('current', help='Results of the run to check')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Relative p50 slowdown that counts as a regression')
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help='Exit with an error when a case regressed')
+
+    def handle(self, *args, **options):
+        baseline, current = report.load(options['baseline']), report.load(options['current'])
+        for label, run in (('baseline', baseline), ('current', current)):
+            meta = run.get('meta', {})
+            self.stdout.write(f"{label}: {meta.get('commit') or '?'} on {meta.get('database')} "
+                              f"at {meta.get('scale')}")
+        rows = report.compare(baseline, current, threshold=options['threshold'])
+        self.stdout.write(report.format_rows(rows))
+
+        regressed = sorted({row[0] for row in rows if row[5] == 'regressed'})
+        if regressed and options['fail_on_regression']:
+            raise CommandError('Regressions in: ' + ', '.join(regressed))
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from hospital.notifications import Dispatcher
+from hospital.transports import close_transports
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued email and SMS notifications from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the currently due deliveries and exit')
+        parser.add_argument('--workers', type=int, help='Size of the delivery thread pool')
+        parser.add_argument('--batch-size', type=int, help='Deliveries claimed per poll')
+        parser.add_argument('--max-attempts', type=int, help='Attempts before a delivery is marked failed')
+        parser.add_argument('--email-concurrency', type=int, help='Concurrent SMTP sends')
+        parser.add_argument('--email-batch-size', type=int, help='Emails sent per SMTP connection checkout')
+        parser.add_argument('--sms-concurrency', type=int, help='Concurrent SMS sends')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to sleep when the outbox is empty')
+
+    def handle(self, *args, **options):
+        concurrency = {}
+        if options['email_concurrency']:
+            concurrency['email'] = options['email_concurrency']
+        if options['sms_concurrency']:
+            concurrency['sms'] = options['sms_concurrency']
+
+        dispatcher = Dispatcher(
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+            max_attempts=options['max_attempts'],
+            concurrency=concurrency,
+            email_batch_size=options['email_batch_size'],
+        )
+
+        try:
+            while True:
+                processed = dispatcher.run_once()
+                if not processed:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            close_transports()
+
+        self.stdout.write(
+            f"Sent {dispatcher.stats['sent']}, "
+            f"retried {dispatcher.stats['retried']}, "
+            f"failed {dispatcher.stats['failed']}, "
+            f"saved {dispatcher.stats['saved']} by coalescing"
+        )
@@ -0,0 +1,45 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hospital.exports import DATASETS, FORMATS, ExportError, export
+from hospital.scheduling import parse_date
+
+
+class Command(BaseCommand):
+    help = 'Export bills or appointments as CSV, Parquet or Arrow with constant memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=list(DATASETS))
+        parser.add_argument('--output', choices=list(FORMATS), default='csv')
+        parser.add_argument('--file', help='Destination path (default: stdout)')
+        parser.add_argument('--start', type=parse_date, help='First day to include, YYYY-MM-DD')
+        parser.add_argument('--end', type=parse_date, help='Last day to include, YYYY-MM-DD')
+        parser.add_argument('--status', default='', help='Only rows with this payment/appointment status')
+        parser.add_argument('--chunk-size', type=int, help='Rows fetched and encoded per chunk')
+
+    def handle(self, *args, **options):
+        try:
+            _, _, chunks = export(
+                options['dataset'],
+                output=options['output'],
+                start=options['start'],
+                end=options['end'],
+                status=options['status'],
+                size=options['chunk_size'],
+            )
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        out = open(options['file'], 'wb') if options['file'] else sys.stdout.buffer
+        written = 0
+        try:
+            for chunk in chunks:
+                data = chunk.encode() if isinstance(chunk, str) else chunk
+                out.write(data)
+                written += len(data)
+        finally:
+            if options['file']:
+                out.close()
+        if options['file']:
+            self.stdout.write(f"Wrote {written} bytes to {options['file']}")
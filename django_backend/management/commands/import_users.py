@@ -0,0 +1,43 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hospital.importer import UserImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Bulk-register patients, doctors and admins from a CSV or JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV with a header row, or JSON lines, using register_user field names')
+        parser.add_argument('--format', dest='file_format', choices=['csv', 'jsonl'],
+                            help='Input format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, help='Rows validated and inserted per transaction')
+        parser.add_argument('--workers', type=int, help='Threads hashing supplied passwords')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only; write nothing')
+        parser.add_argument('--report', help='Write per-row errors and reset tokens to this JSON file')
+
+    def handle(self, *args, **options):
+        file_format = options['file_format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        if file_format not in ('csv', 'jsonl'):
+            raise CommandError('Pass --format csv or --format jsonl')
+
+        importer = UserImporter(
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            dry_run=options['dry_run'],
+        )
+        with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+            report = importer.run(read_rows(stream, file_format)).as_dict()
+
+        if options['report']:
+            with open(options['report'], 'w') as out:
+                json.dump(report, out, indent=2)
+        else:
+            for error in report['errors']:
+                self.stderr.write(f"row {error['row']} ({error['email']}): {error['error']}")
+
+        verb = 'Would create' if options['dry_run'] else 'Created'
+        self.stdout.write(f"{verb} {report['created']} users; {report['failed']} rows failed; "
+                          f"{len(report['reset_tokens'])} need a password reset")
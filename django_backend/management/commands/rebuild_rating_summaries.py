@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from hospital.ratings import rebuild_rating_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild DoctorRatingSummary rows from DoctorRating in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Doctors reconciled per transaction')
+        parser.add_argument('--doctor', type=int, action='append', dest='doctor_ids',
+                            help='Only rebuild this doctor (repeatable)')
+
+    def handle(self, *args, **options):
+        processed = rebuild_rating_summaries(
+            doctor_ids=options['doctor_ids'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(f"Rebuilt rating summaries for {processed} doctors")
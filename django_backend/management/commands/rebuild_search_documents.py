@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from hospital.search import rebuild_search_documents
+
+
+class Command(BaseCommand):
+    help = 'Recompute Doctor.normalized_name and search_document, e.g. for doctors created before they existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Doctors recomputed per query')
+
+    def handle(self, *args, **options):
+        changed = rebuild_search_documents(batch_size=options['batch_size'])
+        self.stdout.write(f"Updated search fields for {changed} doctors")
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from hospital.rollups import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute analytics rollups for days with bills or appointments updated since the last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Rebuild every day instead of only recently updated ones')
+        parser.add_argument('--batch-days', type=int, default=31,
+                            help='Days recomputed per transaction')
+
+    def handle(self, *args, **options):
+        days = refresh_rollups(full=options['full'], batch_days=options['batch_days'])
+        self.stdout.write(f"Recomputed rollups for {days} days")
@@ -0,0 +1,117 @@
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+
+from hospital.benchmarks import report
+from hospital.benchmarks.cases import BenchmarkContext, all_cases
+from hospital.benchmarks.load import run_load
+from hospital.benchmarks.measure import measure
+from hospital.models import User
+from hospital.synthetic import seed
+
+
+class Command(BaseCommand):
+    help = ('Seed a throwaway test database, benchmark endpoints and components, '
+            'optionally drive a mixed load, and write the results as JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patients', type=int, default=2000, help='Synthetic patients to seed')
+        parser.add_argument('--doctors', type=int, default=100, help='Synthetic doctors to seed')
+        parser.add_argument('--random-seed', type=int, default=0, help='Seed for data and load generation')
+        parser.add_argument('--only', nargs='*', default=[],
+                            help='Run only cases whose name contains one of these (or a group name)')
+        parser.add_argument('--iterations', type=int, default=30, help='Timed calls per case')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed calls before timing')
+        parser.add_argument('--load', action='store_true', help='Also run the mixed-workload load driver')
+        parser.add_argument('--threads', type=int, default=8, help='Load driver client threads')
+        parser.add_argument('--duration', type=float, default=10.0, help='Load driver duration in seconds')
+        parser.add_argument('--output', default='benchmark-results.json', help='Where to write the results')
+        parser.add_argument('--baseline', help='Earlier results to compare against')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Relative p50 slowdown that counts as a regression')
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help='Exit with an error when the comparison finds a regression')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Keep the seeded test database and reuse it on the next run')
+
+    def handle(self, *args, **options):
+        baseline = report.load(options['baseline']) if options['baseline'] else None
+        for connection in connections.all():
+            # Threads in the load driver cannot share an in-memory SQLite database
+            if connection.vendor == 'sqlite' and not connection.settings_dict['TEST'].get('NAME'):
+                connection.settings_dict['TEST']['NAME'] = os.path.join(
+                    tempfile.gettempdir(), f'hospital_benchmarks_{connection.alias}.sqlite3'
+                )
+
+        setup_test_environment(debug=False)
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'])
+        request_logger = logging.getLogger('hospital.requests')
+        request_logger.disabled = True
+        try:
+            run = self.run(options)
+        finally:
+            request_logger.disabled = False
+            teardown_databases(old_config, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        report.save(options['output'], run)
+        self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline is not None:
+            rows = report.compare(baseline, run, threshold=options['threshold'])
+            self.stdout.write(report.format_rows(rows))
+            regressed = [row[0] for row in rows if row[5] == 'regressed']
+            if regressed and options['fail_on_regression']:
+                raise CommandError('Regressions in: ' + ', '.join(sorted(set(regressed))))
+
+    def run(self, options):
+        scale = {'patients': options['patients'], 'doctors': options['doctors'],
+                 'random_seed': options['random_seed']}
+        seeding = None
+        if not User.objects.filter(username__startswith='synthetic-').exists():
+            started = time.perf_counter()
+            counts = seed(patients=options['patients'], doctors=options['doctors'],
+                          random_seed=options['random_seed'])
+            seeding = {'seconds': round(time.perf_counter() - started, 2), 'rows': counts}
+            self.stdout.write(f"Seeded {counts} in {seeding['seconds']}s")
+
+        ctx = BenchmarkContext()
+        results = []
+        for case in all_cases(ctx, options['only']):
+            try:
+                result = measure(case, iterations=options['iterations'], warmup=options['warmup'])
+            except Exception as e:
+                result = {'name': case.name, 'group': case.group, 'error': f'{type(e).__name__}: {e}'}
+                self.stderr.write(f"{case.name:34} ERROR {result['error']}")
+            else:
+                extra = f"  {result['items_per_sec']:.0f} items/s" if 'items_per_sec' in result else ''
+                self.stdout.write(f"{case.name:34} p50 {result['p50_ms']:9.2f} ms  p99 {result['p99_ms']:9.2f} ms  "
+                                  f"{result['queries']:4} queries  {result['alloc_peak_kb']:9.0f} KiB peak{extra}")
+            results.append(result)
+
+        savings = report.conditional_savings(results)
+        for row in savings:
+            self.stdout.write(f"{row['endpoint']:34} 304 saves {row['bytes_saved']} bytes and "
+                              f"{row['ms_saved']:.2f} ms ({row['queries_saved']} queries) per poll")
+
+        load = None
+        if options['load']:
+            load = run_load(ctx, threads=options['threads'], duration=options['duration'],
+                            seed=options['random_seed'])
+            self.stdout.write(f"Load: {load['requests_per_sec']} req/s over {load['threads']} threads, "
+                              f"{load['errors']} errors, duplicate guests {load['duplicate_guest_accounts']}")
+
+        meta = report.metadata(scale)
+        # ru_maxrss is KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        meta['peak_rss_mb'] = round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+        return {'meta': meta, 'seeding': seeding, 'cases': results, 'conditional': savings, 'load': load}
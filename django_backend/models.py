@@ -1,7 +1,10 @@
 # Django Models for Hospital Management System
 
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models import Avg, Count, F, FloatField, Q
+from django.db.models.functions import Cast, Coalesce, NullIf
 from django.utils import timezone
 import uuid
 
@@ -14,17 +17,60 @@ class User(AbstractUser):
     user_type = models.CharField(max_length=10, choices=USER_TYPES, default='patient')
     phone = models.CharField(max_length=20, blank=True)
     address = models.TextField(blank=True)
+    # Lower-cased email for case-insensitive lookups; kept in sync by save()
+    email_normalized = models.CharField(max_length=254, unique=True, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    @staticmethod
+    def canonical_email(email):
+        return (email or '').strip().lower() or None
+
+    def save(self, *args, **kwargs):
+        self.email_normalized = self.canonical_email(self.email)
+        super().save(*args, **kwargs)
+
 class Department(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
+class DoctorQuerySet(models.QuerySet):
+    def with_rating_stats(self):
+        """Annotate rating_avg and rating_count, computed in the database"""
+        if getattr(settings, 'DOCTOR_RATING_SUMMARY_ENABLED', False):
+            return self.annotate(
+                rating_count=Coalesce(F('rating_summary__count'), 0),
+                rating_avg=Cast(F('rating_summary__total'), FloatField()) / NullIf(F('rating_summary__count'), 0),
+            )
+        return self.annotate(rating_avg=Avg('ratings__rating'), rating_count=Count('ratings'))
+
+    def resolve(self, doctor_ids=(), names=()):
+        """Look up doctors by id and by display name in a single indexed query.
+
+        Returns (by_id, by_name). by_name maps each requested name to the list
+        of doctors whose normalized full name equals it, so callers can tell a
+        missing doctor from an ambiguous one.
+        """
+        normalized = {name: Doctor.normalize_name(name) for name in names}
+        if not doctor_ids and not normalized:
+            return {}, {}
+        doctors = list(
+            self.select_related('user')
+            .filter(Q(pk__in=doctor_ids) | Q(normalized_name__in=normalized.values()))
+            .order_by('pk')
+        )
+        by_id = {doctor.pk: doctor for doctor in doctors}
+        by_name = {
+            name: [doctor for doctor in doctors if doctor.normalized_name == key]
+            for name, key in normalized.items()
+        }
+        return by_id, by_name
+
 class Doctor(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     specialization = models.CharField(max_length=100)
@@ -35,6 +81,42 @@ class Doctor(models.Model):
     consultation_fee = models.DecimalField(max_digits=10, decimal_places=2, default=100.00)
     available_from = models.TimeField(null=True, blank=True)
     available_to = models.TimeField(null=True, blank=True)
+    # Denormalized from User/Department: exact-name lookups and search indexes
+    normalized_name = models.CharField(max_length=301, blank=True, db_index=True, editable=False)
+    search_document = models.TextField(blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = DoctorQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at'], name='doctor_updated_idx'),
+        ]
+
+    @staticmethod
+    def make_search_document(*parts):
+        return ' '.join(part for part in parts if part).lower()
+
+    @staticmethod
+    def normalize_name(name):
+        """Casefold a name and drop a leading title, so 'Dr. Jane  Doe' becomes 'jane doe'"""
+        words = name.replace('.', ' ').casefold().split()
+        if words and words[0] in ('dr', 'doctor'):
+            words = words[1:]
+        return ' '.join(words)
+
+    def refresh_denormalized_fields(self):
+        self.normalized_name = self.normalize_name(f'{self.user.first_name} {self.user.last_name}')
+        self.search_document = self.make_search_document(
+            self.user.first_name,
+            self.user.last_name,
+            self.specialization,
+            self.department.name if self.department_id else '',
+        )
+
+    def save(self, *args, **kwargs):
+        self.refresh_denormalized_fields()
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Dr. {self.user.first_name} {self.user.last_name}"
@@ -45,13 +127,40 @@ class DoctorRating(models.Model):
     rating = models.PositiveSmallIntegerField(default=5)
     comment = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['doctor', 'updated_at'], name='rating_doctor_updated_idx'),
+        ]
 
     def __str__(self):
         return f"Rating {self.rating} for {self.doctor}"
 
+class DoctorRatingSummary(models.Model):
+    """Denormalized per-doctor rating totals, maintained by signals on DoctorRating"""
+    doctor = models.OneToOneField(Doctor, on_delete=models.CASCADE, primary_key=True, related_name='rating_summary')
+    count = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def average(self):
+        return self.total / self.count if self.count else None
+
+    @property
+    def histogram(self):
+        return {star: getattr(self, f'stars_{star}') for star in range(1, 6)}
+
+    def __str__(self):
+        return f"Rating summary for {self.doctor}"
+
 class Patient(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     emergency_contact = models.CharField(max_length=20, blank=True)
@@ -92,6 +201,20 @@ class Appointment(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='appt_status_created_idx'),
+            models.Index(fields=['-created_at'], name='appt_pending_created_idx',
+                         condition=models.Q(status='pending')),
+            models.Index(fields=['doctor', 'appointment_date'], name='appt_doctor_date_idx'),
+            models.Index(fields=['patient', 'status', 'appointment_date'], name='appt_patient_status_date_idx'),
+            models.Index(fields=['updated_at'], name='appt_updated_idx'),
+        ]
+        constraints = [
+            # A doctor can hold only one approved appointment per slot
+            models.UniqueConstraint(fields=['doctor', 'appointment_date', 'appointment_time'],
+                                    condition=models.Q(status='approved'),
+                                    name='appt_unique_approved_slot'),
+        ]
 
     def __str__(self):
         return f"Appointment {self.id} - {self.patient} with {self.doctor}"
@@ -129,6 +252,14 @@ class Bill(models.Model):
     payment_status = models.CharField(max_length=20, choices=PAYMENT_STATUS, default='pending')
     payment_date = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['patient', 'payment_status'], name='bill_patient_status_idx'),
+            models.Index(fields=['created_at'], name='bill_created_idx'),
+            models.Index(fields=['updated_at'], name='bill_updated_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         self.total_amount = self.consultation_fee + self.medication_cost + self.test_cost + self.other_charges
@@ -141,6 +272,7 @@ class Notification(models.Model):
     NOTIFICATION_TYPES = [
         ('appointment_booking', 'Appointment Booking'),
         ('appointment_approval', 'Appointment Approval'),
+        ('appointment_rejection', 'Appointment Rejection'),
         ('appointment_reminder', 'Appointment Reminder'),
         ('bill_generated', 'Bill Generated'),
         ('payment_received', 'Payment Received'),
@@ -157,6 +289,164 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', 'is_read', '-created_at'], name='notif_recipient_unread_idx'),
+            models.Index(fields=['recipient', '-created_at'], name='notif_recipient_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Notification - {self.recipient} - {self.title}"
+
+class NotificationDelivery(models.Model):
+    CHANNELS = [
+        ('email', 'Email'),
+        ('sms', 'SMS'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+        ('merged', 'Merged into digest'),
+        ('superseded', 'Superseded'),
+    ]
+
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='deliveries')
+    # Deliveries about the same object share a key so later events can supersede earlier ones
+    coalesce_key = models.CharField(max_length=64, blank=True)
+    digest = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True,
+                               related_name='merged_deliveries')
+    channel = models.CharField(max_length=10, choices=CHANNELS)
+    destination = models.CharField(max_length=254)
+    subject = models.CharField(max_length=200, blank=True)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='delivery_status_due_idx'),
+            models.Index(fields=['destination', 'status'], name='delivery_dest_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_channel_display()} to {self.destination} - {self.status}"
+
+# Archive tables. Rows are copied here by the archive_old_rows command and
+# deleted from the hot tables; related ids are kept as plain values so the
+# archive never cascades with, or blocks deletes of, live rows.
+
+class ArchivedAppointment(models.Model):
+    id = models.UUIDField(primary_key=True)
+    patient_id = models.BigIntegerField()
+    doctor_id = models.BigIntegerField(null=True, blank=True)
+    department_id = models.BigIntegerField()
+    preferred_doctor = models.CharField(max_length=100, blank=True)
+    appointment_date = models.DateField()
+    appointment_time = models.TimeField()
+    symptoms = models.TextField()
+    status = models.CharField(max_length=20, choices=Appointment.STATUS_CHOICES)
+    notes = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['patient_id', 'status'], name='archappt_patient_status_idx'),
+            models.Index(fields=['patient_id', '-created_at'], name='archappt_patient_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived appointment {self.id}"
+
+class ArchivedNotification(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    recipient_id = models.BigIntegerField()
+    notification_type = models.CharField(max_length=30, choices=Notification.NOTIFICATION_TYPES)
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    is_read = models.BooleanField(default=False)
+    email_sent = models.BooleanField(default=False)
+    sms_sent = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient_id', '-created_at'], name='archnotif_recipient_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived notification - {self.recipient_id} - {self.title}"
+
+class IdempotencyKey(models.Model):
+    """Stored response for a client-supplied Idempotency-Key, replayed on retries"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    scope = models.CharField(max_length=50)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    # Filled in before the creating transaction commits, so never seen empty by others
+    response_status = models.PositiveSmallIntegerField(null=True)
+    response_body = models.JSONField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'scope', 'key'], name='idempotency_user_scope_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.key} - {self.response_status}"
+
+# Daily rollups for analytics, maintained incrementally by rollups.py.
+# Doctor and department are plain ids (0 when unset) so the unique keys hold
+# without NULLs and the rollups never cascade with live rows.
+
+class DailyRevenue(models.Model):
+    day = models.DateField()
+    doctor_id = models.BigIntegerField(default=0)
+    department_id = models.BigIntegerField(default=0)
+    payment_status = models.CharField(max_length=20, choices=Bill.PAYMENT_STATUS)
+    bill_count = models.IntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'doctor_id', 'department_id', 'payment_status'],
+                                    name='revenue_rollup_key'),
+        ]
+
+    def __str__(self):
+        return f"Revenue {self.day} doctor {self.doctor_id} {self.payment_status}: {self.total_amount}"
+
+class DailyAppointmentCount(models.Model):
+    day = models.DateField()
+    doctor_id = models.BigIntegerField(default=0)
+    department_id = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=Appointment.STATUS_CHOICES)
+    appointment_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'doctor_id', 'department_id', 'status'],
+                                    name='appointment_rollup_key'),
+        ]
+
+    def __str__(self):
+        return f"Appointments {self.day} doctor {self.doctor_id} {self.status}: {self.appointment_count}"
+
+class RollupWatermark(models.Model):
+    """How far the incremental rollup job has read each source table by updated_at"""
+    source = models.CharField(max_length=50, primary_key=True)
+    updated_at = models.DateTimeField()
 
     def __str__(self):
-        return f"Notification - {self.recipient} - {self.title}"
\ No newline at end of file
+        return f"{self.source} up to {self.updated_at}"
@@ -0,0 +1,347 @@
+# Notification Outbox for Hospital Management System
+#
+# Views never talk to SMTP or Twilio directly. They call enqueue_notification(),
+# or enqueue_notifications() for batches, inside their own transaction; it
+# writes each Notification row together with one pending NotificationDelivery
+# per channel. The dispatch_notifications management command drains the
+# outbox with retries and backoff.
+#
+# Deliveries are held for NOTIFICATION_COALESCE_WINDOW seconds before they
+# become due. When the dispatcher claims one, it also pulls in every other
+# unsent delivery to the same destination, drops events superseded by a later
+# event about the same object, and sends what is left as a single digest.
+
+import random
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import inbox
+from .models import Notification, NotificationDelivery
+from .transports import build_email, get_email_transport, get_sms_client, reap_transports
+
+
+def appointment_message(appointment, notification_type):
+    """Return the (subject, message) sent to the patient for an appointment event"""
+    if notification_type == 'booking':
+        subject = 'Appointment Booking Confirmation'
+        message = (f"Your appointment has been booked for {appointment.appointment_date} "
+                   f"at {appointment.appointment_time}. Waiting for admin approval.")
+    elif notification_type == 'approval':
+        subject = 'Appointment Approved'
+        message = (f"Your appointment with {appointment.doctor} on {appointment.appointment_date} "
+                   f"at {appointment.appointment_time} has been approved.")
+    elif notification_type == 'rejection':
+        subject = 'Appointment Cancelled'
+        message = (f"Your appointment for {appointment.appointment_date} has been cancelled. "
+                   "Please contact us for rescheduling.")
+    else:
+        raise ValueError(f'Unknown appointment notification type: {notification_type}')
+    return subject, message
+
+
+def coalesce_window():
+    return timedelta(seconds=getattr(settings, 'NOTIFICATION_COALESCE_WINDOW', 60))
+
+
+def enqueue_notifications(entries):
+    """Record notifications and queue their email/SMS deliveries atomically.
+
+    entries is an iterable of (recipient, notification_type, title, message)
+    with an optional fifth coalesce key such as 'appointment:<id>'; everything
+    is written with two bulk inserts however many entries there are.
+    """
+    entries = [tuple(entry) + ('',) * (5 - len(entry)) for entry in entries]
+    with transaction.atomic():
+        notifications = Notification.objects.bulk_create([
+            Notification(
+                recipient=recipient,
+                notification_type=notification_type,
+                title=title,
+                message=message,
+            )
+            for recipient, notification_type, title, message, _ in entries
+        ])
+
+        due = timezone.now() + coalesce_window()
+        deliveries = []
+        for notification, entry in zip(notifications, entries):
+            recipient, key = notification.recipient, entry[4]
+            if recipient.email:
+                deliveries.append(NotificationDelivery(
+                    notification=notification,
+                    channel='email',
+                    destination=recipient.email,
+                    subject=notification.title,
+                    body=notification.message,
+                    coalesce_key=key,
+                    next_attempt_at=due,
+                ))
+            if recipient.phone and hasattr(settings, 'TWILIO_ACCOUNT_SID'):
+                deliveries.append(NotificationDelivery(
+                    notification=notification,
+                    channel='sms',
+                    destination=recipient.phone,
+                    body=notification.message,
+                    coalesce_key=key,
+                    next_attempt_at=due,
+                ))
+        NotificationDelivery.objects.bulk_create(deliveries)
+        inbox.record_new(notifications)
+
+    return notifications
+
+
+def enqueue_notification(recipient, notification_type, title, message, coalesce_key=''):
+    """Record a notification and queue its email/SMS deliveries atomically"""
+    return enqueue_notifications([(recipient, notification_type, title, message, coalesce_key)])[0]
+
+
+# Channel senders
+
+def send_sms_delivery(delivery):
+    get_sms_client().send(delivery.body, delivery.destination)
+
+
+CHANNELS = ('email', 'sms')
+
+SENT_FLAGS = {
+    'email': 'email_sent',
+    'sms': 'sms_sent',
+}
+
+
+# Coalescing
+
+# (first, last) event types for one object that cancel out entirely: a
+# booking cancelled before the patient heard about it needs no message at all
+CANCELLING_EVENTS = {
+    ('appointment_booking', 'appointment_rejection'),
+}
+
+
+def resolve_superseded(deliveries):
+    """Split deliveries, oldest first, into (kept, superseded).
+
+    Of several events sharing a coalesce key only the latest is kept, unless
+    the first and last of them cancel each other out, in which case none is.
+    """
+    kept, superseded = [], []
+    by_key = defaultdict(list)
+    for delivery in deliveries:
+        if delivery.coalesce_key:
+            by_key[delivery.coalesce_key].append(delivery)
+        else:
+            kept.append(delivery)
+    for events in by_key.values():
+        first, last = events[0].notification.notification_type, events[-1].notification.notification_type
+        if (first, last) in CANCELLING_EVENTS:
+            superseded.extend(events)
+        else:
+            kept.append(events[-1])
+            superseded.extend(events[:-1])
+    kept.sort(key=lambda d: (d.created_at, d.pk))
+    return kept, superseded
+
+
+def digest_message(deliveries):
+    """Return the (subject, body) of one message standing in for several"""
+    if len(deliveries) == 1:
+        return deliveries[0].subject, deliveries[0].body
+    if deliveries[0].channel == 'sms':
+        return '', '\n'.join(d.body for d in deliveries)
+    subject = f'You have {len(deliveries)} new notifications'
+    body = '\n\n'.join(f'{d.subject}\n{d.body}' if d.subject else d.body for d in deliveries)
+    return subject, body
+
+
+# Dispatcher
+
+class Dispatcher:
+    """Drain due NotificationDelivery rows using a thread pool.
+
+    Rows are claimed by moving them to 'sending' with a lease, so several
+    dispatcher processes can run side by side; a row whose worker died is
+    picked up again once its lease expires. Each channel has its own
+    concurrency limit so a slow SMS provider cannot starve email. Emails are
+    sent in chunks of email_batch_size over one pooled SMTP connection.
+    """
+
+    def __init__(self, workers=None, batch_size=None, max_attempts=None,
+                 backoff=None, max_backoff=None, lease=None, concurrency=None,
+                 email_batch_size=None):
+        self.workers = workers or getattr(settings, 'NOTIFICATION_WORKERS', 4)
+        self.batch_size = batch_size or getattr(settings, 'NOTIFICATION_BATCH_SIZE', 100)
+        self.max_attempts = max_attempts or getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5)
+        self.backoff = backoff or getattr(settings, 'NOTIFICATION_RETRY_BACKOFF', 30)
+        self.max_backoff = max_backoff or getattr(settings, 'NOTIFICATION_MAX_BACKOFF', 3600)
+        self.lease = lease or getattr(settings, 'NOTIFICATION_LEASE_SECONDS', 300)
+        self.email_batch_size = email_batch_size or getattr(settings, 'NOTIFICATION_EMAIL_BATCH_SIZE', 20)
+
+        limits = dict(getattr(settings, 'NOTIFICATION_CHANNEL_CONCURRENCY', {}))
+        limits.update(concurrency or {})
+        self.semaphores = {
+            channel: threading.BoundedSemaphore(limits.get(channel, self.workers))
+            for channel in CHANNELS
+        }
+        self.stats = {'sent': 0, 'retried': 0, 'failed': 0, 'saved': 0}
+        self._stats_lock = threading.Lock()
+
+    def claim_batch(self):
+        """Lease up to batch_size due deliveries and return them"""
+        return self._claim()[0]
+
+    def _claim(self):
+        """claim_batch(), also returning how many rows it took: sent plus folded into a digest"""
+        now = timezone.now()
+        with transaction.atomic():
+            due = list(
+                NotificationDelivery.objects
+                .select_for_update(skip_locked=True, of=('self',))
+                .filter(status__in=['pending', 'sending'], next_attempt_at__lte=now)
+                .select_related('notification')
+                .order_by('next_attempt_at')[:self.batch_size]
+            )
+            due, folded = self.coalesce(due)
+            for delivery in due:
+                delivery.status = 'sending'
+                delivery.attempts += 1
+                delivery.next_attempt_at = now + timedelta(seconds=self.lease)
+            NotificationDelivery.objects.bulk_update(due, ['status', 'attempts', 'next_attempt_at'])
+        return due, len(due) + folded
+
+    def coalesce(self, due):
+        """Merge each claimed first attempt with the other unsent deliveries to its destination.
+
+        Runs inside claim_batch's transaction. Retries are left alone so a
+        digest is never folded into another digest. Returns the deliveries
+        that still need sending and the number of rows folded away.
+        """
+        fresh = [d for d in due if d.attempts == 0]
+        if not fresh:
+            return due, 0
+        siblings = (
+            NotificationDelivery.objects
+            .select_for_update(skip_locked=True, of=('self',))
+            .select_related('notification')
+            .filter(status='pending', attempts=0, destination__in={d.destination for d in fresh})
+            .exclude(pk__in=[d.pk for d in due])
+        )
+        groups = defaultdict(list)
+        for delivery in fresh:
+            groups[(delivery.channel, delivery.destination)].append(delivery)
+        for delivery in siblings:
+            if (delivery.channel, delivery.destination) in groups:
+                groups[(delivery.channel, delivery.destination)].append(delivery)
+
+        send = [d for d in due if d.attempts > 0]
+        folded = []
+        carriers = []
+        for group in groups.values():
+            group.sort(key=lambda d: (d.created_at, d.pk))
+            kept, superseded = resolve_superseded(group)
+            for delivery in superseded:
+                delivery.status = 'superseded'
+                folded.append(delivery)
+            if kept:
+                carrier = kept[0]
+                if len(kept) > 1:
+                    carrier.subject, carrier.body = digest_message(kept)
+                    carriers.append(carrier)
+                for delivery in kept[1:]:
+                    delivery.status = 'merged'
+                    delivery.digest = carrier
+                    folded.append(delivery)
+                send.append(carrier)
+        NotificationDelivery.objects.bulk_update(folded, ['status', 'digest'], batch_size=500)
+        # Only digests change their text; a lone delivery keeps what it was enqueued with
+        NotificationDelivery.objects.bulk_update(carriers, ['subject', 'body'], batch_size=500)
+        self._count('saved', len(folded))
+        return send, len(folded)
+
+    def retry_delay(self, attempts):
+        """Exponential backoff with jitter, capped at max_backoff"""
+        delay = min(self.backoff * (2 ** (attempts - 1)), self.max_backoff)
+        return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+    def deliver(self, delivery):
+        """Send one SMS delivery and record the outcome"""
+        try:
+            with self.semaphores[delivery.channel]:
+                send_sms_delivery(delivery)
+        except Exception as e:
+            self.record_failure(delivery, e)
+        else:
+            self.record_success(delivery)
+        finally:
+            # Worker threads own their connections; don't leak one per thread
+            connection.close()
+
+    def deliver_emails(self, deliveries):
+        """Send a chunk of email deliveries over one SMTP connection and record each outcome"""
+        try:
+            messages = [build_email(d.subject, d.body, d.destination) for d in deliveries]
+            try:
+                with self.semaphores['email']:
+                    outcomes = get_email_transport().send(messages)
+            except Exception as e:
+                # No connection could be opened; every message in the chunk failed
+                outcomes = [e] * len(deliveries)
+            for delivery, error in zip(deliveries, outcomes):
+                if error is None:
+                    self.record_success(delivery)
+                else:
+                    self.record_failure(delivery, error)
+        finally:
+            connection.close()
+
+    def record_success(self, delivery):
+        with transaction.atomic():
+            NotificationDelivery.objects.filter(pk=delivery.pk).update(
+                status='sent', sent_at=timezone.now(), last_error='',
+            )
+            Notification.objects.filter(
+                Q(pk=delivery.notification_id) | Q(deliveries__digest_id=delivery.pk)
+            ).update(**{SENT_FLAGS[delivery.channel]: True})
+        self._count('sent')
+
+    def record_failure(self, delivery, error):
+        if delivery.attempts >= self.max_attempts:
+            NotificationDelivery.objects.filter(pk=delivery.pk).update(
+                status='failed', last_error=str(error),
+            )
+            self._count('failed')
+        else:
+            NotificationDelivery.objects.filter(pk=delivery.pk).update(
+                status='pending',
+                last_error=str(error),
+                next_attempt_at=timezone.now() + self.retry_delay(delivery.attempts),
+            )
+            self._count('retried')
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def run_once(self):
+        """Claim and deliver one batch; return the number of rows claimed, sent or folded away"""
+        batch, claimed = self._claim()
+        if batch:
+            emails = [d for d in batch if d.channel == 'email']
+            others = [d for d in batch if d.channel != 'email']
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = [
+                    pool.submit(self.deliver_emails, emails[i:i + self.email_batch_size])
+                    for i in range(0, len(emails), self.email_batch_size)
+                ]
+                futures += [pool.submit(self.deliver, delivery) for delivery in others]
+                for future in futures:
+                    future.result()
+        reap_transports()
+        return claimed
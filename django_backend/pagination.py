@@ -0,0 +1,110 @@
+# Pagination and Streaming Helpers for Hospital Management System
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.utils.encoders import JSONEncoder
+
+from .permissions import is_hospital_admin
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """Keyset pagination over (created_at, id), newest first.
+
+    Deep pages cost the same as the first one because each page is a range
+    query on created_at rather than an OFFSET.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+def paginate(request, queryset, serializer_class, cursor_query_param='cursor'):
+    """Serialize one cursor page of queryset; return (data, links)"""
+    paginator = CreatedAtCursorPagination()
+    paginator.cursor_query_param = cursor_query_param
+    if hasattr(serializer_class, 'setup_eager_loading'):
+        queryset = serializer_class.setup_eager_loading(queryset)
+    page = paginator.paginate_queryset(queryset, request)
+    links = {'next': paginator.get_next_link(), 'previous': paginator.get_previous_link()}
+    return serializer_class(page, many=True).data, links
+
+
+def paginate_merged(request, sources, cursor_query_param='cursor'):
+    """Like paginate(), over several querysets read as one list, newest first.
+
+    sources is [(queryset, read serializer)]; their ids must be of one type.
+    A page reads at most page_size + 1 rows from each source with a range
+    query on (created_at, id) and merges them, so deep pages stay cheap. Used
+    where archived rows must keep showing next to live ones.
+    """
+    paginator = CreatedAtCursorPagination()
+    paginator.cursor_query_param = cursor_query_param
+    paginator.base_url = request.build_absolute_uri()
+    page_size = paginator.get_page_size(request)
+    cursor = paginator.decode_cursor(request)
+    reverse = bool(cursor and cursor.reverse)
+    after = None
+    if cursor and cursor.position:
+        created_at, _, pk = cursor.position.partition('|')
+        after = parse_datetime(created_at)
+        if after is None or not pk:
+            raise NotFound(paginator.invalid_cursor_message)
+
+    rows = []
+    for queryset, serializer_class in sources:
+        queryset = serializer_class.setup_eager_loading(queryset)
+        if after is not None:
+            op = 'gt' if reverse else 'lt'
+            queryset = queryset.filter(Q(**{f'created_at__{op}': after}) | Q(created_at=after, **{f'id__{op}': pk}))
+        ordering = ('created_at', 'id') if reverse else ('-created_at', '-id')
+        render = serializer_class.renderer()
+        rows += [(row, render) for row in queryset.order_by(*ordering)[:page_size + 1]]
+    rows.sort(key=lambda item: (item[0]['created_at'], item[0]['id']), reverse=not reverse)
+    more = len(rows) > page_size
+    rows = rows[:page_size]
+    if reverse:
+        rows.reverse()
+
+    def link(row, backwards):
+        position = f"{row['created_at'].isoformat()}|{row['id']}"
+        return paginator.encode_cursor(Cursor(offset=0, reverse=backwards, position=position))
+
+    links = {'next': None, 'previous': None}
+    if rows:
+        if more or reverse:
+            links['next'] = link(rows[-1][0], False)
+        if (more and reverse) or (after is not None and not reverse):
+            links['previous'] = link(rows[0][0], True)
+    return [render(row) for row, render in rows], links
+
+
+def wants_stream(request):
+    """Streaming is opt-in with ?stream=1 and reserved for admins"""
+    return request.GET.get('stream') in ('1', 'true') and is_hospital_admin(request.user)
+
+
+def stream_json(queryset, serializer_class, chunk_size=None):
+    """Stream queryset as a JSON array, reading it through a server-side cursor"""
+    chunk_size = chunk_size or getattr(settings, 'STREAM_CHUNK_SIZE', 500)
+    if hasattr(serializer_class, 'setup_eager_loading'):
+        queryset = serializer_class.setup_eager_loading(queryset)
+    encoder = JSONEncoder()
+
+    def chunks():
+        yield '['
+        separator = ''
+        buffer = []
+        for instance in queryset.iterator(chunk_size=chunk_size):
+            buffer.append(encoder.encode(serializer_class(instance).data))
+            if len(buffer) >= chunk_size:
+                yield separator + ','.join(buffer)
+                separator, buffer = ',', []
+        if buffer:
+            yield separator + ','.join(buffer)
+        yield ']'
+
+    return StreamingHttpResponse(chunks(), content_type='application/json')
@@ -0,0 +1,14 @@
+# Django REST Framework Permissions for Hospital Management System
+
+from rest_framework.permissions import BasePermission
+
+
+def is_hospital_admin(user):
+    return bool(user and user.is_authenticated and (user.user_type == 'admin' or user.is_staff))
+
+
+class IsHospitalAdmin(BasePermission):
+    """Allow access only to hospital admins and Django staff"""
+
+    def has_permission(self, request, view):
+        return is_hospital_admin(request.user)
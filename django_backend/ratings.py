@@ -0,0 +1,80 @@
+# Doctor Rating Summaries for Hospital Management System
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import Doctor, DoctorRating, DoctorRatingSummary
+
+STAR_FIELDS = {star: f'stars_{star}' for star in range(1, 6)}
+SUMMARY_FIELDS = ['count', 'total'] + list(STAR_FIELDS.values())
+
+
+def _delta(rating, sign):
+    fields = {
+        'count': F('count') + sign,
+        'total': F('total') + sign * rating,
+        'updated_at': timezone.now(),
+    }
+    if rating in STAR_FIELDS:
+        fields[STAR_FIELDS[rating]] = F(STAR_FIELDS[rating]) + sign
+    return fields
+
+
+def add_rating(doctor_id, rating):
+    """Fold a newly created rating into the doctor's summary"""
+    summaries = DoctorRatingSummary.objects.filter(doctor_id=doctor_id)
+    if not summaries.update(**_delta(rating, 1)):
+        DoctorRatingSummary.objects.get_or_create(doctor_id=doctor_id)
+        summaries.update(**_delta(rating, 1))
+
+
+def remove_rating(doctor_id, rating):
+    """Take a deleted rating out of the doctor's summary"""
+    # Never create a summary here: during a cascading Doctor delete the
+    # summary row may already be gone along with the doctor.
+    DoctorRatingSummary.objects.filter(doctor_id=doctor_id, count__gt=0).update(**_delta(rating, -1))
+
+
+def rebuild_rating_summaries(doctor_ids=None, batch_size=1000):
+    """Recompute summaries from DoctorRating in bulk; return the number of doctors processed"""
+    doctors = Doctor.objects.order_by('pk').values_list('pk', flat=True)
+    if doctor_ids is not None:
+        doctors = doctors.filter(pk__in=doctor_ids)
+
+    aggregates = {'count': Count('id'), 'total': Sum('rating')}
+    for star, field in STAR_FIELDS.items():
+        aggregates[field] = Count('id', filter=Q(rating=star))
+
+    processed = 0
+    last_pk = 0
+    while True:
+        chunk = list(doctors.filter(pk__gt=last_pk)[:batch_size])
+        if not chunk:
+            break
+        last_pk = chunk[-1]
+
+        rows = {
+            row.pop('doctor_id'): row
+            for row in DoctorRating.objects
+            .filter(doctor_id__in=chunk)
+            .order_by()
+            .values('doctor_id')
+            .annotate(**aggregates)
+        }
+        summaries = [
+            DoctorRatingSummary(doctor_id=pk, **{
+                field: rows.get(pk, {}).get(field) or 0 for field in SUMMARY_FIELDS
+            })
+            for pk in chunk
+        ]
+        with transaction.atomic():
+            DoctorRatingSummary.objects.bulk_create(
+                summaries,
+                update_conflicts=True,
+                unique_fields=['doctor'],
+                update_fields=SUMMARY_FIELDS + ['updated_at'],
+            )
+        processed += len(chunk)
+
+    return processed
@@ -0,0 +1,223 @@
+# Retention and Archival for Hospital Management System
+#
+# Old rows are moved from the hot tables into archive tables a bounded batch
+# at a time. Each batch is one transaction that copies the rows, deletes the
+# originals and checks that both counts match, so an interrupted run loses
+# nothing and the next run simply carries on with whatever is still eligible.
+
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import inbox
+from .models import (
+    Appointment, ArchivedAppointment, ArchivedNotification, Notification, NotificationDelivery,
+)
+from .rollups import apply_appointment_changes
+
+
+class ArchiveMismatch(Exception):
+    pass
+
+
+class RetentionPolicy:
+    """How one hot table is archived: which rows are old enough and how to copy them"""
+
+    model = None
+    archive_model = None
+    retention_setting = None
+    default_days = None
+    # Models other than `model` that may be removed by the cascade
+    cascades = ()
+
+    def retention_days(self):
+        return getattr(settings, self.retention_setting, self.default_days)
+
+    def cutoff(self, now=None, days=None):
+        return (now or timezone.now()) - timedelta(days=self.retention_days() if days is None else days)
+
+    def eligible(self, cutoff):
+        raise NotImplementedError
+
+    def to_archive(self, row):
+        raise NotImplementedError
+
+    def after_archive(self, rows):
+        pass
+
+    def archive_batch(self, cutoff, batch_size):
+        """Move up to batch_size eligible rows; return how many were moved"""
+        with transaction.atomic():
+            rows = list(
+                self.eligible(cutoff)
+                .select_for_update(skip_locked=True, of=('self',))
+                .order_by('created_at', 'pk')[:batch_size]
+            )
+            if not rows:
+                return 0
+            pks = [row.pk for row in rows]
+            ensure_partitions(self.archive_model, rows[0].created_at, rows[-1].created_at)
+            self.archive_model.objects.bulk_create([self.to_archive(row) for row in rows],
+                                                   ignore_conflicts=True)
+            # Re-apply the eligibility filter so a row that gained dependants
+            # since it was read is kept rather than cascaded away
+            _, deleted = self.eligible(cutoff).filter(pk__in=pks).delete()
+
+            moved = deleted.get(self.model._meta.label, 0)
+            archived = self.archive_model.objects.filter(pk__in=pks).count()
+            unexpected = set(deleted) - {self.model._meta.label} - {m._meta.label for m in self.cascades}
+            if moved != len(rows) or archived != len(rows) or unexpected:
+                raise ArchiveMismatch(
+                    f'{self.model._meta.label}: read {len(rows)}, deleted {moved}, '
+                    f'archived {archived}, unexpected cascades {sorted(unexpected)}'
+                )
+            self.after_archive(rows)
+        return moved
+
+
+class AppointmentRetention(RetentionPolicy):
+    """Finished appointments past the horizon that no medical record or bill points at"""
+
+    model = Appointment
+    archive_model = ArchivedAppointment
+    retention_setting = 'APPOINTMENT_RETENTION_DAYS'
+    default_days = 730
+
+    def eligible(self, cutoff):
+        return Appointment.objects.filter(
+            status__in=['completed', 'cancelled'],
+            appointment_date__lt=cutoff.date(),
+            created_at__lt=cutoff,
+            medicalrecord__isnull=True,
+            bill__isnull=True,
+        )
+
+    def to_archive(self, row):
+        return ArchivedAppointment(
+            id=row.id,
+            patient_id=row.patient_id,
+            doctor_id=row.doctor_id,
+            department_id=row.department_id,
+            preferred_doctor=row.preferred_doctor,
+            appointment_date=row.appointment_date,
+            appointment_time=row.appointment_time,
+            symptoms=row.symptoms,
+            status=row.status,
+            notes=row.notes,
+            created_at=row.created_at,
+            updated_at=row.updated_at,
+        )
+
+    def after_archive(self, rows):
+        # Archived appointments still count; put back what the delete signal
+        # takes off the rollups when this batch commits
+        apply_appointment_changes([(None, row._rollup_key) for row in rows])
+
+
+class NotificationRetention(RetentionPolicy):
+    """Notifications past the horizon whose deliveries have all finished"""
+
+    model = Notification
+    archive_model = ArchivedNotification
+    retention_setting = 'NOTIFICATION_RETENTION_DAYS'
+    default_days = 180
+    cascades = (NotificationDelivery,)
+
+    def eligible(self, cutoff):
+        return Notification.objects.filter(created_at__lt=cutoff).exclude(
+            deliveries__status__in=['pending', 'sending'],
+        )
+
+    def to_archive(self, row):
+        return ArchivedNotification(
+            id=row.id,
+            recipient_id=row.recipient_id,
+            notification_type=row.notification_type,
+            title=row.title,
+            message=row.message,
+            is_read=row.is_read,
+            email_sent=row.email_sent,
+            sms_sent=row.sms_sent,
+            created_at=row.created_at,
+        )
+
+    def after_archive(self, rows):
+        inbox.forget({row.recipient_id for row in rows})
+
+
+POLICIES = {
+    'appointments': AppointmentRetention(),
+    'notifications': NotificationRetention(),
+}
+
+
+# PostgreSQL range partitioning of the archive tables
+
+def _month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def _next_month(value):
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def is_partitioned(table):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid '
+            'WHERE c.relname = %s', [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def partition_archive_table(model):
+    """Convert an archive table to monthly range partitions on created_at (PostgreSQL only).
+
+    The primary key becomes (id, created_at), as PostgreSQL requires the
+    partition key in every unique index. Safe to call repeatedly.
+    """
+    if connection.vendor != 'postgresql':
+        return False
+    table = model._meta.db_table
+    if is_partitioned(table):
+        return True
+    qn = connection.ops.quote_name
+    with transaction.atomic(), connection.cursor() as cursor:
+        old = f'{table}_unpartitioned'
+        cursor.execute(f'ALTER TABLE {qn(table)} RENAME TO {qn(old)}')
+        cursor.execute(f'CREATE TABLE {qn(table)} (LIKE {qn(old)} INCLUDING DEFAULTS) '
+                       f'PARTITION BY RANGE (created_at)')
+        cursor.execute(f'ALTER TABLE {qn(table)} ADD PRIMARY KEY (id, created_at)')
+        cursor.execute(f'CREATE TABLE {qn(table + "_default")} PARTITION OF {qn(table)} DEFAULT')
+        cursor.execute(f'SELECT min(created_at), max(created_at) FROM {qn(old)}')
+        first, last = cursor.fetchone()
+        if first:
+            ensure_partitions(model, first, last)
+        cursor.execute(f'INSERT INTO {qn(table)} SELECT * FROM {qn(old)}')
+        cursor.execute(f'DROP TABLE {qn(old)}')
+        for index in model._meta.indexes:
+            fields = ', '.join(
+                qn(model._meta.get_field(name.lstrip('-')).column) + (' DESC' if name.startswith('-') else '')
+                for name in index.fields
+            )
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {qn(index.name)} ON {qn(table)} ({fields})')
+    return True
+
+
+def ensure_partitions(model, start, end):
+    """Create any missing monthly partitions covering start..end"""
+    if connection.vendor != 'postgresql' or not is_partitioned(model._meta.db_table):
+        return
+    table = model._meta.db_table
+    qn = connection.ops.quote_name
+    month, end = _month_start(start), end.date()
+    with connection.cursor() as cursor:
+        while month <= end:
+            name = f'{table}_y{month.year}m{month.month:02d}'
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {qn(name)} PARTITION OF {qn(table)} '
+                f'FOR VALUES FROM (%s) TO (%s)', [month.isoformat(), _next_month(month).isoformat()],
+            )
+            month = _next_month(month)
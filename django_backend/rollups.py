@@ -0,0 +1,264 @@
+# Analytics Rollups for Hospital Management System
+#
+# DailyRevenue and DailyAppointmentCount hold per-day totals keyed by doctor,
+# department and status. Saves adjust them through signals: each Bill and
+# Appointment remembers the rollup key it was loaded with, and a save moves
+# its contribution from the old key to the new one with a single upsert.
+# Paths that bypass signals (bulk_update, queryset.update) either apply the
+# same deltas explicitly or are caught by the refresh_rollups job, which
+# recomputes every day touched by rows updated since its last run. Deletes
+# subtract their contribution when the transaction commits.
+#
+# DailyRevenue files a bill under its doctor's current department, the same
+# join recompute_days() uses. Saving a Doctor with a new department moves all
+# of its revenue rows along (move_doctor_revenue); a department changed with
+# queryset.update() needs a `refresh_rollups --full` afterwards.
+
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    Appointment, ArchivedAppointment, Bill, DailyAppointmentCount, DailyRevenue, Department, Doctor,
+    RollupWatermark,
+)
+
+# Key of an instance loaded without the fields it needs (.only()/.defer());
+# reading them in post_init would cost a query per row
+UNKNOWN = 'unknown'
+
+APPOINTMENT_FIELDS = {'appointment_date', 'doctor_id', 'department_id', 'status'}
+BILL_FIELDS = {'created_at', 'doctor_id', 'payment_status', 'total_amount'}
+
+
+def appointment_key(appointment):
+    """(day, doctor_id, department_id, status) an appointment counts towards"""
+    if APPOINTMENT_FIELDS & appointment.get_deferred_fields():
+        return UNKNOWN
+    return (appointment.appointment_date, appointment.doctor_id or 0,
+            appointment.department_id or 0, appointment.status)
+
+
+def bill_state(bill):
+    """(day, doctor_id, payment_status, amount) of a saved bill; None before it is saved"""
+    if BILL_FIELDS & bill.get_deferred_fields():
+        return UNKNOWN
+    if bill.created_at is None:
+        return None
+    return (timezone.localdate(bill.created_at), bill.doctor_id,
+            bill.payment_status, bill.total_amount)
+
+
+def _upsert(model, key_fields, value_fields, rows):
+    """Add each row's values onto the rollup row with the same key, creating it if missing"""
+    if not rows:
+        return
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    columns = [qn(model._meta.get_field(name).column) for name in key_fields + value_fields]
+    keys = ', '.join(columns[:len(key_fields)])
+    increments = ', '.join(f'{column} = {table}.{column} + excluded.{column}'
+                           for column in columns[len(key_fields):])
+    sql = (f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({", ".join(["%s"] * len(columns))}) '
+           f'ON CONFLICT ({keys}) DO UPDATE SET {increments}')
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [key + values for key, values in rows])
+
+
+def apply_appointment_changes(changes):
+    """Apply [(old_key or None, new_key or None)] to DailyAppointmentCount"""
+    deltas = defaultdict(int)
+    for old, new in changes:
+        if old == new:
+            continue
+        if old is not None:
+            deltas[old] -= 1
+        if new is not None:
+            deltas[new] += 1
+    _upsert(DailyAppointmentCount, ['day', 'doctor_id', 'department_id', 'status'], ['appointment_count'],
+            [(key, (delta,)) for key, delta in deltas.items() if delta])
+
+
+def apply_bill_changes(changes):
+    """Apply [(old_state or None, new_state or None)] to DailyRevenue"""
+    changes = [(old, new) for old, new in changes if old != new]
+    doctor_ids = {state[1] for pair in changes for state in pair if state}
+    departments = dict(Doctor.objects.filter(pk__in=doctor_ids).values_list('pk', 'department_id'))
+
+    deltas = defaultdict(lambda: [0, Decimal('0')])
+    for old, new in changes:
+        for state, sign in ((old, -1), (new, 1)):
+            if state is None:
+                continue
+            day, doctor_id, payment_status, amount = state
+            key = (day, doctor_id, departments.get(doctor_id) or 0, payment_status)
+            deltas[key][0] += sign
+            deltas[key][1] += sign * Decimal(amount)
+    _upsert(DailyRevenue, ['day', 'doctor_id', 'department_id', 'payment_status'],
+            ['bill_count', 'total_amount'],
+            [(key, tuple(values)) for key, values in deltas.items() if any(values)])
+
+
+def move_doctor_revenue(doctor_id, department_id):
+    """File all of a doctor's revenue under department_id, after the doctor changed department"""
+    # Every row of one doctor carries the same department, so this cannot collide
+    DailyRevenue.objects.filter(doctor_id=doctor_id).update(department_id=department_id or 0)
+
+
+def forget_doctor(doctor_id):
+    """Take a deleted doctor out of the rollups.
+
+    Its bills were deleted with it, and its appointments lost their doctor
+    through an UPDATE that sends no signals, so recount the days they are on.
+    """
+    DailyRevenue.objects.filter(doctor_id=doctor_id).delete()
+    recompute_days(DailyAppointmentCount.objects.filter(doctor_id=doctor_id)
+                   .values_list('day', flat=True).distinct().order_by())
+
+
+def recount_saved(instance):
+    """Fallback for instances whose old key is UNKNOWN: recount the day the row is on now.
+
+    A day the row moved away from is corrected by the next refresh_rollups run.
+    """
+    if isinstance(instance, Bill):
+        created = Bill.objects.filter(pk=instance.pk).values_list('created_at', flat=True).first()
+        days = [timezone.localdate(created)] if created else []
+    else:
+        days = list(Appointment.objects.filter(pk=instance.pk).values_list('appointment_date', flat=True))
+    recompute_days(days)
+
+
+# Full recomputation
+
+# Rows committed while a run is in progress may carry an updated_at from
+# before it started; re-reading a short overlap picks them up next time
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+
+def _day_range(days):
+    days = sorted(days)
+    start = timezone.make_aware(datetime.combine(days[0], time.min))
+    end = timezone.make_aware(datetime.combine(days[-1] + timedelta(days=1), time.min))
+    return start, end
+
+
+def recompute_days(days):
+    """Rebuild both rollups for the given days from the source tables"""
+    days = set(days)
+    if not days:
+        return
+    with transaction.atomic():
+        DailyRevenue.objects.filter(day__in=days).delete()
+        start, end = _day_range(days)
+        revenue = (
+            Bill.objects.filter(created_at__gte=start, created_at__lt=end)
+            .annotate(day=TruncDate('created_at'))
+            .values('day', 'doctor_id', 'doctor__department_id', 'payment_status')
+            .annotate(bill_count=Count('pk'), total=Sum('total_amount'))
+            .order_by()
+        )
+        DailyRevenue.objects.bulk_create([
+            DailyRevenue(
+                day=row['day'], doctor_id=row['doctor_id'], department_id=row['doctor__department_id'] or 0,
+                payment_status=row['payment_status'], bill_count=row['bill_count'], total_amount=row['total'],
+            )
+            for row in revenue if row['day'] in days
+        ], batch_size=1000)
+
+        DailyAppointmentCount.objects.filter(day__in=days).delete()
+        counts = defaultdict(int)
+        for model in (Appointment, ArchivedAppointment):
+            rows = (model.objects.filter(appointment_date__in=days)
+                    .values_list('appointment_date', 'doctor_id', 'department_id', 'status')
+                    .annotate(n=Count('pk')).order_by())
+            for day, doctor_id, department_id, status, n in rows:
+                counts[(day, doctor_id or 0, department_id or 0, status)] += n
+        DailyAppointmentCount.objects.bulk_create([
+            DailyAppointmentCount(day=day, doctor_id=doctor_id, department_id=department_id,
+                                  status=status, appointment_count=n)
+            for (day, doctor_id, department_id, status), n in counts.items()
+        ], batch_size=1000)
+
+
+def refresh_rollups(full=False, batch_days=31):
+    """Recompute the days touched since the last run (or every day); return how many were rebuilt"""
+    now = timezone.now()
+    marks = {mark.source: mark.updated_at for mark in RollupWatermark.objects.all()}
+    bills, appointments = Bill.objects.all(), Appointment.objects.all()
+    if not full and 'bill' in marks:
+        bills = bills.filter(updated_at__gte=marks['bill'] - WATERMARK_OVERLAP)
+    if not full and 'appointment' in marks:
+        appointments = appointments.filter(updated_at__gte=marks['appointment'] - WATERMARK_OVERLAP)
+
+    days = set(bills.annotate(day=TruncDate('created_at')).values_list('day', flat=True).distinct().order_by())
+    days.update(appointments.values_list('appointment_date', flat=True).distinct().order_by())
+    if full:
+        days.update(ArchivedAppointment.objects.values_list('appointment_date', flat=True).distinct().order_by())
+        # Days that no longer have any source rows
+        for model in (DailyRevenue, DailyAppointmentCount):
+            stale = set(model.objects.values_list('day', flat=True).distinct().order_by()) - days
+            model.objects.filter(day__in=stale).delete()
+
+    ordered = sorted(days)
+    for i in range(0, len(ordered), batch_days):
+        recompute_days(ordered[i:i + batch_days])
+
+    for source in ('bill', 'appointment'):
+        RollupWatermark.objects.update_or_create(source=source, defaults={'updated_at': now})
+    return len(ordered)
+
+
+# Reports, read from the rollups only
+
+REVENUE_GROUPS = {'day': 'day', 'doctor': 'doctor_id', 'department': 'department_id',
+                  'payment_status': 'payment_status'}
+APPOINTMENT_GROUPS = {'day': 'day', 'doctor': 'doctor_id', 'department': 'department_id', 'status': 'status'}
+
+
+def _report(model, groups, group_by, start, end, filters, totals):
+    unknown = [name for name in group_by if name not in groups]
+    if unknown:
+        raise ValueError(f"Cannot group by {', '.join(unknown)}; choose from {', '.join(groups)}")
+    columns = [groups[name] for name in group_by]
+    rows = model.objects.filter(day__gte=start, day__lte=end, **filters)
+    count_field = next(iter(totals))
+    rows = list(
+        rows.values(*columns).annotate(**totals).filter(**{f'{count_field}__gt': 0}).order_by(*columns)
+    )
+
+    # Attach names with one query per dimension over the few ids in the result
+    if 'doctor_id' in columns:
+        names = {doctor.pk: doctor.user.get_full_name() for doctor in
+                 Doctor.objects.select_related('user').filter(pk__in={row['doctor_id'] for row in rows})}
+        for row in rows:
+            row['doctor_name'] = names.get(row['doctor_id'], '')
+    if 'department_id' in columns:
+        names = dict(Department.objects.filter(pk__in={row['department_id'] for row in rows})
+                     .values_list('pk', 'name'))
+        for row in rows:
+            row['department_name'] = names.get(row['department_id'], '')
+    return rows
+
+
+def revenue_report(start, end, group_by=('day',), payment_status=None):
+    """Bill count and revenue between start and end inclusive, grouped by group_by"""
+    filters = {'payment_status': payment_status} if payment_status else {}
+    rows = _report(DailyRevenue, REVENUE_GROUPS, group_by, start, end, filters,
+                   {'bills': Sum('bill_count'), 'revenue': Sum('total_amount')})
+    for row in rows:
+        # Some backends sum decimals as floats; report money as a cents string
+        row['revenue'] = str(Decimal(str(row['revenue'])).quantize(Decimal('0.01')))
+    return rows
+
+
+def appointment_report(start, end, group_by=('day',), status=None):
+    """Appointment counts between start and end inclusive, grouped by group_by"""
+    filters = {'status': status} if status else {}
+    return _report(DailyAppointmentCount, APPOINTMENT_GROUPS, group_by, start, end, filters,
+                   {'appointments': Sum('appointment_count')})
@@ -0,0 +1,151 @@
+# Appointment Scheduling for Hospital Management System
+#
+# A doctor's day is a grid of fixed-length slots between available_from and
+# available_to. Approved appointments hold their slot; free slots are answered
+# from a per-(doctor, day) sorted index of booked start times loaded with a
+# single query, so a month of availability for a department costs one scan of
+# that month's approved appointments.
+
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Appointment, Doctor
+
+DEFAULT_AVAILABLE_FROM = time(9, 0)
+DEFAULT_AVAILABLE_TO = time(17, 0)
+
+
+class SlotConflict(Exception):
+    pass
+
+
+def slot_minutes():
+    return getattr(settings, 'APPOINTMENT_SLOT_MINUTES', 30)
+
+
+def to_minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def slot_grid(doctor):
+    """Start times, in minutes after midnight, of every slot in the doctor's day"""
+    start = to_minutes(doctor.available_from or DEFAULT_AVAILABLE_FROM)
+    end = to_minutes(doctor.available_to or DEFAULT_AVAILABLE_TO)
+    step = slot_minutes()
+    return list(range(start, end - step + 1, step))
+
+
+class BookingIndex:
+    """Sorted booked start minutes per (doctor_id, date)"""
+
+    def __init__(self, bookings=()):
+        self.starts = defaultdict(list)
+        for doctor_id, day, start in bookings:
+            self.starts[(doctor_id, day)].append(to_minutes(start))
+        for starts in self.starts.values():
+            starts.sort()
+
+    @classmethod
+    def load(cls, doctor_ids, start_date, end_date, exclude_ids=()):
+        bookings = Appointment.objects.filter(
+            doctor_id__in=doctor_ids,
+            appointment_date__gte=start_date,
+            appointment_date__lte=end_date,
+            status='approved',
+        )
+        if exclude_ids:
+            bookings = bookings.exclude(pk__in=exclude_ids)
+        return cls(bookings.order_by().values_list('doctor_id', 'appointment_date', 'appointment_time'))
+
+    def book(self, doctor_id, day, start):
+        insort(self.starts[(doctor_id, day)], to_minutes(start))
+
+    def release(self, doctor_id, day, start):
+        """Drop one booking starting at start, if there is one"""
+        starts = self.starts.get((doctor_id, day), [])
+        index = bisect_left(starts, to_minutes(start))
+        if index < len(starts) and starts[index] == to_minutes(start):
+            del starts[index]
+
+    def is_free(self, doctor_id, day, start):
+        """True if no booking overlaps [start, start + slot)"""
+        step = slot_minutes()
+        starts = self.starts.get((doctor_id, day), ())
+        # First booking starting after start - step is the only candidate overlap
+        index = bisect_right(starts, start - step)
+        return index == len(starts) or starts[index] >= start + step
+
+
+def _format(minutes):
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+
+def free_slots(start_date, end_date, department=None, doctor_id=None):
+    """Free slots per doctor and day between start_date and end_date inclusive"""
+    doctors = Doctor.objects.filter(is_available=True).select_related('user', 'department').order_by('pk')
+    if department:
+        doctors = doctors.filter(department__name=department)
+    if doctor_id:
+        doctors = doctors.filter(pk=doctor_id)
+    doctors = list(doctors)
+
+    index = BookingIndex.load([doctor.pk for doctor in doctors], start_date, end_date)
+    now = timezone.localtime()
+    results = []
+    day = start_date
+    while day <= end_date:
+        earliest = to_minutes(now) if day == now.date() else -1
+        for doctor in doctors:
+            slots = [
+                _format(start) for start in slot_grid(doctor)
+                if start > earliest and index.is_free(doctor.pk, day, start)
+            ]
+            if slots:
+                results.append({
+                    'doctor_id': doctor.pk,
+                    'doctor_name': doctor.user.get_full_name(),
+                    'department_name': doctor.department.name if doctor.department else '',
+                    'date': day.isoformat(),
+                    'slots': slots,
+                })
+        day += timedelta(days=1)
+    return results
+
+
+def reserve_slot(doctor, appointment):
+    """Check that appointment's slot is free for doctor, holding a lock on the doctor.
+
+    Must run inside transaction.atomic(). Locking the doctor row serializes
+    concurrent approvals for the same doctor; the partial unique constraint
+    on approved appointments backs this up at the database level.
+    """
+    Doctor.objects.select_for_update().filter(pk=doctor.pk).first()
+    index = BookingIndex.load([doctor.pk], appointment.appointment_date, appointment.appointment_date,
+                              exclude_ids=[appointment.pk])
+    if not index.is_free(doctor.pk, appointment.appointment_date, to_minutes(appointment.appointment_time)):
+        raise SlotConflict(
+            f'{doctor} already has an appointment at {appointment.appointment_time} '
+            f'on {appointment.appointment_date}'
+        )
+
+
+def department_has_capacity(department, day, start):
+    """False only when the department has doctors and every one of them is booked over start.
+
+    Uses the same overlap check as reserve_slot, so requests off the slot
+    grid or outside working hours are accepted as they always were.
+    """
+    doctor_ids = list(Doctor.objects.filter(department=department, is_available=True).values_list('pk', flat=True))
+    if not doctor_ids:
+        return True
+    index = BookingIndex.load(doctor_ids, day, day)
+    minutes = to_minutes(start)
+    return any(index.is_free(doctor_id, day, minutes) for doctor_id in doctor_ids)
+
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
@@ -0,0 +1,196 @@
+# Doctor Search for Hospital Management System
+#
+# PostgreSQL deployments search Doctor.search_document through a pg_trgm GIN
+# index and rank by trigram word similarity plus full-text rank. Other
+# databases (SQLite in development and tests) use an in-process n-gram index
+# that is kept current by model signals, with its own shared version so it
+# only rebuilds when some doctor's search_document actually changed.
+
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, Q, When
+
+from .caching import VersionedCache
+from .models import Doctor
+
+POSTGRES_INDEXES = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS doctor_search_trgm_idx '
+    'ON hospital_doctor USING gin (search_document gin_trgm_ops)',
+]
+
+
+def create_search_indexes(using='default', **kwargs):
+    """post_migrate hook: add the trigram index where the database supports it"""
+    from django.db import connections
+    conn = connections[using]
+    if conn.vendor != 'postgresql':
+        return
+    with conn.cursor() as cursor:
+        for statement in POSTGRES_INDEXES:
+            cursor.execute(statement)
+
+
+class NgramIndex:
+    """In-memory inverted index from character n-grams to doctor ids.
+
+    Scores are the fraction of the query's n-grams found in a document, so a
+    query with a typo or a partial word still ranks close matches first.
+    add() and remove() bump the shared versions counter; the index rebuilds
+    itself when the counter moves on without it, which covers changes made
+    by other processes.
+    """
+
+    def __init__(self, versions, n=3, threshold=0.5):
+        self.versions = versions
+        self.n = n
+        self.threshold = threshold
+        self.postings = defaultdict(set)
+        self.documents = {}
+        self.version = None
+        self.lock = threading.RLock()
+
+    def _bumped(self):
+        # If another process bumped the counter since we last synced, we have
+        # missed its change; keep our stale version so the next search rebuilds
+        version = self.versions.invalidate()
+        if self.version is not None and version == self.version + 1:
+            self.version = version
+
+    def ngrams(self, text):
+        grams = set()
+        for word in text.lower().split():
+            padded = f'{" " * (self.n - 1)}{word} '
+            grams.update(padded[i:i + self.n] for i in range(len(padded) - self.n + 1))
+        return grams
+
+    def add(self, doctor_id, document):
+        with self.lock:
+            self._discard(doctor_id)
+            grams = self.ngrams(document)
+            self.documents[doctor_id] = grams
+            for gram in grams:
+                self.postings[gram].add(doctor_id)
+            self._bumped()
+
+    def remove(self, doctor_id):
+        with self.lock:
+            self._discard(doctor_id)
+            self._bumped()
+
+    def _discard(self, doctor_id):
+        for gram in self.documents.pop(doctor_id, ()):
+            self.postings[gram].discard(doctor_id)
+
+    def invalidate(self):
+        """Make every process rebuild, for doctors written without signals (bulk_create)"""
+        self.versions.invalidate()
+
+    def rebuild(self):
+        with self.lock:
+            # Read the version first, so a change committed mid-rebuild triggers another
+            version = self.versions.version()
+            self.postings.clear()
+            self.documents.clear()
+            for doctor_id, document in Doctor.objects.values_list('id', 'search_document').iterator():
+                grams = self.ngrams(document)
+                self.documents[doctor_id] = grams
+                for gram in grams:
+                    self.postings[gram].add(doctor_id)
+            self.version = version
+
+    def search(self, q, limit=None):
+        """Return [(doctor_id, score)] best first"""
+        query_grams = self.ngrams(q)
+        if not query_grams:
+            return []
+        with self.lock:
+            if self.version != self.versions.version():
+                self.rebuild()
+            matches = Counter()
+            for gram in query_grams:
+                matches.update(self.postings.get(gram, ()))
+        ranked = [
+            (doctor_id, hits / len(query_grams))
+            for doctor_id, hits in matches.items()
+            if hits / len(query_grams) >= self.threshold
+        ]
+        ranked.sort(key=lambda item: (-item[1], item[0]))
+        return ranked[:limit] if limit else ranked
+
+
+doctor_index = NgramIndex(VersionedCache('doctor_search', alias=getattr(settings, 'DOCTOR_SEARCH_CACHE', 'default')))
+
+
+def _refresh(doctors):
+    """Recompute the denormalized fields of doctors and store those that changed; return them"""
+    stale = []
+    for doctor in doctors:
+        before = (doctor.normalized_name, doctor.search_document)
+        doctor.refresh_denormalized_fields()
+        if (doctor.normalized_name, doctor.search_document) != before:
+            stale.append(doctor)
+    Doctor.objects.bulk_update(stale, ['normalized_name', 'search_document'], batch_size=500)
+    for doctor in stale:
+        doctor_index.add(doctor.pk, doctor.search_document)
+    return stale
+
+
+def refresh_search_documents(doctors):
+    """Recompute the denormalized name/search fields of a Doctor queryset after related rows change"""
+    _refresh(doctors.select_related('user', 'department'))
+
+
+def rebuild_search_documents(batch_size=500):
+    """Recompute the denormalized fields of every doctor, e.g. rows saved before they existed.
+
+    Returns the number of doctors whose fields changed.
+    """
+    changed = 0
+    last_pk = 0
+    while True:
+        doctors = list(Doctor.objects.select_related('user', 'department')
+                       .filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+        if not doctors:
+            return changed
+        last_pk = doctors[-1].pk
+        changed += len(_refresh(doctors))
+
+
+def search_doctors(queryset, q):
+    """Filter a Doctor queryset by q and order it by relevance"""
+    if connection.vendor == 'postgresql':
+        return _postgres_search(queryset, q)
+    return _ngram_search(queryset, q)
+
+
+def _postgres_search(queryset, q):
+    from django.contrib.postgres.search import (
+        SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity,
+    )
+    term = q.lower()
+    return queryset.filter(
+        # Both predicates are served by the gin_trgm_ops index
+        Q(search_document__trigram_word_similar=term) | Q(search_document__contains=term)
+    ).annotate(
+        search_rank=TrigramWordSimilarity(term, 'search_document') + SearchRank(
+            SearchVector('search_document', config='simple'),
+            SearchQuery(term, config='simple'),
+        )
+    ).order_by('-search_rank', 'pk')
+
+
+def _ngram_search(queryset, q):
+    limit = getattr(settings, 'DOCTOR_SEARCH_LIMIT', 200)
+    ids = [doctor_id for doctor_id, _ in doctor_index.search(q)]
+    if len(ids) > limit:
+        # Cut only after queryset's own filters, or they could empty the top results
+        allowed = set(queryset.order_by().values_list('pk', flat=True))
+        ids = [doctor_id for doctor_id in ids if doctor_id in allowed][:limit]
+    if not ids:
+        return queryset.none()
+    rank = Case(*[When(pk=doctor_id, then=position) for position, doctor_id in enumerate(ids)])
+    return queryset.filter(pk__in=ids).order_by(rank)
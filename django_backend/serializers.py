@@ -1,8 +1,36 @@
 # Django Serializers for Hospital Management System
 
+from operator import itemgetter
+
+from django.db import models
+from django.db.models import F, OuterRef, QuerySet, Subquery, Value
+from django.db.models.functions import Concat, Trim
 from rest_framework import serializers
 from .models import *
 
+class EagerLoadingMixin:
+    """Let a serializer declare the relations it reads so they are fetched up front.
+
+    Querysets passed with many=True are prepared automatically; views that
+    evaluate a queryset themselves should call setup_eager_loading() first.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        if cls.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*cls.prefetch_related_fields)
+        return queryset
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        if args and isinstance(args[0], QuerySet):
+            args = (cls.setup_eager_loading(args[0]),) + args[1:]
+        return super().many_init(*args, **kwargs)
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -14,11 +42,12 @@ class DepartmentSerializer(serializers.ModelSerializer):
         model = Department
         fields = '__all__'
 
-class DoctorSerializer(serializers.ModelSerializer):
+class DoctorSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('user', 'department')
     user = UserSerializer(read_only=True)
     department_name = serializers.CharField(source='department.name', read_only=True)
-    rating_avg = serializers.FloatField(source='ratings__avg', read_only=True)
-    rating_count = serializers.IntegerField(source='ratings__count', read_only=True)
+    rating_avg = serializers.FloatField(read_only=True)
+    rating_count = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Doctor
@@ -26,28 +55,32 @@ class DoctorSerializer(serializers.ModelSerializer):
                  'department', 'department_name', 'is_available', 'consultation_fee',
                  'available_from', 'available_to', 'rating_avg', 'rating_count']
 
-class DoctorRatingSerializer(serializers.ModelSerializer):
+class DoctorRatingSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('patient__user',)
     patient_name = serializers.CharField(source='patient.user.get_full_name', read_only=True)
 
     class Meta:
         model = DoctorRating
         fields = ['id', 'rating', 'comment', 'patient_name', 'created_at']
 
-class PatientSerializer(serializers.ModelSerializer):
+class PatientSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('user',)
     user = UserSerializer(read_only=True)
     
     class Meta:
         model = Patient
         fields = ['id', 'user', 'emergency_contact', 'blood_group', 'medical_history']
 
-class AdminSerializer(serializers.ModelSerializer):
+class AdminSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('user',)
     user = UserSerializer(read_only=True)
     
     class Meta:
         model = Admin
         fields = ['id', 'user', 'employee_id', 'department']
 
-class AppointmentSerializer(serializers.ModelSerializer):
+class AppointmentSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('patient__user', 'doctor__user', 'department')
     patient_name = serializers.CharField(source='patient.user.get_full_name', read_only=True)
     patient_email = serializers.CharField(source='patient.user.email', read_only=True)
     patient_phone = serializers.CharField(source='patient.user.phone', read_only=True)
@@ -61,7 +94,8 @@ class AppointmentSerializer(serializers.ModelSerializer):
                  'doctor_name', 'department_name', 'preferred_doctor', 'appointment_date',
                  'appointment_time', 'symptoms', 'status', 'notes', 'created_at']
 
-class MedicalRecordSerializer(serializers.ModelSerializer):
+class MedicalRecordSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('patient__user', 'doctor__user')
     patient_name = serializers.CharField(source='patient.user.get_full_name', read_only=True)
     doctor_name = serializers.CharField(source='doctor.user.get_full_name', read_only=True)
     
@@ -70,7 +104,8 @@ class MedicalRecordSerializer(serializers.ModelSerializer):
         fields = ['id', 'patient_name', 'doctor_name', 'diagnosis', 'treatment',
                  'prescription', 'next_visit', 'created_at']
 
-class BillSerializer(serializers.ModelSerializer):
+class BillSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('patient__user', 'doctor__user', 'appointment')
     patient_name = serializers.CharField(source='patient.user.get_full_name', read_only=True)
     doctor_name = serializers.CharField(source='doctor.user.get_full_name', read_only=True)
     appointment_date = serializers.DateField(source='appointment.appointment_date', read_only=True)
@@ -81,10 +116,192 @@ class BillSerializer(serializers.ModelSerializer):
                  'consultation_fee', 'medication_cost', 'test_cost', 'other_charges',
                  'total_amount', 'payment_status', 'payment_date', 'created_at']
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('recipient',)
     recipient_name = serializers.CharField(source='recipient.get_full_name', read_only=True)
     
     class Meta:
         model = Notification
         fields = ['id', 'recipient_name', 'notification_type', 'title', 'message',
-                 'is_read', 'email_sent', 'sms_sent', 'created_at']
\ No newline at end of file
+                 'is_read', 'email_sent', 'sms_sent', 'created_at']
+# Read serializers
+#
+# The list endpoints render thousands of rows, and walking dotted sources
+# like patient.user.get_full_name through model instances dominates their
+# CPU time. A ReadSerializer mirrors a ModelSerializer's output from
+# .values() rows instead: related columns are selected by lookup, full names
+# are concatenated in SQL, and every field is rendered with the mirrored
+# serializer's own to_representation, resolved once per class, so the JSON is
+# identical. Like DRF, a field read through an empty nullable relation is
+# left out of the row rather than rendered as null.
+
+def full_name(prefix=''):
+    """SQL equivalent of User.get_full_name() for the user at prefix"""
+    name = Trim(Concat(F(f'{prefix}first_name'), Value(' '), F(f'{prefix}last_name'),
+                       output_field=models.CharField()))
+    # SQL TRIM only removes spaces; str.strip() in get_full_name() removes tabs and newlines too
+    name.strip_whitespace = True
+    return name
+
+# Fields whose values come out of .values() already in their JSON form
+_PASSTHROUGH_FIELDS = (serializers.CharField, serializers.ChoiceField, serializers.IntegerField,
+                       serializers.BooleanField, serializers.RelatedField)
+
+class ReadSerializer:
+    """Render .values() rows exactly as serializer_class renders instances.
+
+    columns maps a field to the lookup or expression it is read from; fields
+    not listed are read from the column of the same name. nested maps a field
+    to (lookup prefix, ReadSerializer). optional maps a field to the row key
+    that must be non-null for the field to be present.
+    """
+    serializer_class = None
+    columns = {}
+    nested = {}
+    optional = {}
+
+    def __init__(self, instance=None, many=False):
+        self.instance = instance
+        self.many = many
+
+    @classmethod
+    def field_names(cls):
+        return list(cls.serializer_class.Meta.fields)
+
+    @classmethod
+    def lookups(cls, prefix=''):
+        """(plain lookups, {alias: expression}) that select every needed column"""
+        plain, expressions = [], {}
+        for name in cls.field_names():
+            if name in cls.nested:
+                nested_prefix, reader = cls.nested[name]
+                nested_plain, _ = reader.lookups(prefix + nested_prefix)
+                plain += nested_plain
+                continue
+            source = cls.columns.get(name, name)
+            if isinstance(source, str):
+                plain.append(prefix + source)
+            else:
+                expressions[name] = source
+        plain += [prefix + key for key in cls.optional.values()
+                  if prefix + key not in plain and key not in expressions]
+        return plain, expressions
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        plain, expressions = cls.lookups()
+        return queryset.values(*plain, **expressions)
+
+    @classmethod
+    def plan(cls, prefix=''):
+        """[(field, row getter, converter or None, required key or None)], built once"""
+        cache = cls.__dict__.get('_plans')
+        if cache is None:
+            cache = cls._plans = {}
+        if prefix not in cache:
+            fields = cls.serializer_class().fields
+            steps = []
+            for name in cls.field_names():
+                required = cls.optional.get(name)
+                required = prefix + required if required else None
+                if name in cls.nested:
+                    nested_prefix, reader = cls.nested[name]
+                    steps.append((name, reader.renderer(prefix + nested_prefix), None, required))
+                    continue
+                source = cls.columns.get(name, name)
+                key = prefix + source if isinstance(source, str) else name
+                field = fields[name]
+                if getattr(source, 'strip_whitespace', False):
+                    convert = str.strip
+                else:
+                    convert = None if isinstance(field, _PASSTHROUGH_FIELDS) else field.to_representation
+                steps.append((name, itemgetter(key), convert, required))
+            cache[prefix] = steps
+        return cache[prefix]
+
+    @classmethod
+    def renderer(cls, prefix=''):
+        steps = cls.plan(prefix)
+
+        def render(row):
+            data = {}
+            for name, get, convert, required in steps:
+                if required is not None and row[required] is None:
+                    continue
+                value = get(row)
+                data[name] = convert(value) if convert is not None and value is not None else value
+            return data
+        return render
+
+    @property
+    def data(self):
+        render = self.renderer()
+        if self.many:
+            return [render(row) for row in self.instance]
+        return render(self.instance)
+
+class UserReadSerializer(ReadSerializer):
+    serializer_class = UserSerializer
+
+class DoctorReadSerializer(ReadSerializer):
+    serializer_class = DoctorSerializer
+    columns = {'department_name': 'department__name'}
+    nested = {'user': ('user__', UserReadSerializer)}
+    optional = {'department_name': 'department'}
+
+class DoctorRatingReadSerializer(ReadSerializer):
+    serializer_class = DoctorRatingSerializer
+    columns = {'patient_name': full_name('patient__user__')}
+    optional = {'patient_name': 'patient_id'}
+
+class AppointmentReadSerializer(ReadSerializer):
+    serializer_class = AppointmentSerializer
+    columns = {
+        'patient_name': full_name('patient__user__'),
+        'patient_email': 'patient__user__email',
+        'patient_phone': 'patient__user__phone',
+        'patient_address': 'patient__user__address',
+        'doctor_name': full_name('doctor__user__'),
+        'department_name': 'department__name',
+    }
+    optional = {'doctor_name': 'doctor_id'}
+
+def _archived(model, lookup, column):
+    """Correlated subquery reading lookup from the model row an archive id column points at"""
+    rows = model.objects.filter(pk=OuterRef(column))
+    strip = getattr(lookup, 'strip_whitespace', False)
+    if not isinstance(lookup, str):
+        rows, lookup = rows.annotate(_value=lookup), '_value'
+    subquery = Subquery(rows.values(lookup)[:1])
+    subquery.strip_whitespace = strip
+    return subquery
+
+class ArchivedAppointmentReadSerializer(ReadSerializer):
+    """ArchivedAppointment rows rendered exactly like live appointments.
+
+    The archive keeps related ids as plain columns, so names are read with
+    correlated subqueries. A doctor that no longer exists is left out, as
+    SET_NULL leaves it out of a live appointment.
+    """
+    serializer_class = AppointmentSerializer
+    columns = {
+        'patient_name': _archived(Patient, full_name('user__'), 'patient_id'),
+        'patient_email': _archived(Patient, 'user__email', 'patient_id'),
+        'patient_phone': _archived(Patient, 'user__phone', 'patient_id'),
+        'patient_address': _archived(Patient, 'user__address', 'patient_id'),
+        'doctor_name': _archived(Doctor, full_name('user__'), 'doctor_id'),
+        'department_name': _archived(Department, 'name', 'department_id'),
+    }
+    optional = {'doctor_name': 'doctor_name'}
+
+class BillReadSerializer(ReadSerializer):
+    serializer_class = BillSerializer
+    columns = {
+        'patient_name': full_name('patient__user__'),
+        'doctor_name': full_name('doctor__user__'),
+        'appointment_date': 'appointment__appointment_date',
+    }
+
+class NotificationReadSerializer(ReadSerializer):
+    serializer_class = NotificationSerializer
+    columns = {'recipient_name': full_name('recipient__')}
@@ -35,6 +35,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'hospital.instrumentation.InstrumentationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -79,6 +80,39 @@ DATABASES = {
 #     }
 # }
 
+# Trigram doctor search lookups; the app needs psycopg2, so only on PostgreSQL
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    INSTALLED_APPS.append('django.contrib.postgres')
+
+# Caches
+# locmem is per process; point 'default' at Redis in production so every
+# worker shares entries and invalidations, e.g.
+#   'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+#   'LOCATION': 'redis://127.0.0.1:6379/1',
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Doctor directory (list_doctors) read-through cache
+DOCTOR_DIRECTORY_CACHE = 'default'
+DOCTOR_DIRECTORY_CACHE_TIMEOUT = 300
+
+# Version key behind the in-process department cache used by bookings
+DEPARTMENT_CACHE = 'default'
+
+# Conditional GETs (ETag/Last-Modified) on the directory, ratings and dashboards.
+# CONDITIONAL_CACHE remembers when each validator was first issued; shared
+# between workers it gives every worker the same Last-Modified dates
+CONDITIONAL_CACHE = 'default'
+CONDITIONAL_TIMEOUT = 86400
+
+# Maximum ranked results from the in-process doctor search (non-PostgreSQL databases)
+DOCTOR_SEARCH_LIMIT = 200
+# Version key that tells every worker's in-process search index to rebuild
+DOCTOR_SEARCH_CACHE = 'default'
+
 # Custom User Model
 AUTH_USER_MODEL = 'hospital.User'
 
@@ -118,7 +152,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'hospital.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -128,6 +162,9 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20
 }
 
+# Rows fetched per server-side cursor round trip when streaming list responses
+STREAM_CHUNK_SIZE = 500
+
 # CORS Configuration (for React frontend)
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -151,6 +188,85 @@ TWILIO_ACCOUNT_SID = 'your-twilio-account-sid'
 TWILIO_AUTH_TOKEN = 'your-twilio-auth-token'
 TWILIO_PHONE_NUMBER = 'your-twilio-phone-number'
 
+# Serve doctor ratings from DoctorRatingSummary instead of aggregating DoctorRating.
+# Run `manage.py rebuild_rating_summaries` once before enabling.
+DOCTOR_RATING_SUMMARY_ENABLED = False
+
+# Appointment scheduling
+APPOINTMENT_SLOT_MINUTES = 30
+AVAILABILITY_MAX_DAYS = 31
+BULK_TRIAGE_MAX_ACTIONS = 1000
+
+# Notification outbox (drained by `manage.py dispatch_notifications`)
+NOTIFICATION_SMS_CLIENT = 'hospital.transports.TwilioSMSClient'
+NOTIFICATION_WORKERS = 4
+NOTIFICATION_BATCH_SIZE = 100
+NOTIFICATION_MAX_ATTEMPTS = 5
+NOTIFICATION_RETRY_BACKOFF = 30  # seconds, doubled on each retry
+NOTIFICATION_MAX_BACKOFF = 3600
+NOTIFICATION_LEASE_SECONDS = 300
+NOTIFICATION_CHANNEL_CONCURRENCY = {
+    'email': 4,
+    'sms': 2,
+}
+NOTIFICATION_EMAIL_CONNECTIONS = 4  # pooled SMTP connections per process
+NOTIFICATION_EMAIL_BATCH_SIZE = 20  # emails sent per connection checkout
+NOTIFICATION_COALESCE_WINDOW = 60  # seconds a delivery waits for related events before sending
+NOTIFICATION_IDLE_TIMEOUT = 60  # seconds before an idle SMTP/Twilio connection is closed
+
+# Notification inbox
+INBOX_CACHE = 'default'  # must be shared between processes for long-polling
+INBOX_CACHE_TIMEOUT = 300
+INBOX_LONG_POLL_TIMEOUT = 25  # seconds; keep below the proxy's read timeout
+
+# Request instrumentation (hospital.requests logger and /metrics)
+# /metrics is for hospital admins only by default. Let a Prometheus scraper in
+# either with an admin token (scrape config `authorization: {type: Token,
+# credentials: ...}`), or by listing its address here, but only when it reaches
+# Django directly: behind a reverse proxy REMOTE_ADDR is the proxy, so every
+# client would match.
+METRICS_ALLOWED_IPS = []
+SLOW_REQUEST_SECONDS = 1.0  # requests slower than this are logged as warnings
+PROFILING_ENABLED = DEBUG  # admins may send `X-Profile: cprofile` (or `pyinstrument`)
+PROFILE_HEADER = 'X-Profile'
+PROFILE_MAX_ROWS = 60
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'hospital.requests': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+# Token authentication cache. TOKEN_AUTH_CACHE holds the revocation versions
+# and must be shared by all workers (e.g. Redis) for logouts to reach them.
+TOKEN_AUTH_CACHE = 'default'
+TOKEN_AUTH_LOCAL_SIZE = 10000  # tokens kept per process (LRU)
+TOKEN_AUTH_LOCAL_TTL = 60  # seconds
+TOKEN_AUTH_SHARED = False  # also keep resolved users in TOKEN_AUTH_CACHE
+TOKEN_AUTH_SHARED_TIMEOUT = 300
+TOKEN_EXPIRY_HOURS = None  # None keeps tokens until logout
+
+# Bulk user import (`manage.py import_users` and api/users/import/)
+IMPORT_BATCH_SIZE = 1000
+IMPORT_HASH_WORKERS = None  # threads hashing supplied passwords; None uses one per CPU
+
+# Finance exports (Parquet/Arrow output needs pyarrow)
+EXPORT_CHUNK_SIZE = 5000
+
+# Idempotency-Key responses are replayed for this long
+IDEMPOTENCY_KEY_TTL_HOURS = 24
+
+# Retention (`manage.py archive_old_rows`)
+APPOINTMENT_RETENTION_DAYS = 730
+NOTIFICATION_RETENTION_DAYS = 180
+RETENTION_BATCH_SIZE = 500
+RETENTION_BATCH_PAUSE = 0.5  # seconds between batches
+
 # Security Settings for Production
 if not DEBUG:
     SECURE_BROWSER_XSS_FILTER = True
@@ -0,0 +1,193 @@
+# Django Signals for Hospital Management System
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+from .caching import department_cache, doctor_directory_cache
+from .models import Appointment, Bill, Department, Doctor, DoctorRating, User
+from .ratings import add_rating, rebuild_rating_summaries, remove_rating
+from .rollups import (
+    APPOINTMENT_FIELDS, BILL_FIELDS, UNKNOWN, apply_appointment_changes, apply_bill_changes, appointment_key,
+    bill_state, forget_doctor, move_doctor_revenue, recount_saved,
+)
+from .search import doctor_index, refresh_search_documents
+
+
+@receiver(post_init, sender=DoctorRating)
+def remember_rated_doctor(sender, instance, **kwargs):
+    instance._summary_doctor_id = instance.__dict__.get('doctor_id')
+
+
+@receiver(post_save, sender=DoctorRating)
+def rating_saved(sender, instance, created, **kwargs):
+    if created:
+        add_rating(instance.doctor_id, instance.rating)
+    else:
+        # An edited rating may have changed stars or doctor; recount the doctor it
+        # was loaded with as well as the one it points at now
+        doctor_ids = {instance._summary_doctor_id, instance.doctor_id} - {None}
+        rebuild_rating_summaries(doctor_ids=sorted(doctor_ids))
+    instance._summary_doctor_id = instance.doctor_id
+
+
+@receiver(post_delete, sender=DoctorRating)
+def rating_deleted(sender, instance, **kwargs):
+    remove_rating(instance.doctor_id, instance.rating)
+
+
+# Cache versions move on commit: bumped any earlier, a concurrent reader could
+# rebuild from the pre-commit rows and store them under the new version.
+
+@receiver([post_save, post_delete], sender=Doctor)
+@receiver([post_save, post_delete], sender=Department)
+@receiver([post_save, post_delete], sender=DoctorRating)
+def invalidate_doctor_directory(sender, **kwargs):
+    transaction.on_commit(doctor_directory_cache.invalidate)
+
+
+@receiver([post_save, post_delete], sender=Department)
+def invalidate_department_cache(sender, **kwargs):
+    transaction.on_commit(department_cache.invalidate)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_doctor_directory_for_user(sender, instance, **kwargs):
+    # Logins save last_login on every user; only doctors appear in the directory
+    if instance.user_type == 'doctor':
+        transaction.on_commit(doctor_directory_cache.invalidate)
+
+
+@receiver(post_save, sender=User)
+def revoke_cached_tokens_for_user(sender, instance, created, **kwargs):
+    # Deactivation or a password change must not outlive the cached user
+    if not created:
+        token_cache.revoke_user(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def revoke_cached_token(sender, instance, **kwargs):
+    token_cache.revoke_user(instance.user_id)
+
+
+# The n-gram index is only touched when a search_document really changes, so
+# saves that leave it alone do not make every worker rebuild its index.
+
+@receiver(post_init, sender=Doctor)
+def remember_search_document(sender, instance, **kwargs):
+    # Read __dict__ so a deferred field is not loaded just for this
+    instance._indexed_document = instance.__dict__.get('search_document')
+
+
+@receiver(post_save, sender=Doctor)
+def index_doctor(sender, instance, created, **kwargs):
+    if created or instance.search_document != instance._indexed_document:
+        doctor_index.add(instance.pk, instance.search_document)
+    instance._indexed_document = instance.search_document
+
+
+@receiver(post_delete, sender=Doctor)
+def unindex_doctor(sender, instance, **kwargs):
+    doctor_index.remove(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def reindex_doctor_user(sender, instance, created, **kwargs):
+    if instance.user_type == 'doctor' and not created:
+        refresh_search_documents(Doctor.objects.filter(user=instance))
+
+
+@receiver(post_save, sender=Department)
+def reindex_department(sender, instance, created, **kwargs):
+    if not created:
+        refresh_search_documents(Doctor.objects.filter(department=instance))
+
+
+@receiver(post_delete, sender=Department)
+def reindex_orphaned_doctors(sender, instance, **kwargs):
+    # on_delete=SET_NULL has already cleared the department on its doctors
+    refresh_search_documents(Doctor.objects.filter(department__isnull=True))
+
+
+# Analytics rollups: remember what each instance counted towards when it was
+# loaded, and move that contribution when it is saved. post_init runs before
+# Django marks a loaded instance as not adding, so `created` decides instead.
+
+@receiver(post_init, sender=Appointment)
+def remember_appointment_rollup(sender, instance, **kwargs):
+    instance._rollup_key = appointment_key(instance)
+
+
+@receiver(post_save, sender=Appointment)
+def update_appointment_rollup(sender, instance, created, **kwargs):
+    old, new = None if created else instance._rollup_key, appointment_key(instance)
+    if UNKNOWN in (old, new):
+        recount_saved(instance)
+    else:
+        apply_appointment_changes([(old, new)])
+    instance._rollup_key = new
+
+
+@receiver(post_init, sender=Bill)
+def remember_bill_rollup(sender, instance, **kwargs):
+    instance._rollup_state = bill_state(instance)
+
+
+@receiver(post_save, sender=Bill)
+def update_bill_rollup(sender, instance, created, **kwargs):
+    old, new = None if created else instance._rollup_state, bill_state(instance)
+    if UNKNOWN in (old, new):
+        recount_saved(instance)
+    else:
+        apply_bill_changes([(old, new)])
+    instance._rollup_state = new
+
+
+# Deletes subtract what the row counted towards once the transaction commits.
+# An instance loaded without its rollup fields reads them before the row goes.
+
+@receiver(pre_delete, sender=Appointment)
+def load_appointment_rollup(sender, instance, **kwargs):
+    if instance._rollup_key == UNKNOWN:
+        instance.refresh_from_db(fields=APPOINTMENT_FIELDS)
+        instance._rollup_key = appointment_key(instance)
+
+
+@receiver(post_delete, sender=Appointment)
+def remove_appointment_rollup(sender, instance, **kwargs):
+    key = instance._rollup_key
+    transaction.on_commit(lambda: apply_appointment_changes([(key, None)]))
+
+
+@receiver(pre_delete, sender=Bill)
+def load_bill_rollup(sender, instance, **kwargs):
+    if instance._rollup_state == UNKNOWN:
+        instance.refresh_from_db(fields=BILL_FIELDS)
+        instance._rollup_state = bill_state(instance)
+
+
+@receiver(post_delete, sender=Bill)
+def remove_bill_rollup(sender, instance, **kwargs):
+    state = instance._rollup_state
+    transaction.on_commit(lambda: apply_bill_changes([(state, None)]))
+
+
+@receiver(post_delete, sender=Doctor)
+def remove_doctor_rollups(sender, instance, **kwargs):
+    # Runs after its bills' callbacks above, which could not find its department
+    doctor_id = instance.pk
+    transaction.on_commit(lambda: forget_doctor(doctor_id))
+
+
+@receiver(post_init, sender=Doctor)
+def remember_doctor_department(sender, instance, **kwargs):
+    instance._rollup_department_id = instance.__dict__.get('department_id', UNKNOWN)
+
+
+@receiver(post_save, sender=Doctor)
+def move_doctor_rollups(sender, instance, created, **kwargs):
+    if not created and instance.department_id != instance._rollup_department_id:
+        move_doctor_revenue(instance.pk, instance.department_id)
+    instance._rollup_department_id = instance.department_id
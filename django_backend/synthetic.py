@@ -0,0 +1,223 @@
+# Synthetic Data Generator for Hospital Management System
+#
+# Seeds realistic volumes of rows with bulk_create so query plans, query
+# counts and benchmarks can be checked against something bigger than a
+# developer database. Output is deterministic for a given random seed.
+
+import random
+from contextlib import contextmanager
+from datetime import time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import doctor_directory_cache
+from .models import (
+    Appointment, Bill, Department, Doctor, DoctorRating, MedicalRecord,
+    Notification, Patient, User,
+)
+from .ratings import rebuild_rating_summaries
+from .rollups import refresh_rollups
+
+DEPARTMENTS = [
+    'Cardiology', 'Neurology', 'Orthopedics', 'Pediatrics', 'Dermatology',
+    'Oncology', 'Radiology', 'General Medicine', 'Gynecology', 'ENT',
+]
+FIRST_NAMES = [
+    'Aarav', 'Priya', 'Rahul', 'Ananya', 'Vikram', 'Meera', 'Arjun', 'Kavya',
+    'John', 'Sarah', 'Michael', 'Emily', 'David', 'Laura', 'James', 'Olivia',
+]
+LAST_NAMES = [
+    'Sharma', 'Patel', 'Reddy', 'Iyer', 'Gupta', 'Nair', 'Khan', 'Singh',
+    'Smith', 'Johnson', 'Brown', 'Wilson', 'Taylor', 'Clark', 'Lewis', 'Walker',
+]
+APPOINTMENT_STATUSES = ['pending'] * 5 + ['approved'] * 25 + ['completed'] * 60 + ['cancelled'] * 10
+SLOTS = [time(hour, minute) for hour in range(9, 17) for minute in (0, 30)]
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the created_at values we assign instead of now()"""
+    fields = [model._meta.get_field('created_at') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _bulk_create(model, objs, batch_size):
+    created = []
+    for chunk in _chunks(objs, batch_size):
+        created.extend(model.objects.bulk_create(chunk))
+    return created
+
+
+def seed(patients=5000, doctors=200, appointments_per_patient=4, ratings_per_doctor=20,
+         notifications_per_patient=3, days=365, random_seed=0, batch_size=2000, prefix='synthetic'):
+    """Insert a synthetic dataset and return the number of rows created per model"""
+    rng = random.Random(random_seed)
+    now = timezone.now()
+    password = make_password(None)
+
+    def past(max_days):
+        return now - timedelta(days=rng.uniform(0, max_days))
+
+    def person(kind, index):
+        return User(
+            username=f'{prefix}-{kind}-{index}@example.com',
+            email=f'{prefix}-{kind}-{index}@example.com',
+            email_normalized=User.canonical_email(f'{prefix}-{kind}-{index}@example.com'),
+            password=password,
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES),
+            user_type=kind,
+            phone=f'+1555{index:07d}',
+        )
+
+    with transaction.atomic():
+        departments = {d.name: d for d in Department.objects.filter(name__in=DEPARTMENTS)}
+        missing = [Department(name=name) for name in DEPARTMENTS if name not in departments]
+        for department in Department.objects.bulk_create(missing):
+            departments[department.name] = department
+        departments = list(departments.values())
+
+        doctor_users = _bulk_create(User, [person('doctor', i) for i in range(doctors)], batch_size)
+        doctor_rows = _bulk_create(Doctor, [
+            Doctor(
+                user=user,
+                specialization=department.name,
+                license_number=f'{prefix}-LIC-{i}',
+                experience_years=rng.randint(1, 35),
+                department=department,
+                is_available=rng.random() < 0.8,
+                consultation_fee=Decimal(rng.choice([300, 500, 800, 1000])),
+                available_from=time(9, 0),
+                available_to=time(17, 0),
+                # bulk_create skips Doctor.save(), so fill the denormalized fields here
+                normalized_name=Doctor.normalize_name(f'{user.first_name} {user.last_name}'),
+                search_document=Doctor.make_search_document(
+                    user.first_name, user.last_name, department.name, department.name,
+                ),
+            )
+            for i, (user, department) in enumerate(
+                (user, rng.choice(departments)) for user in doctor_users
+            )
+        ], batch_size)
+
+        patient_users = _bulk_create(User, [person('patient', i) for i in range(patients)], batch_size)
+        patient_rows = _bulk_create(Patient, [
+            Patient(user=user, blood_group=rng.choice(['A+', 'B+', 'O+', 'AB+', 'O-']))
+            for user in patient_users
+        ], batch_size)
+
+        appointments = []
+        approved_slots = set()
+        for patient in patient_rows:
+            for _ in range(rng.randint(0, appointments_per_patient * 2)):
+                doctor = rng.choice(doctor_rows)
+                status = rng.choice(APPOINTMENT_STATUSES)
+                created_at = past(days)
+                appointment_date = (created_at + timedelta(days=rng.randint(0, 14))).date()
+                appointment_time = rng.choice(SLOTS)
+                if status == 'approved':
+                    # Respect the one-approved-appointment-per-slot constraint
+                    slot = (doctor.pk, appointment_date, appointment_time)
+                    if slot in approved_slots:
+                        status = 'completed'
+                    approved_slots.add(slot)
+                appointments.append(Appointment(
+                    patient=patient,
+                    doctor=None if status == 'pending' else doctor,
+                    department_id=doctor.department_id,
+                    appointment_date=appointment_date,
+                    appointment_time=appointment_time,
+                    symptoms='Synthetic symptoms',
+                    status=status,
+                    created_at=created_at,
+                ))
+
+        with explicit_timestamps(Appointment, MedicalRecord, Bill, Notification, DoctorRating):
+            appointments = _bulk_create(Appointment, appointments, batch_size)
+
+            completed = [a for a in appointments if a.status == 'completed']
+            records = _bulk_create(MedicalRecord, [
+                MedicalRecord(
+                    patient_id=a.patient_id,
+                    doctor_id=a.doctor_id,
+                    appointment=a,
+                    diagnosis='Synthetic diagnosis',
+                    treatment='Synthetic treatment',
+                    created_at=a.created_at,
+                )
+                for a in completed
+            ], batch_size)
+
+            bills = []
+            for appointment, record in zip(completed, records):
+                bill = Bill(
+                    patient_id=appointment.patient_id,
+                    doctor_id=appointment.doctor_id,
+                    appointment=appointment,
+                    medical_record=record,
+                    consultation_fee=Decimal(rng.choice([300, 500, 800, 1000])),
+                    medication_cost=Decimal(rng.randint(0, 2000)),
+                    test_cost=Decimal(rng.randint(0, 3000)),
+                    other_charges=Decimal(rng.randint(0, 500)),
+                    payment_status=rng.choice(['paid', 'paid', 'pending', 'overdue']),
+                    created_at=appointment.created_at,
+                )
+                # bulk_create skips Bill.save(), so compute the total here
+                bill.total_amount = bill.consultation_fee + bill.medication_cost + bill.test_cost + bill.other_charges
+                bills.append(bill)
+            bills = _bulk_create(Bill, bills, batch_size)
+
+            ratings = _bulk_create(DoctorRating, [
+                DoctorRating(
+                    doctor=doctor,
+                    patient=rng.choice(patient_rows),
+                    rating=rng.choices([1, 2, 3, 4, 5], weights=[1, 1, 3, 6, 9])[0],
+                    comment='Synthetic review',
+                    created_at=past(days),
+                )
+                for doctor in doctor_rows
+                for _ in range(rng.randint(0, ratings_per_doctor * 2))
+            ], batch_size)
+
+            notifications = _bulk_create(Notification, [
+                Notification(
+                    recipient=user,
+                    notification_type='appointment_booking',
+                    title='Appointment Booking Confirmation',
+                    message='Synthetic notification',
+                    is_read=rng.random() < 0.7,
+                    created_at=past(days),
+                )
+                for user in patient_users
+                for _ in range(rng.randint(0, notifications_per_patient * 2))
+            ], batch_size)
+
+        # bulk_create bypasses the rating, rollup and cache invalidation signals
+        rebuild_rating_summaries(doctor_ids=[doctor.pk for doctor in doctor_rows])
+        refresh_rollups(full=True)
+        doctor_directory_cache.invalidate()
+
+    return {
+        'departments': len(departments),
+        'doctors': len(doctor_rows),
+        'patients': len(patient_rows),
+        'appointments': len(appointments),
+        'medical_records': len(records),
+        'bills': len(bills),
+        'ratings': len(ratings),
+        'notifications': len(notifications),
+    }
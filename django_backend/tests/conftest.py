@@ -0,0 +1,40 @@
+# Shared Test Fixtures for Hospital Management System
+
+import pytest
+from django.core.cache import caches
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from hospital.authentication import token_cache
+from hospital.transports import LocmemSMSClient, close_transports
+
+
+@pytest.fixture(autouse=True)
+def isolated_services(settings):
+    """Send SMS to a locmem outbox, skip the coalescing delay and start every test with empty caches"""
+    settings.NOTIFICATION_SMS_CLIENT = 'hospital.transports.LocmemSMSClient'
+    settings.NOTIFICATION_COALESCE_WINDOW = 0
+    close_transports()
+    LocmemSMSClient.outbox.clear()
+    # The database is rolled back between tests but caches are not
+    for cache in caches.all():
+        cache.clear()
+    token_cache.clear()
+    yield
+    close_transports()
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def client_for():
+    """Return an APIClient that authenticates as user with a real token"""
+    def make(user):
+        token, _ = Token.objects.get_or_create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
+    return make
@@ -0,0 +1,111 @@
+# Test Factories for Hospital Management System
+
+import itertools
+from datetime import date, time
+
+import factory
+
+from hospital.models import (
+    Appointment, Bill, Department, Doctor, DoctorRating, MedicalRecord, Notification, Patient, User,
+)
+
+_minutes = itertools.count()
+
+
+def next_time():
+    """A new time of day on every call, so approved appointments never share a slot"""
+    minutes = next(_minutes) % (24 * 60)
+    return time(minutes // 60, minutes % 60)
+
+
+class UserFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = User
+
+    username = factory.Sequence(lambda n: f'user-{n}@example.com')
+    email = factory.LazyAttribute(lambda user: user.username)
+    first_name = 'Test'
+    last_name = factory.Sequence(lambda n: f'User{n}')
+    user_type = 'patient'
+    phone = factory.Sequence(lambda n: f'+1555{n:07d}')
+
+
+class DepartmentFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Department
+
+    name = factory.Sequence(lambda n: f'Department {n}')
+
+
+class DoctorFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Doctor
+
+    user = factory.SubFactory(UserFactory, user_type='doctor')
+    specialization = 'General'
+    license_number = factory.Sequence(lambda n: f'LIC-{n}')
+    experience_years = 5
+    department = factory.SubFactory(DepartmentFactory)
+    consultation_fee = 100
+
+
+class PatientFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Patient
+
+    user = factory.SubFactory(UserFactory, user_type='patient')
+
+
+class AppointmentFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Appointment
+
+    patient = factory.SubFactory(PatientFactory)
+    doctor = factory.SubFactory(DoctorFactory)
+    department = factory.LazyAttribute(lambda appointment: appointment.doctor.department
+                                       if appointment.doctor else DepartmentFactory())
+    appointment_date = factory.LazyFunction(date.today)
+    appointment_time = factory.LazyFunction(next_time)
+    symptoms = 'Headache'
+    status = 'pending'
+
+
+class MedicalRecordFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = MedicalRecord
+
+    appointment = factory.SubFactory(AppointmentFactory, status='completed')
+    patient = factory.SelfAttribute('appointment.patient')
+    doctor = factory.SelfAttribute('appointment.doctor')
+    diagnosis = 'Migraine'
+    treatment = 'Rest'
+
+
+class BillFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Bill
+
+    medical_record = factory.SubFactory(MedicalRecordFactory)
+    appointment = factory.SelfAttribute('medical_record.appointment')
+    patient = factory.SelfAttribute('medical_record.patient')
+    doctor = factory.SelfAttribute('medical_record.doctor')
+    consultation_fee = 100
+
+
+class DoctorRatingFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = DoctorRating
+
+    doctor = factory.SubFactory(DoctorFactory)
+    patient = factory.SubFactory(PatientFactory)
+    rating = 5
+
+
+class NotificationFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Notification
+
+    recipient = factory.SubFactory(UserFactory)
+    notification_type = 'appointment_booking'
+    title = 'Appointment Booking Confirmation'
+    message = 'Your appointment has been booked.'
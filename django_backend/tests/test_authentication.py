@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from hospital.authentication import issue_token, revoke_token, token_cache
+
+from .factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+URL = '/api/notifications/unread-count/'
+
+
+@pytest.fixture
+def user():
+    return UserFactory()
+
+
+@pytest.fixture
+def client(client_for, user):
+    client = client_for(user)
+    assert client.get(URL).status_code == 200
+    return client
+
+
+def test_deleting_the_token_revokes_the_cached_entry(client, user, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        revoke_token(user)
+
+    assert client.get(URL).status_code == 401
+
+
+def test_saving_the_user_revokes_the_cached_entry(client, user, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        user.is_active = False
+        user.save()
+
+    assert client.get(URL).status_code == 401
+
+
+def test_expired_tokens_are_rejected_and_replaced(client, user, settings):
+    settings.TOKEN_EXPIRY_HOURS = 1
+    token = Token.objects.get(user=user)
+    Token.objects.filter(pk=token.pk).update(created=timezone.now() - timedelta(hours=2))
+    token_cache.clear()
+
+    response = client.get(URL)
+
+    assert response.status_code == 401
+    assert response.json()['detail'] == 'Token has expired.'
+    assert issue_token(user).key != token.key
+    assert issue_token(user).key == Token.objects.get(user=user).key
+
+
+def test_revocation_during_a_load_is_not_cached(user, django_capture_on_commit_callbacks):
+    key = Token.objects.create(user=user).key
+    loads = []
+
+    def load(key):
+        loads.append(key)
+        loaded = TokenAuthentication().authenticate_credentials(key)
+        if len(loads) == 1:
+            # The user is saved after the token row was read but before the stamp is
+            with django_capture_on_commit_callbacks(execute=True):
+                user.save()
+        return loaded
+
+    token_cache.resolve(key, load)
+    token_cache.resolve(key, load)
+    token_cache.resolve(key, load)
+
+    assert len(loads) == 2
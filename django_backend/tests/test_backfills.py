@@ -0,0 +1,63 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from hospital.booking import guest_patient
+from hospital.models import Doctor, Patient, User
+
+from .factories import DoctorFactory, PatientFactory, UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def legacy_user(email, **kwargs):
+    """A user saved before email_normalized existed"""
+    user = UserFactory(**kwargs)
+    User.objects.filter(pk=user.pk).update(username=email, email=email, email_normalized=None)
+    user.refresh_from_db()
+    return user
+
+
+def run(command, *args):
+    out = StringIO()
+    call_command(command, *args, stdout=out)
+    return out.getvalue()
+
+
+def test_returning_patient_is_found_before_the_email_backfill():
+    patient = PatientFactory(user=legacy_user('Ann.Lee@Example.com'))
+
+    found = guest_patient({'email': 'ann.lee@example.com', 'name': 'Ann Lee', 'phone': '', 'address': ''})
+
+    assert found == patient
+    assert Patient.objects.count() == 1
+
+
+def test_email_backfill_leaves_case_only_duplicates_to_the_oldest_account():
+    oldest = legacy_user('Ann@Example.com')
+    duplicate = legacy_user('ann@example.com')
+    other = legacy_user(' Bob@Example.com ')
+    taken = UserFactory(email='cy@example.com')
+    late = legacy_user('CY@example.com')
+
+    output = run('backfill_email_normalized', '--batch-size', '2')
+
+    normalized = dict(User.objects.values_list('pk', 'email_normalized'))
+    assert normalized[oldest.pk] == 'ann@example.com'
+    assert normalized[other.pk] == 'bob@example.com'
+    assert normalized[taken.pk] == 'cy@example.com'
+    assert normalized[duplicate.pk] is None and normalized[late.pk] is None
+    assert 'Normalized emails for 2 users' in output
+    assert f'{duplicate.pk}, {late.pk}' in output
+
+
+def test_doctor_name_backfill_makes_existing_doctors_resolvable():
+    doctor = DoctorFactory(user__first_name='Jane', user__last_name='Doe')
+    Doctor.objects.filter(pk=doctor.pk).update(normalized_name='', search_document='')
+    assert Doctor.objects.resolve(names=['Dr. Jane Doe'])[1] == {'Dr. Jane Doe': []}
+
+    assert 'Updated search fields for 1 doctors' in run('rebuild_search_documents')
+
+    assert Doctor.objects.resolve(names=['Dr. Jane Doe'])[1] == {'Dr. Jane Doe': [doctor]}
+    assert 'Updated search fields for 0 doctors' in run('rebuild_search_documents')
@@ -0,0 +1,45 @@
+from decimal import Decimal
+
+import pytest
+
+from hospital.billing import BillingError, parse_amount
+from hospital.models import Bill
+
+from .factories import AppointmentFactory, UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('100', Decimal('100.00')),
+    (' 12.346 ', Decimal('12.35')),
+    (0, Decimal('0.00')),
+    ('99999999.99', Decimal('99999999.99')),
+])
+def test_amounts_are_rounded_to_cents(value, expected):
+    assert parse_amount(value, 'fee') == expected
+
+
+@pytest.mark.parametrize('value', [
+    'abc', None, '', 'NaN', 'Infinity', '-1', '1e30', '100000000', '99999999.995',
+])
+def test_invalid_amounts_are_rejected(value):
+    with pytest.raises(BillingError):
+        parse_amount(value, 'fee')
+
+
+@pytest.mark.parametrize('fees', [
+    {'consultation_fee': '1e30'},
+    {'consultation_fee': 'NaN'},
+    {'consultation_fee': '123456789'},
+    {'consultation_fee': '60000000', 'medication_cost': '60000000'},
+])
+def test_out_of_range_bills_get_a_400(client_for, fees):
+    client = client_for(UserFactory(user_type='admin'))
+    appointment = AppointmentFactory(status='approved')
+
+    response = client.post('/api/bills/', {'appointment_id': appointment.pk, 'diagnosis': 'Flu',
+                                           'treatment': 'Rest', **fees}, format='json')
+
+    assert response.status_code == 400, response.data
+    assert not Bill.objects.exists()
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from hospital.booking import resolve_department
+from hospital.caching import VersionedCache, department_cache, doctor_directory_cache
+
+from .factories import DepartmentFactory, DoctorFactory, DoctorRatingFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize('change', [
+    lambda: DoctorFactory(),
+    lambda: DoctorFactory().delete(),
+    lambda: DoctorRatingFactory(),
+    lambda: DepartmentFactory().delete(),
+    lambda: DoctorFactory().user.save(),
+], ids=['doctor saved', 'doctor deleted', 'rating saved', 'department deleted', 'doctor user saved'])
+def test_directory_version_moves_only_once_the_change_commits(change, django_capture_on_commit_callbacks):
+    version = doctor_directory_cache.version()
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        change()
+        assert doctor_directory_cache.version() == version
+    for callback in callbacks:
+        callback()
+
+    assert doctor_directory_cache.version() != version
+
+
+def test_department_cache_is_dropped_when_a_department_changes(django_capture_on_commit_callbacks):
+    department = DepartmentFactory(name='Cardiology')
+    with django_capture_on_commit_callbacks(execute=True):
+        resolve_department('Cardiology')
+    assert department_cache.lookup('Cardiology')[0] == department
+
+    with django_capture_on_commit_callbacks(execute=True):
+        department.description = 'Hearts'
+        department.save()
+    assert department_cache.lookup('Cardiology')[0] is None
+
+    with django_capture_on_commit_callbacks(execute=True):
+        department.delete()
+    assert department_cache.lookup('Cardiology')[0] is None
+
+
+def test_concurrent_misses_wait_for_the_builder():
+    cache = VersionedCache('test_lock', lock_wait=2.0)
+    key = cache.key('parts')
+    cache.cache.add(f'{key}:lock', 1)
+    threading.Timer(0.1, lambda: cache.cache.set(key, 'built elsewhere')).start()
+
+    assert cache.get_or_build(('parts',), lambda: 'built here') == 'built elsewhere'
+    assert cache.stats['lock_waits'] == 1 and cache.stats['rebuilds'] == 0
+
+
+def test_a_miss_builds_itself_when_the_builder_never_finishes():
+    cache = VersionedCache('test_fallback', lock_wait=0.1)
+    cache.cache.add(f'{cache.key("parts")}:lock', 1)
+
+    assert cache.get_or_build(('parts',), lambda: 'built here') == 'built here'
+    assert cache.stats['lock_waits'] == 1
+
+
+def test_a_miss_builds_once_and_the_next_call_hits():
+    cache = VersionedCache('test_build')
+    builds = []
+
+    for _ in range(2):
+        assert cache.get_or_build(('parts',), lambda: builds.append(1) or 'payload') == 'payload'
+
+    assert len(builds) == 1
+    assert (cache.stats['misses'], cache.stats['hits'], cache.stats['rebuilds']) == (1, 1, 1)
+    cache.invalidate()
+    cache.get_or_build(('parts',), lambda: builds.append(1) or 'payload')
+    assert len(builds) == 2
@@ -0,0 +1,39 @@
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock
+
+import pytest
+from django.utils.http import parse_http_date
+
+from .factories import DoctorFactory
+
+pytestmark = pytest.mark.django_db
+
+NOW = datetime(2024, 5, 1, 9, 30, 15, 400000, tzinfo=dt_timezone.utc)
+
+
+@pytest.fixture
+def frozen_clock():
+    with mock.patch('hospital.conditional.timezone.now', return_value=NOW):
+        yield
+
+
+def test_change_within_the_same_second_is_not_answered_with_304(api_client, frozen_clock,
+                                                                django_capture_on_commit_callbacks):
+    DoctorFactory()
+    first = api_client.get('/api/doctors/')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        DoctorFactory()
+    changed = api_client.get('/api/doctors/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+
+    assert changed.status_code == 200
+    assert len(changed.json()) == 2
+    assert parse_http_date(changed['Last-Modified']) > parse_http_date(first['Last-Modified'])
+    again = api_client.get('/api/doctors/', HTTP_IF_MODIFIED_SINCE=changed['Last-Modified'])
+    assert again.status_code == 304
+
+
+def test_responses_vary_on_every_credential(api_client):
+    response = api_client.get('/api/doctors/')
+
+    assert {part.strip() for part in response['Vary'].split(',')} >= {'Authorization', 'Cookie'}
@@ -0,0 +1,110 @@
+import csv
+import io
+from datetime import date, timedelta
+
+import pytest
+
+from hospital.exports import BillDataset, ExportError, export
+
+from .factories import AppointmentFactory, BillFactory, DoctorFactory, UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def read_csv(chunks):
+    return list(csv.DictReader(io.StringIO(''.join(chunks))))
+
+
+def test_csv_streams_a_header_then_one_chunk_per_batch():
+    bills = [BillFactory() for _ in range(5)]
+
+    content_type, extension, chunks = export('bills', size=2)
+    chunks = list(chunks)
+
+    assert (content_type, extension) == ('text/csv', 'csv')
+    assert chunks[0] == ','.join(name for name, _ in BillDataset.columns) + '\r\n'
+    assert [len(chunk.splitlines()) for chunk in chunks[1:]] == [2, 2, 1]
+    assert [row['id'] for row in read_csv(chunks)] == [str(bill.pk) for bill in bills]
+
+
+def test_empty_export_still_has_a_header():
+    assert read_csv(export('appointments')[2]) == []
+    assert ''.join(export('appointments')[2]).startswith('id,created_at,appointment_date,')
+
+
+def test_missing_names_and_values_export_blank():
+    nameless = DoctorFactory(user=UserFactory(first_name='', last_name=''))
+    BillFactory(medical_record__appointment__doctor=nameless)
+    AppointmentFactory(doctor=None)
+
+    bill, = read_csv(export('bills')[2])
+    appointment = next(row for row in read_csv(export('appointments')[2]) if not row['doctor_id'])
+
+    assert (bill['doctor_name'], bill['payment_date']) == ('', '')
+    assert appointment['doctor_name'] == ''
+
+
+def test_filters_by_date_and_status():
+    AppointmentFactory(appointment_date=date.today() - timedelta(days=3))
+    kept = AppointmentFactory(status='approved')
+    AppointmentFactory()
+
+    rows = read_csv(export('appointments', start=date.today(), end=date.today(), status='approved')[2])
+
+    assert [row['id'] for row in rows] == [str(kept.pk)]
+
+
+@pytest.mark.parametrize('dataset, output', [('invoices', 'csv'), ('bills', 'xlsx')])
+def test_unknown_dataset_or_output_is_rejected(dataset, output):
+    with pytest.raises(ExportError):
+        export(dataset, output=output)
+
+
+@pytest.mark.parametrize('output', ['parquet', 'arrow'])
+def test_columnar_outputs_need_pyarrow(output):
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        with pytest.raises(ExportError, match='pyarrow'):
+            export('bills', output=output)
+    else:
+        pytest.skip('pyarrow is installed')
+
+
+def test_parquet_has_one_row_group_per_chunk():
+    pq = pytest.importorskip('pyarrow.parquet')
+    for _ in range(3):
+        BillFactory(medical_record__appointment__doctor=DoctorFactory(user=UserFactory(first_name='', last_name='')))
+
+    content_type, extension, chunks = export('bills', output='parquet', size=2)
+    table = pq.ParquetFile(io.BytesIO(b''.join(chunks)))
+
+    assert (content_type, extension) == ('application/vnd.apache.parquet', 'parquet')
+    assert table.metadata.num_row_groups == 2
+    data = table.read()
+    assert data.schema.names == [name for name, _ in BillDataset.columns]
+    assert data.column('doctor_name').to_pylist() == [''] * 3
+    assert data.column('payment_date').to_pylist() == [None] * 3
+
+
+def test_arrow_stream_round_trips():
+    pa = pytest.importorskip('pyarrow')
+    AppointmentFactory(doctor=None)
+    AppointmentFactory()
+
+    content_type, extension, chunks = export('appointments', output='arrow', size=1)
+    table = pa.ipc.open_stream(b''.join(chunks)).read_all()
+
+    assert (content_type, extension) == ('application/vnd.apache.arrow.stream', 'arrows')
+    assert table.num_rows == 2
+    assert table.column('doctor_id').null_count == 1
+    assert '' in table.column('doctor_name').to_pylist()
+
+
+def test_export_view_streams_the_file(client_for):
+    BillFactory()
+    response = client_for(UserFactory(user_type='admin')).get('/api/exports/bills/')
+
+    assert response.streaming
+    assert response['Content-Disposition'] == 'attachment; filename="bills.csv"'
+    assert len(read_csv(chunk.decode() for chunk in response.streaming_content)) == 1
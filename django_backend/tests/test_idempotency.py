@@ -0,0 +1,78 @@
+import threading
+from unittest import mock
+
+import pytest
+from django.db import OperationalError, connection
+
+from hospital.models import Bill, IdempotencyKey
+
+from .factories import AppointmentFactory, UserFactory
+
+# Each request thread runs on its own connection, so rows must really commit
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def bill_request():
+    appointment = AppointmentFactory(status='approved')
+    return {
+        'appointment_id': appointment.pk,
+        'diagnosis': 'Flu',
+        'treatment': 'Rest',
+        'consultation_fee': '100.00',
+    }
+
+
+def post_bill(client, data, key='retry-1'):
+    return client.post('/api/bills/', data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+
+def test_same_key_from_two_threads_creates_one_bill(client_for, bill_request):
+    if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+        pytest.skip("SQLite's shared in-memory database fails concurrent writers instead of blocking them")
+    user = UserFactory(user_type='admin')
+    barrier = threading.Barrier(2)
+    responses = []
+
+    def send():
+        client = client_for(user)
+        barrier.wait()
+        try:
+            responses.append(post_bill(client, bill_request))
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=send) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [r.status_code for r in responses] == [200, 200]
+    assert responses[0].json() == responses[1].json()
+    assert sorted(r.headers.get('Idempotent-Replayed', 'false') for r in responses) == ['false', 'true']
+    assert Bill.objects.count() == 1
+
+
+def test_validation_errors_are_replayed(client_for, bill_request):
+    client = client_for(UserFactory(user_type='admin'))
+    del bill_request['diagnosis']
+
+    first = post_bill(client, bill_request)
+    second = post_bill(client, bill_request)
+
+    assert first.status_code == second.status_code == 400
+    assert second.headers['Idempotent-Replayed'] == 'true'
+
+
+def test_unexpected_errors_are_not_stored(client_for, bill_request):
+    client = client_for(UserFactory(user_type='admin'))
+    client.raise_request_exception = False
+
+    with mock.patch('hospital.billing.Bill.objects.create', side_effect=OperationalError('connection lost')):
+        assert post_bill(client, bill_request).status_code == 500
+    assert not IdempotencyKey.objects.exists()
+
+    retry = post_bill(client, bill_request)
+    assert retry.status_code == 200
+    assert 'Idempotent-Replayed' not in retry.headers
@@ -0,0 +1,18 @@
+import pytest
+
+from hospital.importer import UserImporter
+from hospital.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+def test_passwords_are_hashed_in_parallel_workers(settings):
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+    rows = [{'userType': 'patient', 'email': f'p{i}@example.com', 'firstName': 'Pat', 'lastName': f'P{i}',
+             'password': f'secret-{i}'} for i in range(8)]
+
+    report = UserImporter(workers=2).run(rows)
+
+    assert report.as_dict()['failed'] == 0, report.errors
+    for i in range(8):
+        assert User.objects.get(email=f'p{i}@example.com').check_password(f'secret-{i}')
@@ -0,0 +1,75 @@
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from hospital import inbox
+from hospital.models import Notification
+
+from .factories import NotificationFactory, UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def short_poll(settings):
+    settings.INBOX_LONG_POLL_TIMEOUT = 0.2
+    return settings
+
+
+@pytest.mark.parametrize('value, expected', [
+    (None, 0.2), ('abc', 0.2), ('nan', 0.2), ('inf', 0.2), ('1e9', 0.2), ('-5', 0), ('0.05', 0.05), (0, 0),
+])
+def test_long_poll_timeout_is_clamped(short_poll, value, expected):
+    assert inbox.long_poll_timeout(value) == expected
+
+
+def test_returns_at_once_when_something_newer_exists():
+    notification = NotificationFactory()
+
+    with mock.patch('hospital.inbox.time.sleep', side_effect=AssertionError('should not wait')):
+        assert inbox.wait_for_new(notification.recipient, notification.pk - 1, timeout=5) == notification.pk
+
+
+def test_gives_up_after_the_timeout(django_assert_num_queries):
+    notification = NotificationFactory()
+    inbox.latest_id(notification.recipient)
+
+    started = time.monotonic()
+    with django_assert_num_queries(0):
+        latest = inbox.wait_for_new(notification.recipient, notification.pk, timeout=0.1, interval=0.02)
+
+    assert latest == notification.pk
+    assert 0.1 <= time.monotonic() - started < 1
+
+
+def test_wakes_up_when_a_notification_is_recorded(short_poll):
+    user = UserFactory()
+    since = inbox.latest_id(user)
+    # Runs outside this test's transaction, so record_new applies at once
+    arriving = threading.Timer(0.05, inbox.record_new, [[Notification(pk=since + 7, recipient=user)]])
+
+    started = time.monotonic()
+    arriving.start()
+    latest = inbox.wait_for_new(user, since, timeout=5, interval=0.01)
+    arriving.join()
+
+    assert latest == since + 7
+    assert time.monotonic() - started < 0.2
+
+
+def test_poll_view_clamps_the_timeout_and_renders_new_notifications(short_poll, client_for):
+    notification = NotificationFactory(recipient=UserFactory(first_name='Ann', last_name='Lee'))
+    client = client_for(notification.recipient)
+
+    response = client.get('/api/notifications/poll/', {'since_id': notification.pk - 1, 'timeout': 'soon'})
+    assert response.status_code == 200
+    assert response.data['latest_id'] == notification.pk
+    assert [(row['id'], row['recipient_name']) for row in response.data['results']] == [(notification.pk, 'Ann Lee')]
+
+    started = time.monotonic()
+    response = client.get('/api/notifications/poll/', {'since_id': notification.pk, 'timeout': '3600'})
+    assert response.status_code == 200
+    assert response.data['results'] == []
+    assert time.monotonic() - started < 2
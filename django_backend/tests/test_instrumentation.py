@@ -0,0 +1,25 @@
+import pytest
+
+from .factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def test_metrics_are_closed_to_local_addresses_by_default(api_client):
+    # Behind a reverse proxy every request arrives from the proxy's address
+    assert api_client.get('/metrics', REMOTE_ADDR='127.0.0.1').status_code == 403
+
+
+def test_metrics_are_open_to_admins_and_listed_scrapers(client_for, settings):
+    assert client_for(UserFactory(user_type='admin')).get('/metrics').status_code == 200
+
+    settings.METRICS_ALLOWED_IPS = ['10.0.0.5']
+    assert client_for(UserFactory()).get('/metrics', REMOTE_ADDR='10.0.0.5').status_code == 200
+
+
+def test_profiling_is_ignored_unless_enabled(client_for, settings):
+    settings.PROFILING_ENABLED = False
+    response = client_for(UserFactory(user_type='admin')).get('/api/doctors/', HTTP_X_PROFILE='cprofile')
+
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('application/json')
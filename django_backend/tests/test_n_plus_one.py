@@ -0,0 +1,56 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .factories import (
+    AppointmentFactory, BillFactory, DoctorFactory, DoctorRatingFactory, NotificationFactory, PatientFactory,
+    UserFactory,
+)
+
+pytestmark = pytest.mark.django_db
+
+SMALL, LARGE = 3, 25
+
+
+def growth_case(name):
+    """(endpoint, user it is requested as, row factory that grows its result set)"""
+    doctor = DoctorFactory()
+    patient = PatientFactory()
+    return {
+        'admin_dashboard': ('/api/dashboard/admin/', UserFactory(user_type='admin'),
+                            lambda: AppointmentFactory(status='pending')),
+        'doctor_dashboard': ('/api/dashboard/doctor/', doctor.user,
+                             lambda: AppointmentFactory(status='approved', doctor=doctor)),
+        'patient_dashboard': ('/api/dashboard/patient/', patient.user,
+                              lambda: BillFactory(medical_record__appointment__patient=patient)),
+        'list_doctors': ('/api/doctors/', None, lambda: DoctorRatingFactory()),
+        'doctor_ratings': (f'/api/doctors/{doctor.pk}/ratings/', None,
+                           lambda: DoctorRatingFactory(doctor=doctor)),
+        'notifications': ('/api/notifications/', patient.user,
+                          lambda: NotificationFactory(recipient=patient.user)),
+    }[name]
+
+
+def count_queries(api_client, path):
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get(path)
+    assert response.status_code == 200, response.data
+    return len(queries)
+
+
+@pytest.mark.parametrize('name', [
+    'admin_dashboard', 'doctor_dashboard', 'patient_dashboard', 'list_doctors', 'doctor_ratings', 'notifications',
+])
+def test_query_count_does_not_grow_with_the_result_set(api_client, name):
+    path, user, grow = growth_case(name)
+    if user is not None:
+        api_client.force_authenticate(user)
+
+    for _ in range(SMALL):
+        grow()
+    small = count_queries(api_client, path)
+    for _ in range(LARGE - SMALL):
+        grow()
+    large = count_queries(api_client, path)
+
+    assert large <= small, f'{path}: {small} -> {large} queries'
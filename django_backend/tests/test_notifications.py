@@ -0,0 +1,125 @@
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from hospital.models import Notification, NotificationDelivery
+from hospital.notifications import Dispatcher, enqueue_notification
+from hospital.transports import LocmemSMSClient
+
+from .factories import UserFactory
+
+# The dispatcher delivers from worker threads with their own connections,
+# so the rows they read must really be committed
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def drain(dispatcher=None):
+    # One worker: SQLite's shared in-memory test database locks whole tables
+    dispatcher = dispatcher or Dispatcher(workers=1)
+    while dispatcher.run_once():
+        pass
+    return dispatcher
+
+
+def test_enqueue_queues_one_delivery_per_channel_without_sending():
+    user = UserFactory(email='ann@example.com', phone='+15550100')
+    notification = enqueue_notification(user, 'bill_generated', 'Bill', 'Your bill is ready')
+
+    deliveries = NotificationDelivery.objects.filter(notification=notification)
+    assert sorted(deliveries.values_list('channel', 'destination')) == [
+        ('email', 'ann@example.com'), ('sms', '+15550100'),
+    ]
+    assert set(deliveries.values_list('status', flat=True)) == {'pending'}
+    assert mail.outbox == [] and LocmemSMSClient.outbox == []
+
+
+def test_enqueue_rolls_back_with_the_callers_transaction():
+    user = UserFactory()
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            enqueue_notification(user, 'bill_generated', 'Bill', 'Your bill is ready')
+            raise RuntimeError
+
+    assert not Notification.objects.exists()
+    assert not NotificationDelivery.objects.exists()
+
+
+def test_dispatch_sends_email_and_sms_and_marks_them_sent():
+    user = UserFactory(email='ann@example.com', phone='+15550100')
+    notification = enqueue_notification(user, 'bill_generated', 'Bill', 'Your bill is ready')
+
+    drain()
+
+    assert [(m.subject, m.to) for m in mail.outbox] == [('Bill', ['ann@example.com'])]
+    assert [(m['body'], m['to']) for m in LocmemSMSClient.outbox] == [('Your bill is ready', '+15550100')]
+    notification.refresh_from_db()
+    assert notification.email_sent and notification.sms_sent
+    assert set(NotificationDelivery.objects.values_list('status', flat=True)) == {'sent'}
+
+
+def test_failed_delivery_is_retried_with_backoff_then_given_up(monkeypatch):
+    def refuse(self, body, to):
+        raise ConnectionError('provider down')
+
+    monkeypatch.setattr(LocmemSMSClient, 'send', refuse)
+    user = UserFactory(email='', phone='+15550100')
+    enqueue_notification(user, 'bill_generated', 'Bill', 'Your bill is ready')
+    dispatcher = Dispatcher(workers=1, max_attempts=2, backoff=60)
+
+    assert dispatcher.run_once() == 1
+    delivery = NotificationDelivery.objects.get()
+    assert (delivery.status, delivery.attempts, delivery.last_error) == ('pending', 1, 'provider down')
+    assert delivery.next_attempt_at > timezone.now() + timedelta(seconds=30)
+
+    # Not due yet, so nothing is claimed
+    assert dispatcher.run_once() == 0
+
+    NotificationDelivery.objects.update(next_attempt_at=timezone.now())
+    assert dispatcher.run_once() == 1
+    delivery.refresh_from_db()
+    assert (delivery.status, delivery.attempts) == ('failed', 2)
+    assert dispatcher.stats['retried'] == 1 and dispatcher.stats['failed'] == 1
+
+
+def test_related_events_are_sent_as_one_digest():
+    user = UserFactory(email='ann@example.com', phone='')
+    enqueue_notification(user, 'bill_generated', 'Bill', 'Your bill is ready')
+    enqueue_notification(user, 'payment_received', 'Payment', 'Thank you for your payment')
+
+    drain()
+
+    assert len(mail.outbox) == 1
+    assert mail.outbox[0].subject == 'You have 2 new notifications'
+    assert Notification.objects.filter(email_sent=True).count() == 2
+
+
+def test_a_batch_that_folds_away_entirely_still_counts_as_progress():
+    user = UserFactory(email='ann@example.com', phone='')
+    enqueue_notification(user, 'appointment_booking', 'Booked', 'Booked', coalesce_key='appointment:1')
+    enqueue_notification(user, 'appointment_rejection', 'Cancelled', 'Cancelled', coalesce_key='appointment:1')
+    enqueue_notification(UserFactory(email='bob@example.com', phone=''), 'bill_generated', 'Bill', 'Ready')
+    dispatcher = Dispatcher(workers=1, batch_size=1)
+
+    # The booking and its rejection cancel out: nothing is sent, but two rows were handled
+    assert dispatcher.run_once() == 2
+    drain(dispatcher)
+
+    assert [m.to for m in mail.outbox] == [['bob@example.com']]
+    assert set(NotificationDelivery.objects.values_list('status', flat=True)) == {'superseded', 'sent'}
+
+
+def test_claiming_writes_text_only_for_digests():
+    user = UserFactory(email='ann@example.com', phone='')
+    enqueue_notification(user, 'bill_generated', 'Bill', 'Your bill is ready')
+    NotificationDelivery.objects.update(attempts=1)
+
+    with CaptureQueriesContext(connection) as queries:
+        claimed = Dispatcher(workers=1).claim_batch()
+
+    assert len(claimed) == 1
+    updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+    assert updates and not any('"subject"' in sql or '"body"' in sql for sql in updates)
@@ -0,0 +1,74 @@
+import pytest
+
+from .factories import (
+    AppointmentFactory, BillFactory, DoctorFactory, DoctorRatingFactory, NotificationFactory, PatientFactory,
+    UserFactory,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def clinic():
+    """A doctor and a patient with a few appointments, bills, ratings and notifications each"""
+    doctor = DoctorFactory()
+    patient = PatientFactory()
+    for _ in range(3):
+        AppointmentFactory(doctor=doctor, patient=patient, status='approved')
+        BillFactory(medical_record__appointment__patient=patient, medical_record__appointment__doctor=doctor)
+        DoctorRatingFactory(doctor=doctor)
+        NotificationFactory(recipient=patient.user)
+    AppointmentFactory(status='pending')
+    return doctor, patient
+
+
+def get(api_client, user, path):
+    if user is not None:
+        api_client.force_authenticate(user)
+    response = api_client.get(path)
+    assert response.status_code == 200, response.data
+    return response
+
+
+def test_admin_dashboard(api_client, clinic, django_assert_num_queries):
+    admin = UserFactory(user_type='admin')
+    # Change stamps (appointments, doctors), pending page, appointment stats, doctor stats
+    with django_assert_num_queries(5):
+        get(api_client, admin, '/api/dashboard/admin/')
+
+
+def test_doctor_dashboard(api_client, clinic, django_assert_num_queries):
+    doctor, _ = clinic
+    # Change stamp, doctor, today's appointments with their stats computed in Python
+    with django_assert_num_queries(3):
+        get(api_client, doctor.user, '/api/dashboard/doctor/')
+
+
+def test_patient_dashboard(api_client, clinic, django_assert_num_queries):
+    _, patient = clinic
+    # Change stamps (appointments, bills), patient, appointment and archived appointment
+    # pages, bill page, appointment stats, archived completed count, unpaid bill count
+    with django_assert_num_queries(9):
+        get(api_client, patient.user, '/api/dashboard/patient/')
+
+
+def test_list_doctors(api_client, clinic, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        get(api_client, None, '/api/doctors/')
+    # Served from the directory cache
+    with django_assert_num_queries(0):
+        get(api_client, None, '/api/doctors/')
+
+
+def test_doctor_ratings(api_client, clinic, django_assert_num_queries):
+    doctor, _ = clinic
+    # Change stamp, doctor, ratings page
+    with django_assert_num_queries(3):
+        get(api_client, None, f'/api/doctors/{doctor.pk}/ratings/')
+
+
+def test_notifications(api_client, clinic, django_assert_num_queries):
+    _, patient = clinic
+    # Inbox page and the unread count
+    with django_assert_num_queries(2):
+        get(api_client, patient.user, '/api/notifications/')
@@ -0,0 +1,60 @@
+import re
+from datetime import date, datetime, timedelta
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+from hospital.models import Appointment, Bill, Doctor, Notification, Patient
+from hospital.synthetic import seed
+
+pytestmark = pytest.mark.django_db
+
+
+def dashboard_queries():
+    """The filters behind the dashboard endpoints, keyed by a readable name"""
+    today = date.today()
+    today_start = timezone.make_aware(datetime.combine(today, datetime.min.time()))
+    doctor = Doctor.objects.order_by('pk').first()
+    patient = Patient.objects.order_by('pk').first()
+
+    return {
+        'admin: pending appointments': Appointment.objects.filter(status='pending'),
+        'admin: approved today': Appointment.objects.filter(
+            status='approved', created_at__gte=today_start, created_at__lt=today_start + timedelta(days=1),
+        ),
+        'doctor: appointments today': Appointment.objects.filter(doctor=doctor, appointment_date=today),
+        'patient: appointments': Appointment.objects.filter(patient=patient),
+        'patient: upcoming': Appointment.objects.filter(
+            patient=patient, status='approved', appointment_date__gte=today,
+        ),
+        'patient: unpaid bills': Bill.objects.filter(patient=patient, payment_status='pending'),
+        'inbox: unread notifications': Notification.objects.filter(recipient=patient.user, is_read=False),
+    }
+
+
+def full_scans(plan, table):
+    """Return the plan lines that read every row of table"""
+    if connection.vendor == 'postgresql':
+        pattern = re.compile(rf'Seq Scan on {table}\b')
+    else:
+        pattern = re.compile(rf'\bSCAN {table}\b(?! USING)')
+    return [line.strip() for line in plan.splitlines() if pattern.search(line)]
+
+
+@pytest.mark.skipif(connection.vendor not in ('postgresql', 'sqlite'),
+                    reason='plan parsing supports PostgreSQL and SQLite')
+def test_dashboard_queries_are_served_by_indexes():
+    seed(patients=500, doctors=10)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+        if connection.vendor == 'postgresql':
+            # At test scale a sequential scan is cheapest; ask whether an index could serve the query
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+    scans = {}
+    for name, queryset in dashboard_queries().items():
+        lines = full_scans(queryset.explain(), queryset.model._meta.db_table)
+        if lines:
+            scans[name] = lines
+    assert scans == {}
@@ -0,0 +1,72 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from hospital.models import DoctorRating, DoctorRatingSummary
+
+from .factories import DoctorFactory, DoctorRatingFactory
+
+pytestmark = pytest.mark.django_db
+
+FIELDS = ['count', 'total', 'stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5']
+
+
+def summary(doctor):
+    row = DoctorRatingSummary.objects.filter(doctor=doctor).values(*FIELDS).first()
+    return row if row and row['count'] else None
+
+
+def expected(doctor):
+    ratings = list(DoctorRating.objects.filter(doctor=doctor).values_list('rating', flat=True))
+    if not ratings:
+        return None
+    stars = {f'stars_{star}': ratings.count(star) for star in range(1, 6)}
+    return {'count': len(ratings), 'total': sum(ratings), **stars}
+
+
+def assert_summaries_match(*doctors):
+    for doctor in doctors:
+        assert summary(doctor) == expected(doctor)
+
+
+def test_summary_follows_create_edit_and_delete():
+    doctor = DoctorFactory()
+    first = DoctorRatingFactory(doctor=doctor, rating=5)
+    DoctorRatingFactory(doctor=doctor, rating=3)
+    assert summary(doctor) == {'count': 2, 'total': 8, 'stars_1': 0, 'stars_2': 0, 'stars_3': 1,
+                               'stars_4': 0, 'stars_5': 1}
+
+    first.rating = 1
+    first.save()
+    assert_summaries_match(doctor)
+
+    first.delete()
+    assert_summaries_match(doctor)
+    assert DoctorRatingSummary.objects.get(doctor=doctor).average == 3
+
+
+def test_moving_a_rating_recounts_both_doctors():
+    before, after = DoctorFactory(), DoctorFactory()
+    rating = DoctorRatingFactory(doctor=before, rating=4)
+    DoctorRatingFactory(doctor=before, rating=2)
+
+    rating = DoctorRating.objects.get(pk=rating.pk)
+    rating.doctor = after
+    rating.save()
+
+    assert_summaries_match(before, after)
+    assert DoctorRatingSummary.objects.get(doctor=before).average == 2
+
+
+def test_rebuild_repairs_drifted_summaries():
+    doctors = DoctorFactory.create_batch(3)
+    for i, doctor in enumerate(doctors):
+        DoctorRatingFactory.create_batch(i + 1, doctor=doctor, rating=i + 2)
+    DoctorRatingSummary.objects.update(count=99, total=0, stars_5=7)
+
+    output = StringIO()
+    call_command('rebuild_rating_summaries', '--batch-size', '2', stdout=output)
+
+    assert 'Rebuilt rating summaries for 3 doctors' in output.getvalue()
+    assert_summaries_match(*doctors)
@@ -0,0 +1,68 @@
+from decimal import Decimal
+
+import pytest
+
+from hospital.models import Appointment, ArchivedAppointment, Bill, Doctor, DoctorRating, Notification, User
+from hospital.retention import POLICIES
+from hospital.serializers import (
+    AppointmentReadSerializer, AppointmentSerializer, ArchivedAppointmentReadSerializer, BillReadSerializer,
+    BillSerializer, DoctorRatingReadSerializer, DoctorRatingSerializer, DoctorReadSerializer, DoctorSerializer,
+    NotificationReadSerializer, NotificationSerializer, UserReadSerializer, UserSerializer,
+)
+
+from .factories import (
+    AppointmentFactory, BillFactory, DoctorFactory, DoctorRatingFactory, NotificationFactory, PatientFactory,
+)
+
+pytestmark = pytest.mark.django_db
+
+# Names that only match get_full_name() if SQL trims exactly like str.strip()
+AWKWARD_NAMES = [('', 'Lee'), ('Ann', ''), ('', ''), (' Ann ', ' Lee '), ('Zoë', 'Ångström'), ('\tAnn', 'Lee\n')]
+
+
+def read(reader, queryset):
+    return reader(reader.setup_eager_loading(queryset.order_by('pk')), many=True).data
+
+
+def model(serializer, queryset):
+    return serializer(queryset.order_by('pk'), many=True).data
+
+
+@pytest.fixture
+def clinic():
+    patients = [PatientFactory(user__first_name=first, user__last_name=last) for first, last in AWKWARD_NAMES]
+    doctors = [DoctorFactory(user__first_name=first, user__last_name=last) for first, last in AWKWARD_NAMES]
+    Doctor.objects.filter(pk=doctors[0].pk).update(department=None)
+    for patient, doctor in zip(patients, doctors):
+        AppointmentFactory(patient=patient, doctor=doctor, status='approved')
+        AppointmentFactory(patient=patient, doctor=None, department=doctor.department or DoctorFactory().department)
+        BillFactory(medical_record__appointment__patient=patient, medical_record__appointment__doctor=doctor,
+                    consultation_fee=Decimal('120.50'), medication_cost=Decimal('0.05'))
+        DoctorRatingFactory(doctor=doctor, patient=patient, rating=4)
+        NotificationFactory(recipient=patient.user)
+    DoctorRatingFactory(doctor=doctors[1], patient=None)
+
+
+@pytest.mark.parametrize('reader, serializer, queryset', [
+    (UserReadSerializer, UserSerializer, User.objects.all()),
+    (DoctorReadSerializer, DoctorSerializer, Doctor.objects.with_rating_stats()),
+    (DoctorRatingReadSerializer, DoctorRatingSerializer, DoctorRating.objects.all()),
+    (AppointmentReadSerializer, AppointmentSerializer, Appointment.objects.all()),
+    (BillReadSerializer, BillSerializer, Bill.objects.all()),
+    (NotificationReadSerializer, NotificationSerializer, Notification.objects.all()),
+], ids=lambda value: value.__name__ if isinstance(value, type) else None)
+def test_read_serializers_match_their_model_serializers(clinic, reader, serializer, queryset):
+    assert read(reader, queryset.all()) == model(serializer, queryset.all())
+
+
+def test_archived_appointments_render_like_live_ones(clinic):
+    Appointment.objects.filter(status='approved').update(status='completed')
+    live = {row['id']: row for row in model(AppointmentSerializer, Appointment.objects.all())}
+
+    policy = POLICIES['appointments']
+    policy.archive_batch(policy.cutoff(days=-1), 500)
+
+    archived = read(ArchivedAppointmentReadSerializer, ArchivedAppointment.objects.all())
+    # The completed appointments without a medical record, one per doctor
+    assert len(archived) == len(AWKWARD_NAMES)
+    assert archived == [live[row['id']] for row in archived]
@@ -0,0 +1,97 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from hospital.models import Appointment, ArchivedAppointment, ArchivedNotification, Notification
+
+from .factories import AppointmentFactory, BillFactory, NotificationFactory, PatientFactory
+
+pytestmark = pytest.mark.django_db
+
+LONG_AGO = timezone.now() - timedelta(days=1000)
+
+
+def old(appointment):
+    Appointment.objects.filter(pk=appointment.pk).update(
+        created_at=LONG_AGO + timedelta(minutes=Appointment.objects.count()),
+        appointment_date=LONG_AGO.date(),
+    )
+    return appointment
+
+
+@pytest.fixture
+def history():
+    """A patient with old finished appointments, one of them billed, and some recent ones"""
+    patient = PatientFactory()
+    archivable = [old(AppointmentFactory(patient=patient, status=status))
+                  for status in ['completed', 'completed', 'cancelled']]
+    old(BillFactory(medical_record__appointment__patient=patient).appointment)
+    recent = [AppointmentFactory(patient=patient, status=status) for status in ['pending', 'approved']]
+    return patient, archivable, recent
+
+
+def archive():
+    call_command('archive_old_rows', '--pause', '0', stdout=StringIO())
+
+
+def dashboard(api_client, patient, query=''):
+    api_client.force_authenticate(patient.user)
+    response = api_client.get(f'/api/dashboard/patient/{query}')
+    assert response.status_code == 200, response.data
+    return response.json()
+
+
+def test_archiving_moves_only_unbilled_finished_appointments(history):
+    _, archivable, _ = history
+
+    archive()
+
+    assert set(ArchivedAppointment.objects.values_list('pk', flat=True)) == {a.pk for a in archivable}
+    assert not Appointment.objects.filter(pk__in=[a.pk for a in archivable]).exists()
+    assert Appointment.objects.count() == 3
+
+
+def test_patient_dashboard_is_unchanged_by_archiving(api_client, history):
+    patient, _, _ = history
+    before = dashboard(api_client, patient)
+
+    archive()
+
+    assert dashboard(api_client, patient) == before
+
+
+def test_patient_dashboard_pages_through_live_and_archived_appointments(api_client, history):
+    patient, _, _ = history
+    expected = [a['id'] for a in dashboard(api_client, patient)['appointments']]
+    archive()
+
+    seen, query = [], '?page_size=2'
+    while True:
+        page = dashboard(api_client, patient, query)
+        seen += [a['id'] for a in page['appointments']]
+        next_link = page['pagination']['appointments']['next']
+        if not next_link:
+            break
+        query = '?' + next_link.split('?', 1)[1]
+    assert seen == expected
+
+    previous = dashboard(api_client, patient, query)['pagination']['appointments']['previous']
+    page = dashboard(api_client, patient, '?' + previous.split('?', 1)[1])
+    assert [a['id'] for a in page['appointments']] == expected[2:4]
+
+
+def test_archived_notifications_leave_the_unread_count_alone(api_client):
+    patient = PatientFactory()
+    stale = NotificationFactory(recipient=patient.user, is_read=True)
+    Notification.objects.filter(pk=stale.pk).update(created_at=LONG_AGO)
+    NotificationFactory(recipient=patient.user)
+    api_client.force_authenticate(patient.user)
+    before = api_client.get('/api/notifications/unread-count/').json()
+
+    archive()
+
+    assert ArchivedNotification.objects.filter(pk=stale.pk).exists()
+    assert api_client.get('/api/notifications/unread-count/').json() == before
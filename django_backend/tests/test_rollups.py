@@ -0,0 +1,94 @@
+from datetime import date, time, timedelta
+
+import pytest
+from django.utils import timezone
+
+from hospital.models import Appointment, DailyAppointmentCount, DailyRevenue
+from hospital.retention import AppointmentRetention
+from hospital.rollups import recompute_days
+from hospital.triage import apply_bulk_actions
+
+from .factories import AppointmentFactory, BillFactory, DepartmentFactory, DoctorFactory
+
+pytestmark = pytest.mark.django_db
+
+DAY = date.today() + timedelta(days=7)
+
+
+def rollups():
+    revenue = set(DailyRevenue.objects.filter(bill_count__gt=0).values_list(
+        'day', 'doctor_id', 'department_id', 'payment_status', 'bill_count', 'total_amount'))
+    counts = set(DailyAppointmentCount.objects.filter(appointment_count__gt=0).values_list(
+        'day', 'doctor_id', 'department_id', 'status', 'appointment_count'))
+    return revenue, counts
+
+
+def assert_matches_recount(days):
+    incremental = rollups()
+    recompute_days(days)
+    assert incremental == rollups()
+
+
+def test_revenue_follows_a_doctor_into_a_new_department():
+    doctor = DoctorFactory()
+    bill = BillFactory(medical_record__appointment__doctor=doctor)
+
+    doctor.department = DepartmentFactory()
+    doctor.save()
+    bill.payment_status = 'paid'
+    bill.save()
+
+    assert set(DailyRevenue.objects.values_list('department_id', flat=True)) == {doctor.department_id}
+    assert_matches_recount([timezone.localdate(bill.created_at)])
+
+
+def test_triage_applies_one_rollup_delta_per_appointment():
+    doctor = DoctorFactory()
+    appointment = AppointmentFactory(department=doctor.department, status='pending',
+                                     appointment_date=DAY, appointment_time=time(9, 0))
+
+    results = apply_bulk_actions([
+        {'id': str(appointment.pk), 'action': 'approve', 'doctor_id': doctor.pk},
+        {'id': str(appointment.pk), 'action': 'approve', 'doctor_id': doctor.pk},
+    ])
+    apply_bulk_actions([{'id': str(appointment.pk), 'action': 'approve', 'doctor_id': doctor.pk}])
+
+    assert [result['status'] for result in results] == ['error', 'error']
+    assert_matches_recount([DAY])
+
+
+def test_deleted_bills_and_appointments_leave_the_rollups(django_capture_on_commit_callbacks):
+    kept = BillFactory()
+    deleted = BillFactory(medical_record__appointment__doctor=kept.doctor)
+    pending = AppointmentFactory(appointment_date=DAY, status='pending')
+    days = [timezone.localdate(kept.created_at), DAY]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        deleted.delete()
+        Appointment.objects.only('pk').get(pk=pending.pk).delete()
+
+    assert DailyRevenue.objects.get(doctor_id=kept.doctor_id).bill_count == 1
+    assert not DailyAppointmentCount.objects.filter(day=DAY, status='pending', appointment_count__gt=0).exists()
+    assert_matches_recount(days)
+
+
+def test_deleting_a_doctor_takes_it_out_of_the_rollups(django_capture_on_commit_callbacks):
+    bill = BillFactory()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        bill.doctor.delete()
+
+    assert not DailyRevenue.objects.exists()
+    assert_matches_recount([timezone.localdate(bill.created_at)])
+
+
+def test_archived_appointments_keep_their_count(django_capture_on_commit_callbacks):
+    day = date.today() - timedelta(days=1000)
+    appointment = AppointmentFactory(appointment_date=day, status='completed')
+    Appointment.objects.filter(pk=appointment.pk).update(created_at=timezone.now() - timedelta(days=1000))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert AppointmentRetention().archive_batch(AppointmentRetention().cutoff(), 10) == 1
+
+    assert DailyAppointmentCount.objects.get(day=day, status='completed').appointment_count == 1
+    assert_matches_recount([day])
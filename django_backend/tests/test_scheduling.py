@@ -0,0 +1,48 @@
+from datetime import date, time, timedelta
+
+import pytest
+
+from hospital.models import Appointment
+from hospital.scheduling import department_has_capacity
+
+from .factories import AppointmentFactory, DoctorFactory
+
+pytestmark = pytest.mark.django_db
+
+DAY = date.today() + timedelta(days=7)
+
+
+def book(api_client, department, at):
+    return api_client.post('/api/appointments/', {
+        'email': 'guest@example.com', 'name': 'Ann Lee', 'phone': '5550100', 'address': 'Main St',
+        'department': department.name, 'date': DAY.isoformat(), 'time': at, 'symptoms': 'Cough',
+    }, format='json')
+
+
+@pytest.mark.parametrize('at', ['10:15 AM', '07:00 PM'])
+def test_booking_off_the_slot_grid_is_accepted(api_client, at):
+    doctor = DoctorFactory()
+
+    response = book(api_client, doctor.department, at)
+
+    assert response.status_code == 201, response.data
+    assert Appointment.objects.filter(department=doctor.department).count() == 1
+
+
+def test_booking_when_every_doctor_is_taken_is_rejected(api_client):
+    doctor = DoctorFactory()
+    AppointmentFactory(doctor=doctor, status='approved', appointment_date=DAY, appointment_time=time(10, 0))
+
+    response = book(api_client, doctor.department, '10:15 AM')
+
+    assert response.status_code == 409
+
+
+def test_capacity_uses_the_overlap_check():
+    doctor = DoctorFactory()
+    AppointmentFactory(doctor=doctor, status='approved', appointment_date=DAY, appointment_time=time(10, 0))
+
+    assert not department_has_capacity(doctor.department, DAY, time(10, 29))
+    assert department_has_capacity(doctor.department, DAY, time(10, 30))
+    DoctorFactory(department=doctor.department)
+    assert department_has_capacity(doctor.department, DAY, time(10, 15))
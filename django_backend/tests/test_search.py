@@ -0,0 +1,70 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from hospital.importer import UserImporter
+from hospital.models import Doctor
+from hospital.search import doctor_index, search_doctors
+
+from .factories import DepartmentFactory, DoctorFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def found(q, queryset=None):
+    return list(search_doctors(queryset if queryset is not None else Doctor.objects.all(), q))
+
+
+def test_index_version_moves_only_when_a_search_document_changes():
+    doctor = DoctorFactory(specialization='Cardiology')
+    found('cardio')
+    version = doctor_index.versions.version()
+
+    Doctor.objects.get(pk=doctor.pk).save()
+    doctor.user.save(update_fields=['last_login'])
+    doctor.department.save()
+    assert doctor_index.versions.version() == version
+    assert doctor_index.version == version
+
+    doctor.specialization = 'Neurology'
+    doctor.save()
+    assert doctor_index.versions.version() != version
+    assert found('neuro') == [doctor]
+    assert found('cardio') == []
+
+
+def test_department_filter_applies_before_the_result_limit(api_client, settings):
+    settings.DOCTOR_SEARCH_LIMIT = 2
+    DoctorFactory.create_batch(3, specialization='Cardiology')
+    wanted = DoctorFactory(specialization='Cardiology', department=DepartmentFactory(name='Cardiac Surgery'))
+
+    response = api_client.get('/api/doctors/', {'q': 'cardiology', 'department': 'Cardiac Surgery'})
+
+    assert [doctor['id'] for doctor in response.json()] == [wanted.pk]
+    assert len(found('cardiology')) == 2
+
+
+def test_search_document_backfill_makes_existing_doctors_searchable():
+    doctor = DoctorFactory(specialization='Dermatology')
+    Doctor.objects.filter(pk=doctor.pk).update(search_document='')
+    doctor_index.versions.invalidate()
+    assert found('dermatology') == []
+
+    call_command('rebuild_search_documents', stdout=StringIO())
+
+    assert found('dermatology') == [doctor]
+
+
+def test_imported_doctors_are_searchable_right_away(api_client):
+    DoctorFactory(specialization='Cardiology')
+    assert api_client.get('/api/doctors/', {'q': 'cardio'}).status_code == 200
+
+    report = UserImporter(workers=1).run([{
+        'userType': 'doctor', 'email': 'zebra@example.com', 'firstName': 'Zebra', 'lastName': 'Stripe',
+        'specialization': 'Dermatology', 'licenseNumber': 'LIC-Z', 'experience': '3',
+    }])
+
+    assert report.created == 1, report.errors
+    found = api_client.get('/api/doctors/', {'q': 'zebra'}).json()
+    assert [doctor['user']['first_name'] for doctor in found] == ['Zebra']
@@ -0,0 +1,91 @@
+import smtplib
+import time
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+
+from hospital.transports import EmailTransport, build_email, close_transports, get_email_transport, get_sms_client
+
+
+class DroppingBackend(EmailBackend):
+    """Locmem backend whose first send finds the connection dropped by the server"""
+    drops = 0
+
+    def send_messages(self, messages):
+        if DroppingBackend.drops:
+            DroppingBackend.drops -= 1
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        return super().send_messages(messages)
+
+
+def emails(count):
+    return [build_email('Subject', 'Body', f'user{i}@example.com') for i in range(count)]
+
+
+def test_pool_reuses_one_connection_across_sends():
+    transport = EmailTransport(size=2)
+    assert transport.send(emails(2)) == [None, None]
+    assert transport.send(emails(3)) == [None, None, None]
+    assert len(mail.outbox) == 5
+    assert transport.stats['opened'] == 1
+
+
+def test_unpooled_transport_opens_a_connection_per_send():
+    transport = EmailTransport(pooled=False)
+    transport.send(emails(1))
+    transport.send(emails(1))
+    assert transport.stats['opened'] == 2
+    assert transport._idle.empty()
+
+
+def test_dropped_connection_is_reopened_once_and_the_message_sent():
+    transport = EmailTransport()
+    DroppingBackend.drops = 1
+    with mock.patch('hospital.transports.get_connection', DroppingBackend):
+        outcomes = transport.send(emails(2))
+    assert outcomes == [None, None]
+    assert len(mail.outbox) == 2
+    assert transport.stats == {'opened': 2, 'reconnected': 1, 'reaped': 0}
+
+
+def test_second_drop_is_reported_for_that_message_only():
+    transport = EmailTransport()
+    DroppingBackend.drops = 2
+    with mock.patch('hospital.transports.get_connection', DroppingBackend):
+        outcomes = transport.send(emails(2))
+    assert isinstance(outcomes[0], smtplib.SMTPServerDisconnected)
+    assert outcomes[1] is None
+    assert len(mail.outbox) == 1
+
+
+def test_idle_connections_are_reaped():
+    transport = EmailTransport(timeout=0.01)
+    transport.send(emails(1))
+    transport.reap()
+    assert transport.stats['reaped'] == 0
+    time.sleep(0.02)
+    transport.reap()
+    assert transport.stats['reaped'] == 1
+    assert transport._idle.empty()
+
+
+def test_expired_connection_is_replaced_on_acquire():
+    transport = EmailTransport(timeout=0.01)
+    transport.send(emails(1))
+    time.sleep(0.02)
+    transport.send(emails(1))
+    assert transport.stats['opened'] == 2
+    assert transport.stats['reaped'] == 1
+
+
+def test_close_transports_forgets_shared_instances():
+    email, sms = get_email_transport(), get_sms_client()
+    assert get_email_transport() is email
+    email.send(emails(1))
+    with mock.patch.object(EmailBackend, 'close') as closed:
+        close_transports()
+    closed.assert_called_once()
+    assert email._idle.empty()
+    assert get_email_transport() is not email
+    assert get_sms_client() is not sms
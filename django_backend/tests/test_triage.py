@@ -0,0 +1,112 @@
+from datetime import date, time, timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from hospital.models import Appointment
+from hospital.triage import apply_bulk_actions
+
+from .factories import AppointmentFactory, DoctorFactory
+
+pytestmark = pytest.mark.django_db
+
+DAY = date.today() + timedelta(days=7)
+
+
+@pytest.fixture
+def doctor():
+    return DoctorFactory()
+
+
+def booked(doctor, at=time(10, 0)):
+    return AppointmentFactory(doctor=doctor, status='approved', appointment_date=DAY, appointment_time=at)
+
+
+def pending(doctor, at=time(10, 0)):
+    return AppointmentFactory(department=doctor.department, status='pending',
+                              appointment_date=DAY, appointment_time=at)
+
+
+def statuses(results):
+    return [result['status'] for result in results]
+
+
+def test_failed_items_keep_their_slot(doctor):
+    held, wanted = booked(doctor), pending(doctor)
+
+    results = apply_bulk_actions([
+        {'id': str(held.pk), 'action': 'archive'},
+        {'id': str(wanted.pk), 'action': 'approve', 'doctor_id': doctor.pk},
+    ])
+
+    assert statuses(results) == ['error', 'error']
+    assert 'already has an appointment' in results[1]['error']
+
+
+def test_slot_freed_earlier_in_the_batch_can_be_taken(doctor):
+    held, wanted = booked(doctor), pending(doctor)
+
+    results = apply_bulk_actions([
+        {'id': str(held.pk), 'action': 'reject'},
+        {'id': str(wanted.pk), 'action': 'approve', 'doctor_id': doctor.pk},
+    ])
+
+    assert statuses(results) == ['ok', 'ok']
+    assert Appointment.objects.get(pk=wanted.pk).doctor == doctor
+
+
+def appointment_updates(queries):
+    return [q['sql'] for q in queries if q['sql'].startswith(f'UPDATE "{Appointment._meta.db_table}"')]
+
+
+def test_freed_slot_is_written_before_it_is_taken(doctor):
+    # PostgreSQL checks the approved-slot index row by row within one UPDATE
+    held, wanted = booked(doctor), pending(doctor)
+    other = pending(doctor, at=time(11, 0))
+
+    with CaptureQueriesContext(connection) as queries:
+        apply_bulk_actions([
+            {'id': str(held.pk), 'action': 'reject'},
+            {'id': str(other.pk), 'action': 'approve', 'doctor_id': doctor.pk},
+            {'id': str(wanted.pk), 'action': 'approve', 'doctor_id': doctor.pk},
+        ])
+
+    first, second = appointment_updates(queries)
+    assert held.pk.hex in first and other.pk.hex in first
+    assert wanted.pk.hex in second and held.pk.hex not in second
+
+
+def test_unrelated_rows_share_one_update(doctor):
+    items = [{'id': str(pending(doctor, at=time(9 + i, 0)).pk), 'action': 'approve', 'doctor_id': doctor.pk}
+             for i in range(3)]
+    items.append({'id': str(booked(doctor, at=time(15, 0)).pk), 'action': 'reject'})
+
+    with CaptureQueriesContext(connection) as queries:
+        assert statuses(apply_bulk_actions(items)) == ['ok'] * 4
+
+    assert len(appointment_updates(queries)) == 1
+
+
+def test_reapproving_keeps_or_moves_the_appointments_own_slot(doctor):
+    held = booked(doctor)
+    other = DoctorFactory(department=doctor.department)
+
+    assert statuses(apply_bulk_actions([{'id': str(held.pk), 'action': 'approve', 'doctor_id': doctor.pk}])) == ['ok']
+    assert statuses(apply_bulk_actions([
+        {'id': str(held.pk), 'action': 'approve', 'doctor_id': other.pk},
+        {'id': str(pending(doctor).pk), 'action': 'approve', 'doctor_id': doctor.pk},
+    ])) == ['ok', 'ok']
+
+
+def test_duplicate_ids_are_rejected(doctor):
+    appointment = pending(doctor)
+
+    results = apply_bulk_actions([
+        {'id': str(appointment.pk), 'action': 'approve', 'doctor_id': doctor.pk},
+        {'id': str(appointment.pk).upper(), 'action': 'reject'},
+    ])
+
+    assert statuses(results) == ['error', 'error']
+    assert results[0]['error'] == 'Appointment is listed more than once in this batch'
+    assert Appointment.objects.get(pk=appointment.pk).status == 'pending'
@@ -0,0 +1,247 @@
+# Notification Transports for Hospital Management System
+#
+# Opening an SMTP session (with its TLS handshake) or a Twilio HTTPS session
+# costs more than the message itself. These transports are shared by every
+# dispatcher thread in a process: SMTP connections are kept in a small pool
+# and reused for whole batches, and SMS goes through one pooled HTTP session.
+# Connections that sit idle longer than NOTIFICATION_IDLE_TIMEOUT are closed,
+# and a connection the server has dropped is reopened once before the send is
+# reported as failed.
+
+import queue
+import smtplib
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils.module_loading import import_string
+
+from .instrumentation import external_call
+
+
+def idle_timeout():
+    return getattr(settings, 'NOTIFICATION_IDLE_TIMEOUT', 60)
+
+
+class EmailTransport:
+    """Pool of open mail backend connections shared across threads.
+
+    With pooled=False every send() opens and closes its own connection, the
+    behaviour before pooling, kept as a benchmark baseline.
+    """
+
+    reconnect_errors = (smtplib.SMTPServerDisconnected, ConnectionError)
+
+    def __init__(self, size=None, timeout=None, pooled=True):
+        self.size = size or getattr(settings, 'NOTIFICATION_EMAIL_CONNECTIONS', 4)
+        self.timeout = timeout
+        self.pooled = pooled
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self.stats = {'opened': 0, 'reconnected': 0, 'reaped': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _open(self):
+        backend = get_connection(fail_silently=False)
+        backend.open()
+        self._count('opened')
+        return backend
+
+    def _close(self, backend):
+        try:
+            backend.close()
+        except Exception:
+            pass
+
+    def _expired(self, last_used):
+        return time.monotonic() - last_used > (self.timeout or idle_timeout())
+
+    def acquire(self):
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    backend, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._open()
+                if not self._expired(last_used):
+                    return backend
+                self._close(backend)
+                self._count('reaped')
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, backend):
+        if self.pooled:
+            self._idle.put((backend, time.monotonic()))
+        else:
+            self._close(backend)
+        self._slots.release()
+
+    def send(self, messages):
+        """Send EmailMessages over one pooled connection.
+
+        Returns one entry per message: None when it was sent, otherwise the
+        exception that stopped it, so callers can retry messages individually.
+        """
+        backend = self.acquire()
+        outcomes = []
+        try:
+            for message in messages:
+                try:
+                    with external_call('smtp'):
+                        try:
+                            backend.send_messages([message])
+                        except self.reconnect_errors:
+                            self._close(backend)
+                            backend = self._open()
+                            self._count('reconnected')
+                            backend.send_messages([message])
+                except Exception as e:
+                    outcomes.append(e)
+                else:
+                    outcomes.append(None)
+        finally:
+            self.release(backend)
+        return outcomes
+
+    def reap(self):
+        """Close connections that have been idle longer than the timeout"""
+        keep = []
+        while True:
+            try:
+                backend, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if self._expired(last_used):
+                self._close(backend)
+                self._count('reaped')
+            else:
+                keep.append((backend, last_used))
+        # LifoQueue: put the oldest back first so the freshest is reused next
+        for entry in keep:
+            self._idle.put(entry)
+
+    def close(self):
+        while True:
+            try:
+                backend, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._close(backend)
+
+
+def build_email(subject, body, to):
+    return EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [to])
+
+
+class LocmemSMSClient:
+    """SMS client that stores messages in memory, for tests and local development"""
+    outbox = []
+
+    def send(self, body, to):
+        self.outbox.append({'body': body, 'from': settings.TWILIO_PHONE_NUMBER, 'to': to})
+
+    def reap(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class TwilioSMSClient:
+    """SMS client backed by the Twilio REST API over one pooled HTTP session.
+
+    requests' connection pool is thread-safe, so a single client serves every
+    dispatcher thread; the session is swapped out under a lock when it has
+    been idle too long or a send fails at the connection level.
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.client = None
+        self.last_used = 0.0
+
+    def _build(self):
+        from twilio.http.http_client import TwilioHttpClient
+        from twilio.rest import Client
+        http_client = TwilioHttpClient(pool_connections=True, timeout=30)
+        return Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, http_client=http_client)
+
+    def _discard(self, client):
+        session = getattr(client.http_client, 'session', None)
+        if session is not None:
+            session.close()
+
+    def _current(self, fresh=False):
+        with self.lock:
+            expired = time.monotonic() - self.last_used > (self.timeout or idle_timeout())
+            if self.client is not None and (fresh or expired):
+                self._discard(self.client)
+                self.client = None
+            if self.client is None:
+                self.client = self._build()
+            self.last_used = time.monotonic()
+            return self.client
+
+    def send(self, body, to):
+        from requests.exceptions import ConnectionError as RequestsConnectionError
+        with external_call('twilio'):
+            try:
+                self._current().messages.create(body=body, from_=settings.TWILIO_PHONE_NUMBER, to=to)
+            except RequestsConnectionError:
+                self._current(fresh=True).messages.create(body=body, from_=settings.TWILIO_PHONE_NUMBER, to=to)
+
+    def reap(self):
+        with self.lock:
+            if self.client is not None and time.monotonic() - self.last_used > (self.timeout or idle_timeout()):
+                self._discard(self.client)
+                self.client = None
+
+    def close(self):
+        with self.lock:
+            if self.client is not None:
+                self._discard(self.client)
+                self.client = None
+
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+def _shared(name, factory):
+    with _transports_lock:
+        if name not in _transports:
+            _transports[name] = factory()
+        return _transports[name]
+
+
+def get_email_transport():
+    """Process-wide EmailTransport"""
+    return _shared('email', EmailTransport)
+
+
+def get_sms_client():
+    """Process-wide instance of the SMS client configured by NOTIFICATION_SMS_CLIENT"""
+    path = getattr(settings, 'NOTIFICATION_SMS_CLIENT', 'hospital.transports.TwilioSMSClient')
+    return _shared('sms', import_string(path))
+
+
+def reap_transports():
+    for transport in list(_transports.values()):
+        transport.reap()
+
+
+def close_transports():
+    """Close and forget every shared transport, e.g. after changing settings in a test"""
+    with _transports_lock:
+        for transport in _transports.values():
+            transport.close()
+        _transports.clear()
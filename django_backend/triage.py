@@ -0,0 +1,159 @@
+# Bulk Appointment Triage for Hospital Management System
+
+import uuid
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Appointment, Doctor
+from .notifications import appointment_message, enqueue_notifications
+from .rollups import apply_appointment_changes, appointment_key
+from .scheduling import BookingIndex, to_minutes
+
+ACTION_STATUS = {
+    'approve': 'approved',
+    'reject': 'cancelled',
+    'complete': 'completed',
+}
+ACTION_NOTIFICATION = {
+    'approve': 'approval',
+    'reject': 'rejection',
+}
+
+
+def _appointment_id(item):
+    try:
+        return str(uuid.UUID(str(item.get('id'))))
+    except ValueError:
+        return None
+
+
+def _doctor_id(item):
+    try:
+        return int(item['doctor_id']) if item.get('doctor_id') not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _resolve_doctors(items):
+    """Load every doctor referenced by the batch in one indexed query"""
+    doctor_ids = {_doctor_id(item) for item in items} - {None}
+    names = {item['assigned_doctor'] for item in items
+             if _doctor_id(item) is None and item.get('assigned_doctor')}
+    return Doctor.objects.resolve(doctor_ids=doctor_ids, names=names)
+
+
+def apply_bulk_actions(items):
+    """Apply approve/reject/complete actions to many appointments in one transaction.
+
+    items is a list of dicts with 'id', 'action' and, for approvals, either
+    'doctor_id' or 'assigned_doctor'. Returns one result dict per item; items
+    that fail validation are reported and skipped without aborting the batch.
+    An appointment listed more than once fails every time, since its items
+    could contradict each other. Items apply in order, so an appointment
+    rejected or reassigned early in the batch frees its slot for later ones.
+    """
+    results = [{'id': str(item.get('id')), 'action': item.get('action')} for item in items]
+    now = timezone.now()
+
+    with transaction.atomic():
+        ids = [_appointment_id(item) for item in items]
+        listed = Counter(ids)
+        appointments = {
+            str(a.pk): a for a in Appointment.objects
+            .select_for_update(of=('self',))
+            .select_related('patient__user', 'doctor__user')
+            .filter(pk__in=[pk for pk in ids if pk])
+        }
+        approval_items = [item for item in items if item.get('action') == 'approve']
+        by_id, by_name = _resolve_doctors(approval_items)
+
+        def doctor_for(item):
+            if _doctor_id(item) is not None:
+                return by_id.get(_doctor_id(item))
+            matches = by_name.get(item.get('assigned_doctor'), [])
+            return matches[0] if len(matches) == 1 else None
+
+        approving_doctors = {doctor_for(item).pk for item in approval_items if doctor_for(item)}
+        approving_dates = [appointments[pk].appointment_date
+                           for pk in map(_appointment_id, approval_items) if pk in appointments]
+        if approving_doctors and approving_dates:
+            # Lock every doctor we assign to, then check all slots against one index.
+            # Batch items keep their current slots until they are actually moved below.
+            list(Doctor.objects.select_for_update().filter(pk__in=approving_doctors).values_list('pk'))
+            bookings = BookingIndex.load(approving_doctors, min(approving_dates), max(approving_dates))
+        else:
+            bookings = BookingIndex()
+
+        changed = []
+        # Rows are written in waves so a slot is released before another row
+        # takes it; the partial unique index is checked row by row on PostgreSQL
+        waves = [[]]
+        freed = set()
+        notifications = []
+        for pk, item, result in zip(ids, items, results):
+            appointment = appointments.get(pk)
+            action = item.get('action')
+            if appointment is None:
+                result.update(status='error', error='Appointment not found')
+                continue
+            if listed[pk] > 1:
+                result.update(status='error', error='Appointment is listed more than once in this batch')
+                continue
+            if action not in ACTION_STATUS:
+                result.update(status='error', error=f'Unknown action: {action}')
+                continue
+
+            day, start = appointment.appointment_date, appointment.appointment_time
+            holds_slot = appointment.status == 'approved' and appointment.doctor_id is not None
+            released = (appointment.doctor_id, day, start) if holds_slot else None
+            if action == 'approve':
+                doctor = doctor_for(item)
+                if doctor is None:
+                    ambiguous = len(by_name.get(item.get('assigned_doctor'), [])) > 1
+                    result.update(status='error', error='Doctor name is ambiguous; pass doctor_id'
+                                  if ambiguous else 'Doctor not found')
+                    continue
+                if holds_slot:
+                    bookings.release(appointment.doctor_id, day, start)
+                if not bookings.is_free(doctor.pk, day, to_minutes(start)):
+                    if holds_slot:
+                        bookings.book(appointment.doctor_id, day, start)
+                    result.update(status='error', error=f'{doctor} already has an appointment at {start} on {day}')
+                    continue
+                bookings.book(doctor.pk, day, start)
+                appointment.doctor = doctor
+            elif holds_slot:
+                bookings.release(appointment.doctor_id, day, start)
+
+            appointment.status = ACTION_STATUS[action]
+            appointment.updated_at = now
+            changed.append(appointment)
+            result['status'] = 'ok'
+
+            claimed = (appointment.doctor_id, day, start) if appointment.status == 'approved' else None
+            if claimed and claimed != released and claimed in freed:
+                waves.append([])
+                freed = set()
+            waves[-1].append(appointment)
+            if released and released != claimed:
+                freed.add(released)
+
+            if action in ACTION_NOTIFICATION:
+                notification_type = ACTION_NOTIFICATION[action]
+                subject, message = appointment_message(appointment, notification_type)
+                notifications.append((appointment.patient.user, f'appointment_{notification_type}',
+                                      subject, message, f'appointment:{appointment.pk}'))
+
+        for wave in waves:
+            Appointment.objects.bulk_update(wave, ['doctor', 'status', 'updated_at'], batch_size=500)
+        # bulk_update skips the post_save rollup signal; move each appointment once,
+        # from the key it was loaded with to its final one
+        changed_once = {a.pk: a for a in changed}.values()
+        apply_appointment_changes([(a._rollup_key, appointment_key(a)) for a in changed_once])
+        for appointment in changed_once:
+            appointment._rollup_key = appointment_key(appointment)
+        enqueue_notifications(notifications)
+
+    return results
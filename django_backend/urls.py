@@ -3,15 +3,19 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views
+from .instrumentation import metrics_view
 
 # API URL patterns
 urlpatterns = [
     # Authentication
     path('api/auth/login/', views.CustomAuthToken.as_view(), name='api_token_auth'),
+    path('api/auth/logout/', views.logout_user, name='logout_user'),
     path('api/auth/register/', views.register_user, name='register_user'),
+    path('api/users/import/', views.import_users, name='import_users'),
     
     # Appointments
     path('api/appointments/', views.create_appointment, name='create_appointment'),
+    path('api/appointments/bulk/', views.bulk_triage_appointments, name='bulk_triage_appointments'),
     path('api/appointments/<uuid:appointment_id>/approve/', views.approve_appointment, name='approve_appointment'),
     path('api/appointments/<uuid:appointment_id>/reject/', views.reject_appointment, name='reject_appointment'),
     path('api/appointments/<uuid:appointment_id>/complete/', views.complete_appointment, name='complete_appointment'),
@@ -21,10 +25,30 @@ urlpatterns = [
     
     # Doctors
     path('api/doctors/', views.list_doctors, name='list_doctors'),
+    path('api/doctors/cache-stats/', views.doctor_directory_cache_stats, name='doctor_directory_cache_stats'),
     path('api/doctors/<int:doctor_id>/ratings/', views.doctor_ratings, name='doctor_ratings'),
 
+    # Availability
+    path('api/availability/', views.doctor_availability, name='doctor_availability'),
+
+    # Notification inbox
+    path('api/notifications/', views.list_notifications, name='list_notifications'),
+    path('api/notifications/unread-count/', views.notification_unread_count, name='notification_unread_count'),
+    path('api/notifications/mark-read/', views.mark_notifications_read, name='mark_notifications_read'),
+    path('api/notifications/poll/', views.poll_notifications, name='poll_notifications'),
+
+    # Finance exports
+    path('api/exports/<str:dataset>/', views.export_data, name='export_data'),
+
+    # Analytics
+    path('api/analytics/revenue/', views.revenue_analytics, name='revenue_analytics'),
+    path('api/analytics/appointments/', views.appointment_analytics, name='appointment_analytics'),
+
     # Dashboards
     path('api/dashboard/admin/', views.admin_dashboard, name='admin_dashboard'),
     path('api/dashboard/doctor/', views.doctor_dashboard, name='doctor_dashboard'),
     path('api/dashboard/patient/', views.patient_dashboard, name='patient_dashboard'),
+
+    # Prometheus metrics
+    path('metrics', metrics_view, name='metrics'),
 ]
\ No newline at end of file
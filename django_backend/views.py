@@ -2,14 +2,16 @@
 
 from django.contrib.auth import authenticate, login
 from django.contrib.auth.decorators import login_required
-from django.core.mail import send_mail
-from django.db.models import Q
-from django.http import JsonResponse
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Q
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils.decorators import method_decorator
 from django.views import View
+from django.utils import timezone
 from rest_framework import status, viewsets, permissions
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.permissions import IsAuthenticated, AllowAny
@@ -19,11 +21,21 @@ from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.serializers import AuthTokenSerializer
 from django.conf import settings
 import json
-from datetime import datetime, date
-from twilio.rest import Client
+from datetime import datetime, date, timedelta
 
 from .models import *
 from .serializers import *
+from . import billing, booking, exports, importer, inbox, rollups
+from .authentication import issue_token, revoke_token
+from .caching import doctor_directory_cache
+from .conditional import conditional_response, stamp
+from .idempotency import idempotent
+from .notifications import appointment_message, enqueue_notification
+from .pagination import paginate, paginate_merged, stream_json, wants_stream
+from .permissions import IsHospitalAdmin
+from .scheduling import SlotConflict, free_slots, parse_date, reserve_slot
+from .search import search_doctors
+from .triage import apply_bulk_actions
 
 # Authentication Views
 class CustomAuthToken(ObtainAuthToken):
@@ -32,7 +44,7 @@ class CustomAuthToken(ObtainAuthToken):
                                            context={'request': request})
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data['user']
-        token, created = Token.objects.get_or_create(user=user)
+        token = issue_token(user)
         return Response({
             'token': token.key,
             'user_id': user.pk,
@@ -41,6 +53,13 @@ class CustomAuthToken(ObtainAuthToken):
             'name': f"{user.first_name} {user.last_name}"
         })
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def logout_user(request):
+    """Revoke the caller's token in every worker"""
+    revoke_token(request.user)
+    return Response({'message': 'Logged out'})
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def register_user(request):
@@ -87,57 +106,38 @@ def register_user(request):
     except Exception as e:
         return Response({'error': str(e)}, status=400)
 
+@api_view(['POST'])
+@permission_classes([IsHospitalAdmin])
+def import_users(request):
+    """Bulk-register users from an uploaded CSV/JSONL 'file' or a JSON 'rows' list"""
+    try:
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true')
+        if 'file' in request.FILES:
+            report = importer.import_uploaded_file(
+                request.FILES['file'], file_format=request.data.get('file_format'), dry_run=dry_run
+            )
+        elif isinstance(request.data.get('rows'), list):
+            report = importer.UserImporter(dry_run=dry_run).run(request.data['rows']).as_dict()
+        else:
+            return Response({'error': "Upload a 'file' or pass a 'rows' list"}, status=400)
+        return Response(report, status=200 if dry_run or not report['created'] else 201)
+
+    except Exception as e:
+        return Response({'error': str(e)}, status=400)
+
 # Appointment Views
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def create_appointment(request):
     try:
-        data = request.data
-        
-        # Get or create patient
-        user_email = data['email']
-        try:
-            user = User.objects.get(email=user_email)
-            patient = Patient.objects.get(user=user)
-        except User.DoesNotExist:
-            # Create guest patient
-            user = User.objects.create_user(
-                username=user_email,
-                email=user_email,
-                password='temp123',  # Temporary password
-                first_name=data['name'].split()[0],
-                last_name=' '.join(data['name'].split()[1:]) if len(data['name'].split()) > 1 else '',
-                user_type='patient',
-                phone=data['phone'],
-                address=data['address']
-            )
-            patient = Patient.objects.create(
-                user=user,
-                emergency_contact=data.get('emergencyContact', '')
-            )
-        
-        # Get department
-        department, _ = Department.objects.get_or_create(name=data['department'])
-        
-        # Create appointment
-        appointment = Appointment.objects.create(
-            patient=patient,
-            department=department,
-            preferred_doctor=data.get('doctor', ''),
-            appointment_date=datetime.strptime(data['date'], '%Y-%m-%d').date(),
-            appointment_time=datetime.strptime(data['time'], '%I:%M %p').time(),
-            symptoms=data['symptoms'],
-            status='pending'
-        )
-        
-        # Send notification to admins
-        send_appointment_notification(appointment, 'booking')
-        
+        appointment = booking.book_appointment(request.data)
         return Response({
             'message': 'Appointment created successfully',
             'appointment_id': str(appointment.id)
         }, status=201)
-    
+
+    except booking.NoCapacity as e:
+        return Response({'error': str(e)}, status=409)
     except Exception as e:
         return Response({'error': str(e)}, status=400)
 
@@ -146,25 +146,34 @@ def create_appointment(request):
 def approve_appointment(request, appointment_id):
     try:
         appointment = get_object_or_404(Appointment, id=appointment_id)
-        assigned_doctor_name = request.data.get('assigned_doctor')
+        doctor_id = request.data.get('doctor_id')
+        assigned_doctor_name = request.data.get('assigned_doctor') or ''
         
-        # Find doctor
-        doctor = Doctor.objects.filter(
-            user__first_name__icontains=assigned_doctor_name.split()[-1]
-        ).first()
+        # Find doctor by id, or by exact (normalized) full name
+        if doctor_id:
+            by_id, _ = Doctor.objects.resolve(doctor_ids=[int(doctor_id)])
+            doctor = by_id.get(int(doctor_id))
+        else:
+            _, by_name = Doctor.objects.resolve(names=[assigned_doctor_name])
+            matches = by_name[assigned_doctor_name]
+            if len(matches) > 1:
+                return Response({'error': 'Doctor name is ambiguous; pass doctor_id'}, status=400)
+            doctor = matches[0] if matches else None
         
         if doctor:
-            appointment.doctor = doctor
-            appointment.status = 'approved'
-            appointment.save()
-            
-            # Send notifications
-            send_appointment_notification(appointment, 'approval')
+            with transaction.atomic():
+                reserve_slot(doctor, appointment)
+                appointment.doctor = doctor
+                appointment.status = 'approved'
+                appointment.save()
+                send_appointment_notification(appointment, 'approval')
             
             return Response({'message': 'Appointment approved successfully'})
         else:
             return Response({'error': 'Doctor not found'}, status=400)
     
+    except SlotConflict as e:
+        return Response({'error': str(e)}, status=409)
     except Exception as e:
         return Response({'error': str(e)}, status=400)
 
@@ -173,11 +182,10 @@ def approve_appointment(request, appointment_id):
 def reject_appointment(request, appointment_id):
     try:
         appointment = get_object_or_404(Appointment, id=appointment_id)
-        appointment.status = 'cancelled'
-        appointment.save()
-        
-        # Send notification
-        send_appointment_notification(appointment, 'rejection')
+        with transaction.atomic():
+            appointment.status = 'cancelled'
+            appointment.save()
+            send_appointment_notification(appointment, 'rejection')
         
         return Response({'message': 'Appointment rejected'})
     
@@ -197,106 +205,245 @@ def complete_appointment(request, appointment_id):
     except Exception as e:
         return Response({'error': str(e)}, status=400)
 
+@api_view(['POST'])
+@permission_classes([IsHospitalAdmin])
+def bulk_triage_appointments(request):
+    try:
+        actions = request.data.get('actions')
+        if not isinstance(actions, list) or not actions:
+            return Response({'error': 'actions must be a non-empty list'}, status=400)
+
+        max_actions = getattr(settings, 'BULK_TRIAGE_MAX_ACTIONS', 1000)
+        if len(actions) > max_actions:
+            return Response({'error': f'At most {max_actions} actions per request'}, status=400)
+
+        results = apply_bulk_actions(actions)
+        return Response({
+            'results': results,
+            'applied': sum(1 for result in results if result['status'] == 'ok'),
+            'failed': sum(1 for result in results if result['status'] == 'error')
+        })
+
+    except Exception as e:
+        return Response({'error': str(e)}, status=400)
+
 # Bill Views
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def create_bill(request):
+    """Create a bill; send an Idempotency-Key header to make retries safe"""
+    return idempotent(request, 'create_bill', lambda: _create_bill(request.data))
+
+def _create_bill(data):
     try:
-        data = request.data
-        appointment = get_object_or_404(Appointment, id=data['appointment_id'])
-        
-        # Create medical record
-        medical_record = MedicalRecord.objects.create(
-            patient=appointment.patient,
-            doctor=appointment.doctor,
-            appointment=appointment,
+        bill = billing.create_bill(
+            data['appointment_id'],
             diagnosis=data['diagnosis'],
-            treatment=data['treatment']
-        )
-        
-        # Create bill
-        bill = Bill.objects.create(
-            patient=appointment.patient,
-            doctor=appointment.doctor,
-            appointment=appointment,
-            medical_record=medical_record,
-            consultation_fee=float(data['consultation_fee']),
-            medication_cost=float(data.get('medication_cost', 0)),
-            test_cost=float(data.get('tests_cost', 0)),
-            other_charges=float(data.get('other_charges', 0))
+            treatment=data['treatment'],
+            consultation_fee=data['consultation_fee'],
+            medication_cost=data.get('medication_cost', 0),
+            test_cost=data.get('tests_cost', 0),
+            other_charges=data.get('other_charges', 0),
         )
-        
-        # Send bill notification
-        send_bill_notification(bill)
-        
+
         return Response({
             'message': 'Bill generated successfully',
             'bill_id': str(bill.id),
-            'total_amount': float(bill.total_amount)
+            'total_amount': str(bill.total_amount)
         })
-    
-    except Exception as e:
+
+    except Appointment.DoesNotExist:
+        return Response({'error': 'Appointment not found'}, status=404)
+    except billing.BillExists as e:
+        return Response({'error': str(e), 'bill_id': str(e.bill.id)}, status=409)
+    except KeyError as e:
+        return Response({'error': f'{e.args[0]} is required'}, status=400)
+    except (billing.BillingError, ValueError, ValidationError) as e:
         return Response({'error': str(e)}, status=400)
+    # Anything else is a server error; let it become a 500 so the idempotency key is not kept
 
 # Doctor Views
+def build_doctor_directory(q='', department=''):
+    """Serialize the doctor directory for the given filters"""
+    doctors = Doctor.objects.with_rating_stats()
+
+    # Filter by department
+    if department:
+        doctors = doctors.filter(department__name=department)
+
+    # Ranked search over name, specialization and department
+    if q:
+        doctors = search_doctors(doctors, q)
+
+    return DoctorReadSerializer(DoctorReadSerializer.setup_eager_loading(doctors), many=True).data
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def list_doctors(request):
     try:
-        doctors = Doctor.objects.select_related('user', 'department').prefetch_related('ratings')
-
-        # Filter by query (name or specialization)
         q = request.GET.get('q', '')
-        if q:
-            doctors = doctors.filter(
-                Q(user__first_name__icontains=q) |
-                Q(user__last_name__icontains=q) |
-                Q(specialization__icontains=q)
-            )
-
-        # Filter by department
         department = request.GET.get('department', '')
-        if department:
-            doctors = doctors.filter(department__name=department)
-
-        serializer = DoctorSerializer(doctors, many=True)
-        return Response(serializer.data)
+        # The directory cache version moves whenever anything listed changes
+        return conditional_response(request, (doctor_directory_cache.version(),), lambda: Response(
+            doctor_directory_cache.get_or_build((q, department), lambda: build_doctor_directory(q, department))
+        ))
 
     except Exception as e:
         return Response({'error': str(e)}, status=400)
 
+@api_view(['GET'])
+@permission_classes([IsHospitalAdmin])
+def doctor_directory_cache_stats(request):
+    return Response(doctor_directory_cache.stats)
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def doctor_ratings(request, doctor_id):
+    try:
+        validators = stamp(DoctorRating.objects.filter(doctor_id=doctor_id), 'updated_at', 'patient__user__updated_at')
+        return conditional_response(request, validators, lambda: _doctor_ratings(request, doctor_id))
+    except Exception as e:
+        return Response({'error': str(e)}, status=400)
+
+def _doctor_ratings(request, doctor_id):
     try:
         doctor = get_object_or_404(Doctor, id=doctor_id)
         ratings = doctor.ratings.all()
-        serializer = DoctorRatingSerializer(ratings, many=True)
-        return Response(serializer.data)
+        if wants_stream(request):
+            return stream_json(ratings, DoctorRatingReadSerializer)
+
+        results, links = paginate(request, ratings, DoctorRatingReadSerializer)
+        return Response({**links, 'results': results})
+    except Exception as e:
+        return Response({'error': str(e)}, status=400)
+
+# Availability Views
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def doctor_availability(request):
+    try:
+        start = parse_date(request.GET['start']) if 'start' in request.GET else date.today()
+        end = parse_date(request.GET['end']) if 'end' in request.GET else start + timedelta(days=6)
+        max_days = getattr(settings, 'AVAILABILITY_MAX_DAYS', 31)
+        if end < start or (end - start).days >= max_days:
+            return Response({'error': f'Date range must span 1 to {max_days} days'}, status=400)
+
+        return Response(free_slots(
+            start, end,
+            department=request.GET.get('department', ''),
+            doctor_id=request.GET.get('doctor')
+        ))
+    except Exception as e:
+        return Response({'error': str(e)}, status=400)
+
+# Export Views
+@api_view(['GET'])
+@permission_classes([IsHospitalAdmin])
+def export_data(request, dataset):
+    """Stream bills or appointments as ?output=csv|parquet|arrow, filtered by ?start, ?end and ?status"""
+    try:
+        start = parse_date(request.GET['start']) if 'start' in request.GET else None
+        end = parse_date(request.GET['end']) if 'end' in request.GET else None
+        content_type, extension, chunks = exports.export(
+            dataset,
+            output=request.GET.get('output', 'csv'),
+            start=start,
+            end=end,
+            status=request.GET.get('status', ''),
+        )
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{dataset}.{extension}"'
+        return response
+    except Exception as e:
+        return Response({'error': str(e)}, status=400)
+
+# Analytics Views
+def _report_params(request):
+    end = parse_date(request.GET['end']) if 'end' in request.GET else date.today()
+    start = parse_date(request.GET['start']) if 'start' in request.GET else end - timedelta(days=29)
+    group_by = [name for name in request.GET.get('group_by', 'day').split(',') if name]
+    return start, end, group_by
+
+@api_view(['GET'])
+@permission_classes([IsHospitalAdmin])
+def revenue_analytics(request):
+    """Revenue from the daily rollups, ?group_by=day,doctor,department,payment_status"""
+    try:
+        start, end, group_by = _report_params(request)
+        return Response(rollups.revenue_report(
+            start, end, group_by=group_by, payment_status=request.GET.get('payment_status')
+        ))
+    except Exception as e:
+        return Response({'error': str(e)}, status=400)
+
+@api_view(['GET'])
+@permission_classes([IsHospitalAdmin])
+def appointment_analytics(request):
+    """Appointment counts from the daily rollups, ?group_by=day,doctor,department,status"""
+    try:
+        start, end, group_by = _report_params(request)
+        return Response(rollups.appointment_report(
+            start, end, group_by=group_by, status=request.GET.get('status')
+        ))
     except Exception as e:
         return Response({'error': str(e)}, status=400)
 
 # Dashboard Views
+def day_bounds(day):
+    """Return the aware [start, end) datetimes of a day, so date filters can use indexes"""
+    start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+    return start, start + timedelta(days=1)
+
+# Stamps of the related rows whose names the appointment lists render
+APPOINTMENT_STAMP_FIELDS = ('updated_at', 'patient__user__updated_at', 'doctor__user__updated_at',
+                            'department__updated_at')
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def admin_dashboard(request):
+    try:
+        today_start, today_end = day_bounds(date.today())
+        validators = (
+            date.today(),
+            *stamp(Appointment.objects.filter(
+                Q(status='pending') | Q(created_at__gte=today_start, created_at__lt=today_end)
+            ), *APPOINTMENT_STAMP_FIELDS),
+            *stamp(Doctor.objects.all()),
+        )
+        return conditional_response(request, validators, lambda: _admin_dashboard(request))
+    except Exception as e:
+        return Response({'error': str(e)}, status=400)
+
+def _admin_dashboard(request):
     try:
         pending_appointments = Appointment.objects.filter(status='pending')
-        approved_today = Appointment.objects.filter(
-            status='approved',
-            created_at__date=date.today()
-        ).count()
-        
-        doctors = Doctor.objects.all()
-        available_doctors = doctors.filter(is_available=True).count()
+        if wants_stream(request):
+            return stream_json(pending_appointments, AppointmentReadSerializer)
+
+        pending_page, pending_links = paginate(
+            request, pending_appointments, AppointmentReadSerializer, 'pending_cursor'
+        )
+        today_start, today_end = day_bounds(date.today())
+        appointment_stats = Appointment.objects.filter(
+            Q(status='pending') |
+            Q(status='approved', created_at__gte=today_start, created_at__lt=today_end)
+        ).aggregate(
+            pending_count=Count('id', filter=Q(status='pending')),
+            approved_today=Count('id', filter=Q(status='approved'))
+        )
+        doctor_stats = Doctor.objects.aggregate(
+            total_doctors=Count('id'),
+            available_doctors=Count('id', filter=Q(is_available=True))
+        )
         
         return Response({
-            'pending_appointments': AppointmentSerializer(pending_appointments, many=True).data,
+            'pending_appointments': pending_page,
+            'pagination': {'pending_appointments': pending_links},
             'stats': {
-                'pending_count': pending_appointments.count(),
-                'approved_today': approved_today,
-                'total_doctors': doctors.count(),
-                'available_doctors': available_doctors
+                'pending_count': appointment_stats['pending_count'],
+                'approved_today': appointment_stats['approved_today'],
+                'total_doctors': doctor_stats['total_doctors'],
+                'available_doctors': doctor_stats['available_doctors']
             }
         })
     
@@ -306,19 +453,29 @@ def admin_dashboard(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def doctor_dashboard(request):
+    try:
+        validators = (date.today(), *stamp(
+            Appointment.objects.filter(doctor__user=request.user, appointment_date=date.today()),
+            *APPOINTMENT_STAMP_FIELDS
+        ))
+        return conditional_response(request, validators, lambda: _doctor_dashboard(request))
+    except Exception as e:
+        return Response({'error': str(e)}, status=400)
+
+def _doctor_dashboard(request):
     try:
         doctor = Doctor.objects.get(user=request.user)
-        today_appointments = Appointment.objects.filter(
-            doctor=doctor,
-            appointment_date=date.today()
-        )
+        today_appointments = list(AppointmentReadSerializer.setup_eager_loading(
+            Appointment.objects.filter(doctor=doctor, appointment_date=date.today())
+        ))
         
+        # Stats come from the list we already loaded, not extra COUNT queries
         return Response({
-            'appointments': AppointmentSerializer(today_appointments, many=True).data,
+            'appointments': AppointmentReadSerializer(today_appointments, many=True).data,
             'stats': {
-                'total_today': today_appointments.count(),
-                'completed': today_appointments.filter(status='completed').count(),
-                'scheduled': today_appointments.filter(status='approved').count()
+                'total_today': len(today_appointments),
+                'completed': sum(1 for a in today_appointments if a['status'] == 'completed'),
+                'scheduled': sum(1 for a in today_appointments if a['status'] == 'approved')
             }
         })
     
@@ -328,18 +485,49 @@ def doctor_dashboard(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def patient_dashboard(request):
+    try:
+        validators = (
+            date.today(),
+            *stamp(Appointment.objects.filter(patient__user=request.user), *APPOINTMENT_STAMP_FIELDS),
+            *stamp(Bill.objects.filter(patient__user=request.user),
+                   'updated_at', 'doctor__user__updated_at', 'appointment__updated_at'),
+        )
+        return conditional_response(request, validators, lambda: _patient_dashboard(request))
+    except Exception as e:
+        return Response({'error': str(e)}, status=400)
+
+def _patient_dashboard(request):
     try:
         patient = Patient.objects.get(user=request.user)
         appointments = Appointment.objects.filter(patient=patient)
         bills = Bill.objects.filter(patient=patient)
+        # Archived appointments stay in the patient's history
+        appointment_page, appointment_links = paginate_merged(request, [
+            (appointments, AppointmentReadSerializer),
+            (ArchivedAppointment.objects.filter(patient_id=patient.pk), ArchivedAppointmentReadSerializer),
+        ], 'appointments_cursor')
+        bill_page, bill_links = paginate(request, bills, BillReadSerializer, 'bills_cursor')
+
+        # The lists are paged, so stats are counted in SQL over the full history
+        appointment_stats = appointments.aggregate(
+            upcoming=Count('id', filter=Q(status='approved', appointment_date__gte=date.today())),
+            pending=Count('id', filter=Q(status='pending')),
+            completed=Count('id', filter=Q(status='completed'))
+        )
         
         return Response({
-            'appointments': AppointmentSerializer(appointments, many=True).data,
-            'bills': BillSerializer(bills, many=True).data,
+            'appointments': appointment_page,
+            'bills': bill_page,
+            'pagination': {
+                'appointments': appointment_links,
+                'bills': bill_links
+            },
             'stats': {
-                'upcoming': appointments.filter(status='approved', appointment_date__gte=date.today()).count(),
-                'pending': appointments.filter(status='pending').count(),
-                'completed': appointments.filter(status='completed').count(),
+                **appointment_stats,
+                # Archived appointments are all finished, so only this count needs them
+                'completed': appointment_stats['completed'] + ArchivedAppointment.objects.filter(
+                    patient_id=patient.pk, status='completed'
+                ).count(),
                 'unpaid_bills': bills.filter(payment_status='pending').count()
             }
         })
@@ -347,92 +535,83 @@ def patient_dashboard(request):
     except Exception as e:
         return Response({'error': str(e)}, status=400)
 
-# Notification Functions
-def send_appointment_notification(appointment, notification_type):
-    """Send email and SMS notifications for appointments"""
+# Notification Inbox
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def list_notifications(request):
+    """Keyset-paginated inbox of the current user, newest first; ?unread=1 for unread only"""
     try:
-        patient_email = appointment.patient.user.email
-        patient_phone = appointment.patient.user.phone
-        
-        if notification_type == 'booking':
-            subject = 'Appointment Booking Confirmation'
-            message = f"Your appointment has been booked for {appointment.appointment_date} at {appointment.appointment_time}. Waiting for admin approval."
-        elif notification_type == 'approval':
-            subject = 'Appointment Approved'
-            message = f"Your appointment with {appointment.doctor} on {appointment.appointment_date} at {appointment.appointment_time} has been approved."
-        elif notification_type == 'rejection':
-            subject = 'Appointment Cancelled'
-            message = f"Your appointment for {appointment.appointment_date} has been cancelled. Please contact us for rescheduling."
-        
-        # Send Email
-        if patient_email:
-            send_mail(
-                subject,
-                message,
-                settings.DEFAULT_FROM_EMAIL,
-                [patient_email],
-                fail_silently=True,
-            )
-        
-        # Send SMS via Twilio
-        if patient_phone and hasattr(settings, 'TWILIO_ACCOUNT_SID'):
-            client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-            client.messages.create(
-                body=message,
-                from_=settings.TWILIO_PHONE_NUMBER,
-                to=patient_phone
-            )
-        
-        # Create notification record
-        Notification.objects.create(
-            recipient=appointment.patient.user,
-            notification_type=f'appointment_{notification_type}',
-            title=subject,
-            message=message,
-            email_sent=bool(patient_email),
-            sms_sent=bool(patient_phone)
-        )
-        
+        notifications = Notification.objects.filter(recipient=request.user)
+        if request.GET.get('unread') in ('1', 'true'):
+            notifications = notifications.filter(is_read=False)
+        page, links = paginate(request, notifications, NotificationReadSerializer)
+        return Response({**links, 'results': page, 'unread_count': inbox.unread_count(request.user)})
+
     except Exception as e:
-        print(f"Notification error: {e}")
+        return Response({'error': str(e)}, status=400)
 
-def send_bill_notification(bill):
-    """Send bill notification via email and SMS"""
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def notification_unread_count(request):
+    return Response({'unread_count': inbox.unread_count(request.user)})
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def mark_notifications_read(request):
+    """Mark notifications read: {'ids': [...]} for specific ones or {'all': true}"""
     try:
-        patient_email = bill.patient.user.email
-        patient_phone = bill.patient.user.phone
-        
-        subject = 'Medical Bill Generated'
-        message = f"Your medical bill for ${bill.total_amount} has been generated. Please log into your account to view details and make payment."
-        
-        # Send Email
-        if patient_email:
-            send_mail(
-                subject,
-                message,
-                settings.DEFAULT_FROM_EMAIL,
-                [patient_email],
-                fail_silently=True,
-            )
-        
-        # Send SMS
-        if patient_phone and hasattr(settings, 'TWILIO_ACCOUNT_SID'):
-            client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-            client.messages.create(
-                body=message,
-                from_=settings.TWILIO_PHONE_NUMBER,
-                to=patient_phone
-            )
-        
-        # Create notification record
-        Notification.objects.create(
-            recipient=bill.patient.user,
-            notification_type='bill_generated',
-            title=subject,
-            message=message,
-            email_sent=bool(patient_email),
-            sms_sent=bool(patient_phone)
-        )
-        
+        if request.data.get('all'):
+            ids = None
+        else:
+            ids = request.data.get('ids')
+            if not isinstance(ids, list) or not ids:
+                return Response({'error': "Pass a non-empty 'ids' list or 'all': true"}, status=400)
+            ids = [int(pk) for pk in ids]
+
+        updated = inbox.mark_read(request.user, ids)
+        return Response({'updated': updated, 'unread_count': inbox.unread_count(request.user)})
+
+    except Exception as e:
+        return Response({'error': str(e)}, status=400)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def poll_notifications(request):
+    """Long-poll: wait until a notification newer than ?since_id arrives, then return the new ones"""
+    try:
+        since_id = int(request.GET.get('since_id', 0))
+        latest = inbox.wait_for_new(request.user, since_id, timeout=request.GET.get('timeout'))
+        notifications = []
+        if latest > since_id:
+            notifications = NotificationReadSerializer(
+                NotificationReadSerializer.setup_eager_loading(
+                    Notification.objects.filter(recipient=request.user, pk__gt=since_id).order_by('-id')
+                )[:50],
+                many=True,
+            ).data
+        return Response({
+            'latest_id': latest,
+            'results': notifications,
+            'unread_count': inbox.unread_count(request.user),
+        })
+
     except Exception as e:
-        print(f"Bill notification error: {e}")
\ No newline at end of file
+        return Response({'error': str(e)}, status=400)
+
+# Notification Functions
+def send_appointment_notification(appointment, notification_type):
+    """Queue email and SMS notifications for appointments"""
+    subject, message = appointment_message(appointment, notification_type)
+    return enqueue_notification(
+        appointment.patient.user,
+        f'appointment_{notification_type}',
+        subject,
+        message,
+        coalesce_key=f'appointment:{appointment.pk}',
+    )
+
+def send_bill_notification(bill):
+    """Queue bill notification via email and SMS"""
+    subject, message = billing.bill_message(bill)
+    return enqueue_notification(bill.patient.user, 'bill_generated', subject, message,
+                                coalesce_key=f'bill:{bill.pk}')